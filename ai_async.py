@@ -0,0 +1,221 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import ai_engine
+from ai_cache import make_key, stable_hash
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 60.0
+
+
+class AIJob:
+    """
+    Thread-safe handle on one AI call. Streamed chunks accumulate in ``text``
+    while the call runs, so any number of Streamlit sessions can poll the
+    same job without blocking their script thread.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.started_at = time.time()
+        self.finished_at = None
+        self.error = None
+        self.waiters = set()  # ids of the viewers waiting on this job
+        self._chunks = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._cancelled = threading.Event()
+
+    @property
+    def text(self):
+        with self._lock:
+            return "".join(self._chunks)
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def append(self, chunk):
+        with self._lock:
+            self._chunks.append(chunk)
+
+    def cancel(self):
+        """Stops the call at its next chunk; the job then finishes with an error."""
+        self._cancelled.set()
+
+    def wait(self, timeout=None):
+        self._done.wait(timeout)
+        return self.text
+
+    def _finish(self, error=None):
+        if error and not self.error:
+            self.error = error
+        self.finished_at = time.time()
+        self._done.set()
+
+
+def _drain(job, stream_fn, args):
+    for chunk in stream_fn(*args):
+        if job.cancelled:
+            break
+        job.append(chunk)
+
+
+class AsyncAIEngine:
+    """
+    Runs ai_engine streaming calls on a private asyncio loop.
+
+    At most ``max_concurrency`` model calls run at once; identical requests
+    that arrive while one is in flight share that job (single-flight);
+    every call gets a timeout after which it is cancelled.
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._semaphore = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="omnisight-ai")
+        self._stats = {"submitted": 0, "coalesced": 0, "timeouts": 0, "cancelled": 0, "failed": 0}
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                ready = threading.Event()
+
+                def run():
+                    self._loop = asyncio.new_event_loop()
+                    asyncio.set_event_loop(self._loop)
+                    self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                    ready.set()
+                    self._loop.run_forever()
+
+                threading.Thread(target=run, name="omnisight-ai-loop", daemon=True).start()
+                ready.wait()
+        return self._loop
+
+    async def _run(self, job, stream_fn, args, timeout):
+        try:
+            async with self._semaphore:
+                if job.cancelled:
+                    raise asyncio.CancelledError
+                work = self._loop.run_in_executor(self._executor, _drain, job, stream_fn, args)
+                try:
+                    await asyncio.wait_for(asyncio.shield(work), timeout)
+                except asyncio.TimeoutError:
+                    # Waiters are released now, but the slot stays taken until
+                    # the worker thread returns (at its next chunk, or when the
+                    # client's request timeout ends the call), so no more than
+                    # max_concurrency model calls are ever running.
+                    job.cancel()
+                    self._count("timeouts")
+                    job._finish(f"timed out after {timeout:g}s")
+                    await asyncio.gather(work, return_exceptions=True)
+                    return
+            if job.cancelled:
+                self._count("cancelled")
+                job._finish("cancelled")
+            else:
+                job._finish()
+        except asyncio.CancelledError:
+            self._count("cancelled")
+            job._finish("cancelled")
+        except Exception as e:
+            self._count("failed")
+            job._finish(str(e) or type(e).__name__)
+        finally:
+            with self._lock:
+                if self._inflight.get(job.key) is job:
+                    del self._inflight[job.key]
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def submit(self, key, stream_fn, *args, timeout=None, waiter=None):
+        """
+        Starts ``stream_fn(*args)`` or joins the in-flight job with the same
+        key. ``waiter`` identifies the viewer (e.g. a session id), so asking
+        again for a job one is already waiting on does not count twice;
+        without one the caller is an anonymous waiter that never releases.
+        """
+        loop = self._ensure_loop()
+        waiter = waiter if waiter is not None else uuid.uuid4().hex
+        with self._lock:
+            job = self._inflight.get(key)
+            if job is not None and not job.done and not job.cancelled:
+                job.waiters.add(waiter)
+                self._stats["coalesced"] += 1
+                return job
+            job = self._inflight[key] = AIJob(key)
+            job.waiters.add(waiter)
+            self._stats["submitted"] += 1
+        asyncio.run_coroutine_threadsafe(
+            self._run(job, stream_fn, args, timeout or self.timeout), loop
+        )
+        return job
+
+    def release(self, job, waiter):
+        """Drops ``waiter``; the call is cancelled when nobody is left waiting."""
+        with self._lock:
+            job.waiters.discard(waiter)
+            orphaned = not job.waiters and not job.done
+        if orphaned:
+            job.cancel()
+
+    def submit_analyze(self, state_data, timeout=None, waiter=None):
+        key = make_key("analyze_state", "", stable_hash(state_data))
+        return self.submit(key, ai_engine.analyze_state_stream, state_data, timeout=timeout, waiter=waiter)
+
+    def submit_question(self, question, state_data, timeout=None, waiter=None):
+        key = make_key("ask_ai_question", question.strip(), stable_hash(state_data))
+        return self.submit(key, ai_engine.ask_ai_question_stream, question, state_data, timeout=timeout, waiter=waiter)
+
+    def submit_session_question(self, session, question, state_data, timeout=None, waiter=None):
+        """Follow-up in an ai_engine.AskSession; only repeats within the same session coalesce."""
+        key = make_key("ask_session", session.id, question.strip(), stable_hash(state_data))
+        return self.submit(key, ai_engine.ask_in_session_stream, session, question, state_data,
+                           timeout=timeout, waiter=waiter)
+
+    async def analyze_state(self, state_data, timeout=None):
+        """Awaitable wrapper for use from other asyncio code."""
+        job = self.submit_analyze(state_data, timeout)
+        return await asyncio.get_running_loop().run_in_executor(None, job.wait)
+
+    async def ask_ai_question(self, question, state_data, timeout=None):
+        job = self.submit_question(question, state_data, timeout)
+        return await asyncio.get_running_loop().run_in_executor(None, job.wait)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._inflight)
+        return stats
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Process-wide engine, so identical requests from different sessions coalesce."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                ai_engine._load_env()
+                _engine = AsyncAIEngine(
+                    max_concurrency=int(os.getenv("OMNISIGHT_AI_CONCURRENCY", DEFAULT_CONCURRENCY)),
+                    timeout=float(os.getenv("OMNISIGHT_AI_TIMEOUT", DEFAULT_TIMEOUT)),
+                )
+    return _engine
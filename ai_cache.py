@@ -0,0 +1,188 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+from columnar import ColumnarTable, json_default
+from versioning import fingerprint_of
+
+
+def _update_hash(h, obj):
+    fp = fingerprint_of(obj)
+    if fp is not None:
+        # Published live data: versions and shapes stand in for the bytes.
+        h.update(b"V")
+        h.update(fp.encode())
+    elif isinstance(obj, ColumnarTable):
+        h.update(b"T")
+        h.update(json.dumps([obj.field_names, obj.categories, obj.formats], sort_keys=True).encode())
+        for name in obj.field_names:
+            arr = obj.column(name)
+            if arr.dtype == object:
+                h.update(json.dumps(arr.tolist(), default=json_default).encode())
+            else:
+                h.update(arr.dtype.str.encode())
+                h.update(np.ascontiguousarray(arr).view(np.uint8))
+    elif isinstance(obj, dict):
+        h.update(b"D")
+        for key in sorted(obj, key=str):
+            h.update(str(key).encode())
+            _update_hash(h, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"L")
+        for item in obj:
+            _update_hash(h, item)
+    else:
+        h.update(json.dumps(obj, sort_keys=True, default=json_default).encode())
+    h.update(b"|")
+
+
+def stable_hash(obj):
+    """
+    Content hash of a state dict; tables are hashed from their raw column
+    bytes. A VersionedDataset (or a table published in one) contributes
+    its structural fingerprint instead, which is O(domains).
+    """
+    h = hashlib.sha256()
+    _update_hash(h, obj)
+    return h.hexdigest()
+
+
+def make_key(model_name, template, state_hash, *extra):
+    h = hashlib.sha256()
+    for part in (model_name or "", template, state_hash, *extra):
+        h.update(str(part).encode())
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU store."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    def set(self, key, value, created):
+        self._data[key] = (value, created)
+        self._data.move_to_end(key)
+        evicted = 0
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """
+    LRU store in a SQLite file, shared by every Streamlit session and worker
+    process that points at the same path.
+    """
+
+    def __init__(self, path, max_entries=1024):
+        self.path = str(path)
+        self.max_entries = max_entries
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+        return tuple(row) if row is not None else None
+
+    def set(self, key, value, created):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, created, time.time()),
+            )
+            cur = conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            return cur.rowcount
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+    """Content-addressed LLM response cache with LRU + TTL eviction and hit/miss counters."""
+
+    def __init__(self, backend=None, ttl_seconds=3600.0):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self.backend.get(key)
+            if entry is not None and self.ttl_seconds and time.time() - entry[1] > self.ttl_seconds:
+                self.backend.delete(key)
+                self._stats["expired"] += 1
+                entry = None
+            self._stats["hits" if entry is not None else "misses"] += 1
+            return entry[0] if entry is not None else None
+
+    def set(self, key, value):
+        with self._lock:
+            self._stats["evictions"] += self.backend.set(key, value, time.time())
+
+    def clear(self):
+        with self._lock:
+            self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self.backend)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
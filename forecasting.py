@@ -0,0 +1,425 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import perf
+from columnar import ColumnarTable, as_table
+
+HORIZONS = {"7 Days": 7, "30 Days": 30, "Quarterly": 90}
+SEASON_DAYS = 7
+MAX_GROUPS = 50
+TOP_CLIENTS = 3  # largest clients by projected revenue shown in the summary
+Z_SCORES = {0.8: 1.2816, 0.9: 1.6449, 0.95: 1.9600, 0.99: 2.5758}
+
+# Smoothing parameters are picked per series by grid search, evaluated for
+# every series and every grid point at once.
+_ALPHAS = np.linspace(0.1, 0.9, 9)
+_BETAS = np.array([0.01, 0.05, 0.1, 0.2, 0.3])
+_GAMMAS = np.array([0.05, 0.2, 0.4])
+_PHIS = np.array([0.8, 0.9, 0.98])  # damped trend, so long horizons level off
+
+# What gets forecast: name -> domain, value, optional filter/grouping and
+# how rows of one day combine.
+SERIES_SPECS = {
+    "revenue": {"domain": "finance", "value": "amount", "where": ("type", "Income"), "how": "sum"},
+    "revenue_by_region": {"domain": "finance", "value": "amount", "where": ("type", "Income"), "group": "region", "how": "sum"},
+    "revenue_by_client": {"domain": "finance", "value": "amount", "where": ("type", "Income"), "group": "client_id", "how": "sum"},
+    "operations_success": {"domain": "operations", "value": "success_rate", "how": "mean"},
+    "operations_output": {"domain": "operations", "value": "output_per_day", "how": "sum"},
+}
+
+
+def _ffill(Y):
+    """Forward-fills NaNs along each row (leading NaNs take the first value)."""
+    valid = np.isfinite(Y)
+    idx = np.where(valid, np.arange(Y.shape[1]), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    filled = Y[np.arange(Y.shape[0])[:, None], idx]
+    first = np.argmax(valid, axis=1)
+    lead = np.arange(Y.shape[1]) < first[:, None]
+    return np.where(lead, Y[np.arange(Y.shape[0]), first][:, None], filled)
+
+
+def daily_series(table, value, group=None, where=None, how="sum", max_groups=MAX_GROUPS):
+    """
+    ``(days, labels, Y)``: one row per group label (the ``max_groups``
+    largest by total) and one column per calendar day, oldest first.
+    Days without rows are 0 for sums and carried forward for means.
+    """
+    table = as_table(table)
+    if "date" not in table or value not in table or not len(table):
+        return np.array([], dtype="datetime64[D]"), [], np.zeros((0, 0))
+    dates = table.column("date").astype("datetime64[D]")
+    values = table.column(value).astype(np.float64)
+    mask = np.isfinite(values) & ~np.isnat(dates)
+    if where:
+        mask &= table.eq(*where)
+    if group:
+        codes = table.column(group).astype(np.int64)
+        labels = list(table.categories[group])
+        mask &= codes >= 0
+    else:
+        codes = np.zeros(len(table), dtype=np.int64)
+        labels = ["Total"]
+    if not mask.any():
+        return np.array([], dtype="datetime64[D]"), [], np.zeros((0, 0))
+
+    first = dates[mask].min()
+    n_days = int((dates[mask].max() - first).astype(np.int64)) + 1
+    flat = codes[mask] * n_days + (dates[mask] - first).astype(np.int64)
+    size = len(labels) * n_days
+    sums = np.bincount(flat, weights=values[mask], minlength=size).reshape(len(labels), n_days)
+    counts = np.bincount(flat, minlength=size).reshape(len(labels), n_days)
+
+    present = np.flatnonzero(counts.sum(axis=1))
+    keep = present[np.argsort(-np.abs(sums[present]).sum(axis=1), kind="stable")[:max_groups]]
+    keep.sort()
+    sums, counts = sums[keep], counts[keep]
+    if how == "mean":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            Y = _ffill(np.where(counts > 0, sums / counts, np.nan))
+    else:
+        Y = sums
+    days = first + np.arange(n_days).astype("timedelta64[D]")
+    return days, [labels[i] for i in keep], Y
+
+
+def fit_smoothing(Y, season=SEASON_DAYS):
+    """
+    Additive damped-trend Holt-Winters (Holt's damped trend when there are
+    fewer than two seasons of history) fitted to every row of ``Y`` at
+    once, choosing alpha/beta/phi/gamma per row by one-step-ahead squared
+    error.
+    """
+    G, T = Y.shape
+    seasonal = season and T >= 2 * season
+    m = season if seasonal else 1
+    grid = np.array(np.meshgrid(
+        _ALPHAS, _BETAS, _PHIS, _GAMMAS if seasonal else [0.0], indexing="ij",
+    )).reshape(4, -1)
+    a, b, phi, g = (p[:, None] for p in grid)
+
+    if seasonal:
+        level0 = Y[:, :m].mean(axis=1)
+        trend0 = (Y[:, m:2 * m].mean(axis=1) - level0) / m
+        season0 = Y[:, :m] - level0[:, None]
+        start = m
+    else:
+        level0 = Y[:, 0]
+        trend0 = Y[:, 1] - Y[:, 0] if T > 1 else np.zeros(G)
+        season0 = np.zeros((G, 1))
+        start = 1
+
+    P = grid.shape[1]
+    level = np.broadcast_to(level0, (P, G)).copy()
+    trend = np.broadcast_to(trend0, (P, G)).copy()
+    seas = np.broadcast_to(season0, (P, G, m)).copy()
+    sse = np.zeros((P, G))
+    for t in range(start, T):
+        s = seas[:, :, t % m]
+        err = Y[:, t] - (level + phi * trend + s)
+        sse += err * err
+        new_level = a * (Y[:, t] - s) + (1 - a) * (level + phi * trend)
+        trend = b * (new_level - level) + (1 - b) * phi * trend
+        seas[:, :, t % m] = g * (Y[:, t] - new_level) + (1 - g) * s
+        level = new_level
+
+    best = np.argmin(sse, axis=0)
+    cols = np.arange(G)
+    n_err = max(T - start, 1)
+    return {
+        "method": "holt_winters" if seasonal else "holt",
+        "level": level[best, cols],
+        "trend": trend[best, cols],
+        "season": seas[best, cols],
+        "alpha": grid[0, best], "beta": grid[1, best], "phi": grid[2, best], "gamma": grid[3, best],
+        "sigma": np.sqrt(sse[best, cols] / n_err),
+        "period": m,
+        "n_obs": T,
+    }
+
+
+def predict_smoothing(fit, horizon, z):
+    h = np.arange(1, horizon + 1)
+    m = fit["period"]
+    season = fit["season"][:, (fit["n_obs"] + h - 1) % m]
+    # phi_h = phi + phi^2 + ... + phi^h
+    phi_h = np.cumsum(fit["phi"][:, None] ** h, axis=1)
+    mean = fit["level"][:, None] + phi_h * fit["trend"][:, None] + season
+    # ETS(A,Ad,A) variance: sigma^2 * (1 + sum_{j<h} c_j^2),
+    # c_j = alpha (1 + beta phi_j) + gamma [j % m == 0]
+    j = h[:-1]
+    c = fit["alpha"][:, None] * (1 + fit["beta"][:, None] * phi_h[:, :-1]) + fit["gamma"][:, None] * (j % m == 0)
+    var = np.concatenate([np.ones((len(mean), 1)), 1 + np.cumsum(c * c, axis=1)], axis=1)
+    half = z * fit["sigma"][:, None] * np.sqrt(var)
+    return mean, mean - half, mean + half
+
+
+def total_sd_smoothing(fit, horizon):
+    """
+    Standard deviation of the error of the forecast summed over ``horizon``
+    days. The h-step errors share shocks, so their variances don't add:
+    the shock at step k enters every later step, with weight 1 + C_{H-k}.
+    """
+    h = np.arange(1, horizon + 1)
+    m = fit["period"]
+    phi_h = np.cumsum(fit["phi"][:, None] ** h, axis=1)
+    j = h[:-1]
+    c = fit["alpha"][:, None] * (1 + fit["beta"][:, None] * phi_h[:, :-1]) + fit["gamma"][:, None] * (j % m == 0)
+    weights = 1 + np.concatenate([np.zeros((len(c), 1)), np.cumsum(c, axis=1)], axis=1)
+    return fit["sigma"] * np.sqrt((weights * weights).sum(axis=1))
+
+
+def fit_linear(Y):
+    """Least-squares line through every row of ``Y`` at once."""
+    G, T = Y.shape
+    x = np.arange(T, dtype=np.float64)
+    xbar = x.mean()
+    sxx = ((x - xbar) ** 2).sum() or 1.0
+    ybar = Y.mean(axis=1)
+    slope = ((x - xbar) * (Y - ybar[:, None])).sum(axis=1) / sxx
+    intercept = ybar - slope * xbar
+    resid = Y - (intercept[:, None] + slope[:, None] * x)
+    sigma = np.sqrt((resid ** 2).sum(axis=1) / max(T - 2, 1))
+    return {"method": "linear", "intercept": intercept, "slope": slope, "sigma": sigma,
+            "xbar": xbar, "sxx": sxx, "n_obs": T}
+
+
+def predict_linear(fit, horizon, z):
+    x = fit["n_obs"] - 1 + np.arange(1, horizon + 1, dtype=np.float64)
+    mean = fit["intercept"][:, None] + fit["slope"][:, None] * x
+    half = z * fit["sigma"][:, None] * np.sqrt(1 + 1 / fit["n_obs"] + (x - fit["xbar"]) ** 2 / fit["sxx"])
+    return mean, mean - half, mean + half
+
+
+def total_sd_linear(fit, horizon):
+    """Standard deviation of the error of the forecast summed over ``horizon`` days (the line's error is shared)."""
+    x = fit["n_obs"] - 1 + np.arange(1, horizon + 1, dtype=np.float64)
+    line = horizon * horizon * (1 / fit["n_obs"] + (x.mean() - fit["xbar"]) ** 2 / fit["sxx"])
+    return fit["sigma"] * np.sqrt(horizon + line)
+
+
+def fit_series(days, labels, Y, season=SEASON_DAYS):
+    """
+    Both models for one block of series. Each row uses whichever model had
+    the lower error forecasting its own last few days from the rest.
+    """
+    T = Y.shape[1]
+    if T < 3:
+        return {"days": days, "labels": labels, "history": Y, "fits": {}}
+    use_linear = np.zeros(len(Y), dtype=bool)
+    k = min(season, T // 4)
+    if k >= 1 and T - k >= 3:
+        train, test = Y[:, :-k], Y[:, -k:]
+        s_err = np.abs(predict_smoothing(fit_smoothing(train, season), k, 0.0)[0] - test).mean(axis=1)
+        l_err = np.abs(predict_linear(fit_linear(train), k, 0.0)[0] - test).mean(axis=1)
+        use_linear = l_err < s_err
+    return {
+        "days": days, "labels": labels, "history": Y, "use_linear": use_linear,
+        "fits": {"smoothing": fit_smoothing(Y, season), "linear": fit_linear(Y)},
+    }
+
+
+def forecast(fitted, horizon, level=0.95, floor=None):
+    """
+    Point forecasts and ``level`` prediction intervals, ``(G, horizon)``
+    each, plus the sum over the horizon with its own interval (``total*``,
+    one per row); summing the daily bounds would overstate it.
+    """
+    Y = fitted["history"]
+    G = len(Y)
+    future = fitted["days"][-1] + np.arange(1, horizon + 1).astype("timedelta64[D]") if len(fitted["days"]) else fitted["days"]
+    if not fitted["fits"]:
+        last = Y[:, -1:] if Y.size else np.zeros((G, 1))
+        mean = np.repeat(last, horizon, axis=1)
+        total = mean.sum(axis=1)
+        return {"labels": fitted["labels"], "days": future, "mean": mean, "lower": mean, "upper": mean,
+                "total": total, "total_lower": total, "total_upper": total,
+                "method": ["naive"] * G, "level": level}
+    z = Z_SCORES.get(level, 1.96)
+    smooth, linear = fitted["fits"]["smoothing"], fitted["fits"]["linear"]
+    s_mean, s_lo, s_hi = predict_smoothing(smooth, horizon, z)
+    l_mean, l_lo, l_hi = predict_linear(linear, horizon, z)
+    use_linear = fitted["use_linear"][:, None]
+    mean = np.where(use_linear, l_mean, s_mean)
+    lower = np.where(use_linear, l_lo, s_lo)
+    upper = np.where(use_linear, l_hi, s_hi)
+    total = mean.sum(axis=1)
+    total_half = z * np.where(use_linear[:, 0], total_sd_linear(linear, horizon), total_sd_smoothing(smooth, horizon))
+    total_lower, total_upper = total - total_half, total + total_half
+    if floor is not None:
+        mean, lower, upper = (np.maximum(arr, floor) for arr in (mean, lower, upper))
+        total, total_lower, total_upper = (np.maximum(arr, floor * horizon) for arr in (total, total_lower, total_upper))
+    return {
+        "labels": fitted["labels"], "days": future, "mean": mean, "lower": lower, "upper": upper,
+        "total": total, "total_lower": total_lower, "total_upper": total_upper,
+        "method": np.where(use_linear[:, 0], "linear", smooth["method"]).tolist(), "level": level,
+    }
+
+
+class ForecastEngine:
+    """
+    Fits every SERIES_SPECS block for a dataset once and answers any
+    horizon from the cached fit. Fits are keyed by dataset version: an
+    explicit ``version`` when the caller has one, otherwise the identity
+    of the domain tables (the live hub forks a table whenever it changes).
+    """
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self._fits = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"fits": 0, "hits": 0}
+
+    @staticmethod
+    def _identity(current_data):
+        domains = sorted({spec["domain"] for spec in SERIES_SPECS.values()})
+        tables = tuple(current_data.get(d) for d in domains)
+        return tuple(id(t) for t in tables), tables
+
+    @perf.timed("forecast.fit")
+    def fit(self, current_data, version=None):
+        ident, tables = self._identity(current_data)
+        key = version if version is not None else ident
+        with self._lock:
+            entry = self._fits.get(key)
+            if entry is not None and (version is not None or all(a is b for a, b in zip(entry[0], tables))):
+                self._fits.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1]
+        perf.count("forecast.fits")
+        fitted = {}
+        for name, spec in SERIES_SPECS.items():
+            table = current_data.get(spec["domain"])
+            if not isinstance(table, (ColumnarTable, list)):
+                continue
+            days, labels, Y = daily_series(table, spec["value"], spec.get("group"), spec.get("where"), spec["how"])
+            fitted[name] = fit_series(days, labels, Y)
+        with self._lock:
+            # Holding the tables keeps their ids from being reused while cached.
+            self._fits[key] = (tables, fitted)
+            self._stats["fits"] += 1
+            while len(self._fits) > self.max_entries:
+                self._fits.popitem(last=False)
+        return fitted
+
+    def forecast(self, current_data, horizon_days, level=0.95, version=None):
+        fitted = self.fit(current_data, version)
+        return {
+            name: forecast(block, horizon_days, level, floor=0.0)
+            | {"history_days": block["days"], "history": block["history"]}
+            for name, block in fitted.items()
+        }
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, cached=len(self._fits))
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_forecast_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = ForecastEngine()
+    return _engine
+
+
+def horizon_days(timeframe):
+    return HORIZONS.get(timeframe, timeframe if isinstance(timeframe, int) else 7)
+
+
+def _pct(new, old):
+    return (new - old) / abs(old) * 100 if old else 0.0
+
+
+def summarize(result, horizon):
+    """Headline numbers of a ``ForecastEngine.forecast`` result as a flat dict."""
+    out = {"horizon_days": horizon}
+    rev = result.get("revenue")
+    if rev and len(rev["labels"]):
+        hist = rev["history"][0]
+        window = min(horizon, len(hist))
+        # Compare like with like: projected daily run-rate vs the recent one.
+        recent = hist[-window:].sum() * horizon / window
+        out["revenue"] = {
+            "projected": float(rev["total"][0]),
+            "lower": float(rev["total_lower"][0]),
+            "upper": float(rev["total_upper"][0]),
+            "level": rev["level"],
+            "previous": float(recent),
+            "change_pct": float(_pct(rev["total"][0], recent)),
+            "method": rev["method"][0],
+        }
+    by_region = result.get("revenue_by_region")
+    if by_region and len(by_region["labels"]):
+        hist = by_region["history"]
+        window = min(horizon, hist.shape[1])
+        recent = hist[:, -window:].sum(axis=1) * horizon / window
+        change = [_pct(p, r) for p, r in zip(by_region["mean"].sum(axis=1), recent)]
+        out["regions"] = dict(sorted(zip(by_region["labels"], map(float, change)), key=lambda kv: kv[1]))
+    by_client = result.get("revenue_by_client")
+    if by_client and len(by_client["labels"]):
+        hist = by_client["history"]
+        window = min(horizon, hist.shape[1])
+        recent = hist[:, -window:].sum(axis=1) * horizon / window
+        projected = by_client["total"]
+        top = np.argsort(-projected, kind="stable")[:TOP_CLIENTS]
+        out["top_clients"] = [
+            {"client": by_client["labels"][i], "projected": float(projected[i]), "change_pct": float(_pct(projected[i], recent[i]))}
+            for i in top
+        ]
+    ops = result.get("operations_success")
+    if ops and len(ops["labels"]):
+        out["operations_success"] = {
+            "current": float(ops["history"][0, -1]),
+            "projected": float(min(ops["mean"][0, -1], 1.0)),
+            "lower": float(min(ops["lower"][0, -1], 1.0)),
+            "upper": float(min(ops["upper"][0, -1], 1.0)),
+        }
+    change = out.get("revenue", {}).get("change_pct", 0.0)
+    success = out.get("operations_success", {}).get("projected", 1.0)
+    if change < -10 or success < 0.95:
+        out["risk"] = "High"
+    elif change < 0 or success < 0.98:
+        out["risk"] = "Medium"
+    else:
+        out["risk"] = "Low"
+    regions = out.get("regions")
+    out["key_driver"] = next(iter(regions)) if regions else None
+    return out
+
+
+def format_summary(summary):
+    """Markdown rendering of ``summarize`` for the Predictive view."""
+    h = summary["horizon_days"]
+    lines = []
+    rev = summary.get("revenue")
+    if rev:
+        lines.append(
+            f"**Projected revenue ({h}d):** ${rev['projected']:,.0f} "
+            f"({rev['level']:.0%} PI ${rev['lower']:,.0f} – ${rev['upper']:,.0f}) · "
+            f"{rev['change_pct']:+.1f}% vs recent run-rate · model: {rev['method'].replace('_', '-')}"
+        )
+    regions = summary.get("regions")
+    if regions:
+        lines.append("**By region:** " + " · ".join(f"{name} {pct:+.1f}%" for name, pct in regions.items()))
+    clients = summary.get("top_clients")
+    if clients:
+        lines.append("**Top clients:** " + " · ".join(
+            f"{c['client']} ${c['projected']:,.0f} ({c['change_pct']:+.1f}%)" for c in clients
+        ))
+    ops = summary.get("operations_success")
+    if ops:
+        lines.append(
+            f"**Operations success rate:** {ops['current']:.1%} → {ops['projected']:.1%} "
+            f"(95% PI {ops['lower']:.1%} – {ops['upper']:.1%})"
+        )
+    driver = summary.get("key_driver")
+    lines.append(f"**Risk:** {summary['risk']}" + (f" | **Key driver:** {driver} revenue trend" if driver else ""))
+    return "\n\n".join(lines)
@@ -0,0 +1,546 @@
+import csv
+import io
+import json
+import math
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+import perf
+from columnar import ColumnarTable, as_table
+
+BATCH_SIZE = 500
+FLUSH_SECONDS = 1.0
+QUEUE_SIZE = 10000
+POLL_SECONDS = 0.5
+THROUGHPUT_WINDOW = 30.0
+MAX_ERRORS = 20
+
+# Accepted fields per domain. ``key`` rows are upserted by that field;
+# domains without one (finance) are append-only. CSV values arrive as
+# strings and are coerced to the field's kind.
+SCHEMAS = {
+    "finance": {
+        "key": None, "required": ("client_id", "type", "amount", "date"),
+        "fields": {"transaction_id": "id", "client_id": "str", "type": "str", "amount": "float",
+                   "status": "str", "region": "str", "date": "date"},
+        "choices": {"type": ("Income", "Expense"), "status": ("Paid", "Unpaid")},
+    },
+    "operations": {
+        "key": "operation_id", "required": ("operation_id",),
+        "fields": {"operation_id": "str", "date": "date", "operation_type": "str", "output_per_day": "int",
+                   "staff_involved": "int", "cost": "float", "success_rate": "unit", "error_count": "int",
+                   "capacity_utilization": "unit", "status": "str"},
+    },
+    "partners": {
+        "key": "partner_id", "required": ("partner_id",),
+        "fields": {"partner_id": "str", "partner_name": "str", "partner_type": "str", "reliability": "str",
+                   "region": "str", "quality_score": "unit", "delivery_success": "unit", "cost_efficiency": "unit",
+                   "relationship_health": "unit", "monthly_volume": "float", "commission_rate": "unit", "notes": "str"},
+    },
+    "clients": {
+        "key": "client_id", "required": ("client_id",),
+        "fields": {"client_id": "str", "client_name": "str", "industry": "str", "status": "str", "region": "str",
+                   "acquisition_cost": "float", "lifetime_value": "float", "churn_risk": "unit"},
+        "choices": {"status": ("Active", "At Risk")},
+    },
+    "competitive": {
+        "key": "competitor_id", "required": ("competitor_id",),
+        "fields": {"competitor_id": "str", "competitor_name": "str", "market_share": "unit", "pricing_change": "float",
+                   "pricing_change_date": "date", "region": "str", "our_win_rate": "unit", "notes": "str",
+                   "threat_level": "str"},
+    },
+    "compliance": {
+        "key": "domain", "required": ("domain",),
+        "fields": {"domain": "str", "risk_level": "str", "compliance_score": "unit", "issues": "int", "notes": "str"},
+    },
+}
+
+# Envelope fields that are not part of the record. The target domain goes
+# in ``stream`` because ``domain`` is a compliance field.
+META_FIELDS = ("stream", "record", "ts")
+
+
+class IngestError(ValueError):
+    pass
+
+
+def _coerce(kind, value):
+    if kind == "str":
+        if not isinstance(value, (str, int)) or isinstance(value, bool) or not str(value).strip():
+            raise ValueError("expected a non-empty string")
+        return str(value).strip()
+    if kind == "date":
+        try:
+            return str(np.datetime64(str(value)[:10], "D"))
+        except ValueError:
+            raise ValueError("expected a YYYY-MM-DD date") from None
+    if kind == "id":
+        if isinstance(value, str):
+            value = re.sub(r"^\D+", "", value)
+        out = int(value)
+        if out < 0:
+            raise ValueError("expected a non-negative id")
+        return out
+    if isinstance(value, bool):
+        raise ValueError(f"expected {kind}, got a boolean")
+    out = float(value)
+    if not math.isfinite(out):
+        raise ValueError("expected a finite number")
+    if kind == "int":
+        if out != int(out):
+            raise ValueError("expected an integer")
+        return int(out)
+    if kind == "unit" and not 0.0 <= out <= 1.0:
+        raise ValueError("expected a value between 0 and 1")
+    return out
+
+
+def validate(event):
+    """
+    Checks one event against SCHEMAS and returns ``(domain, record)`` with
+    coerced values. Events are ``{"stream": domain, "record": {...}}`` or the
+    record's fields inline next to ``stream``; empty values are dropped.
+    Raises IngestError naming every problem found.
+    """
+    if not isinstance(event, dict):
+        raise IngestError("event is not an object")
+    domain = event.get("stream")
+    schema = SCHEMAS.get(domain)
+    if schema is None:
+        raise IngestError(f"unknown domain {domain!r}")
+    raw = event.get("record")
+    if raw is None:
+        raw = {k: v for k, v in event.items() if k not in META_FIELDS}
+    if not isinstance(raw, dict):
+        raise IngestError("record is not an object")
+
+    record, problems = {}, []
+    for field, value in raw.items():
+        kind = schema["fields"].get(field)
+        if kind is None:
+            problems.append(f"{field}: unknown field")
+            continue
+        if value is None or value == "":
+            continue
+        try:
+            record[field] = _coerce(kind, value)
+        except (TypeError, ValueError) as e:
+            problems.append(f"{field}: {e}")
+            continue
+        choices = schema.get("choices", {}).get(field)
+        if choices and record[field] not in choices:
+            problems.append(f"{field}: expected one of {', '.join(choices)}")
+    seen = {p.split(":", 1)[0] for p in problems}
+    problems += [f"{field}: required" for field in schema["required"] if field not in record and field not in seen]
+    if problems:
+        raise IngestError(f"{domain}: " + "; ".join(problems))
+    return domain, record
+
+
+# ---- applying batches -----------------------------------------------------
+
+def _empty_column(kind, n):
+    if kind == "date":
+        return np.full(n, np.datetime64("NaT"), dtype="datetime64[D]")
+    if kind in ("float", "unit", "int", "id"):
+        return np.full(n, np.nan)
+    return np.full(n, None, dtype=object)
+
+
+def _fits(arr, value):
+    kind = arr.dtype.kind
+    if kind in "iu":
+        return isinstance(value, int)
+    if kind == "f":
+        return isinstance(value, (int, float))
+    if kind == "b":
+        return isinstance(value, bool)
+    return kind in "OM"
+
+
+def _batch(table, records):
+    """Records as a table to append to ``table``, keeping its dtypes (e.g. integer counts) when the batch allows it."""
+    batch = ColumnarTable.from_records(records, categorical=tuple(table.categories))
+    columns = {name: batch.column(name) for name in batch.field_names}
+    for name, arr in columns.items():
+        if name in table and not table.is_categorical(name) and arr.dtype != table.column(name).dtype \
+                and arr.dtype.kind in "iuf" and table.column(name).dtype.kind in "iuf" and not np.isnan(arr.astype(np.float64)).any():
+            columns[name] = arr.astype(table.column(name).dtype)
+    formats = {name: fmt for name, fmt in table.formats.items() if name in columns}
+    return ColumnarTable(columns, batch.categories, formats)
+
+
+def _upsert(table, domain, records, kpis):
+    """Updates rows whose key exists in place (copy-on-write) and appends the rest."""
+    schema = SCHEMAS[domain]
+    key = schema["key"]
+    rows = {}
+    if len(table) and key in table:
+        rows = {str(k): i for i, k in enumerate(table.labels(key).tolist())}
+    latest = {}
+    for rec in records:
+        latest.setdefault(rec[key], {}).update(rec)
+    updates = {k: rec for k, rec in latest.items() if k in rows}
+    inserts = [rec for k, rec in latest.items() if k not in rows]
+
+    if updates:
+        columns = {name: table.column(name) for name in table.field_names}
+        categories = {name: list(labels) for name, labels in table.categories.items()}
+        changed = {}
+        for k, rec in updates.items():
+            for field, value in rec.items():
+                if field not in columns:
+                    columns[field] = _empty_column(schema["fields"][field], len(table))
+                if field not in changed:
+                    columns[field] = columns[field].copy()
+                    changed[field] = ([], [])
+                arr = columns[field]
+                if field in categories:
+                    labels = categories[field]
+                    if value not in labels:
+                        labels.append(value)
+                    value = labels.index(value)
+                    if value > np.iinfo(arr.dtype).max:
+                        arr = columns[field] = arr.astype(np.int32)
+                elif arr.dtype.kind == "M":
+                    value = np.datetime64(value, "D")
+                elif not _fits(arr, value):
+                    # e.g. a fractional value for an integer column.
+                    numeric = isinstance(value, (int, float)) and arr.dtype.kind in "iuf"
+                    arr = columns[field] = arr.astype(np.float64 if numeric else object)
+                idx = rows[k]
+                changed[field][0].append(idx)
+                changed[field][1].append(arr[idx])
+                arr[idx] = value
+        updated = ColumnarTable(columns, categories, table.formats)
+        if kpis is not None:
+            kpis.replace_table(domain, updated)
+            for field, (idx, old) in changed.items():
+                idx = np.asarray(idx)
+                kpis.update_column(domain, field, idx, np.asarray(old), updated.column(field)[idx])
+        table = updated
+
+    if inserts:
+        batch = _batch(table, inserts)
+        grown = table.append(batch)
+        if kpis is not None:
+            kpis.append_rows(domain, grown, batch)
+        table = grown
+    return table, len(updates), len(inserts)
+
+
+def _append(table, domain, records, kpis):
+    """Appends finance-style rows, numbering missing transaction ids after the current maximum."""
+    if "transaction_id" in table and len(table):
+        next_id = int(np.nanmax(table.column("transaction_id"))) + 1
+        for rec in records:
+            if "transaction_id" not in rec:
+                rec["transaction_id"] = next_id
+                next_id += 1
+    batch = _batch(table, records)
+    grown = table.append(batch)
+    if kpis is not None:
+        kpis.append_rows(domain, grown, batch)
+    return grown, 0, len(batch)
+
+
+def apply_records(current_data, records_by_domain, kpis=None):
+    """
+    Returns a copy of ``current_data`` with validated records merged in;
+    input tables are never modified. A KpiAggregator passed as ``kpis`` is
+    told about every change so its totals stay correct without a rescan.
+    Returns ``(data, counts)`` with updated/inserted rows per domain.
+    """
+    work = dict(current_data)
+    counts = {}
+    for domain, records in records_by_domain.items():
+        if not records:
+            continue
+        table = as_table(work.get(domain, []))
+        merge = _append if SCHEMAS[domain]["key"] is None else _upsert
+        work[domain], updated, inserted = merge(table, domain, [dict(r) for r in records], kpis)
+        counts[domain] = {"updated": updated, "inserted": inserted}
+    work["generated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return work, counts
+
+
+# ---- sources ----------------------------------------------------------------
+
+class FileTailer:
+    """
+    Follows a JSONL or CSV file, returning complete lines appended since the
+    last read. CSV rows go to ``domain``; JSONL lines name their own ``stream``. A file
+    that shrinks (rotated or truncated) is read again from the start.
+    """
+
+    def __init__(self, path, fmt=None, domain=None, from_start=True):
+        self.path = Path(path)
+        self.fmt = fmt or ("csv" if self.path.suffix.lower() == ".csv" else "jsonl")
+        self.domain = domain
+        self._offset = 0 if from_start else (self.path.stat().st_size if self.path.exists() else 0)
+        self._header = None
+        self.name = f"{self.fmt}:{self.path.name}"
+
+    def read(self, limit=BATCH_SIZE):
+        if not self.path.exists():
+            return []
+        if self.path.stat().st_size < self._offset:
+            self._offset, self._header = 0, None
+        events = []
+        with open(self.path, "rb") as fh:
+            if self.fmt == "csv" and self._header is None and self._offset:
+                self._parse(fh.readline().decode("utf-8").strip())
+            fh.seek(self._offset)
+            while len(events) < limit:
+                line = fh.readline()
+                if not line.endswith(b"\n"):
+                    break
+                self._offset += len(line)
+                text = line.decode("utf-8").strip()
+                if text:
+                    events.append(self._parse(text))
+        return events
+
+    def _parse(self, text):
+        if self.fmt == "jsonl":
+            try:
+                return json.loads(text)
+            except json.JSONDecodeError as e:
+                return {"_error": f"bad JSON: {e}"}
+        row = next(csv.reader(io.StringIO(text)))
+        if self._header is None:
+            self._header = row
+            return None
+        event = dict(zip(self._header, row))
+        event.setdefault("stream", self.domain)
+        return event
+
+
+class QueueSource:
+    """
+    In-process stand-in for a socket or message queue. Producers call
+    ``push``; it blocks (or returns False after ``timeout``) while the
+    source is full, which is how backpressure reaches them.
+    """
+
+    def __init__(self, maxsize=QUEUE_SIZE, name="queue"):
+        self._queue = queue.Queue(maxsize)
+        self.name = name
+
+    def push(self, event, timeout=None):
+        try:
+            self._queue.put(event, timeout=timeout)
+            return True
+        except queue.Full:
+            return False
+
+    def read(self, limit=BATCH_SIZE):
+        events = []
+        try:
+            events.append(self._queue.get(timeout=POLL_SECONDS))
+            while len(events) < limit:
+                events.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return events
+
+
+# ---- pipeline -----------------------------------------------------------------
+
+class IngestPipeline:
+    """
+    Pulls events from ``sources`` onto one bounded queue and applies them
+    to ``sink`` in micro-batches of up to ``batch_size`` events or
+    ``flush_seconds``. Events are validated before they reach the sink.
+
+    When the queue is full, source readers block. A file tailer then
+    stops reading and a QueueSource's producers block in turn. ``stats``
+    reports throughput, queue depth, time spent blocked and lag: enqueue
+    to apply, and event time (``ts``) to apply when events carry one.
+    """
+
+    def __init__(self, sink, sources=(), batch_size=BATCH_SIZE, flush_seconds=FLUSH_SECONDS, queue_size=QUEUE_SIZE):
+        self.sink = sink
+        self.sources = list(sources)
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue = queue.Queue(queue_size)
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._applied = deque()
+        self._errors = deque(maxlen=MAX_ERRORS)
+        self._stats = {"received": 0, "accepted": 0, "rejected": 0, "batches": 0, "failed_batches": 0,
+                       "blocked_seconds": 0.0, "lag_ms": None, "lag_ms_max": None, "event_lag_s": None}
+
+    def add_source(self, source):
+        self.sources.append(source)
+        if self._threads:
+            self._spawn(self._read_loop, source)
+
+    def _spawn(self, target, *args):
+        thread = threading.Thread(target=target, args=args, name=f"omnisight-ingest-{len(self._threads)}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def start(self):
+        if self._threads:
+            return self
+        self._stop.clear()
+        self._spawn(self._batch_loop)
+        for source in self.sources:
+            self._spawn(self._read_loop, source)
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _read_loop(self, source):
+        failing = False
+        while not self._stop.is_set():
+            try:
+                events = [e for e in source.read(self.batch_size) if e is not None]
+            except Exception as e:
+                # Keep polling (the file may come back); warn once per failure streak.
+                if not failing:
+                    print(f"⚠️ Ingest source {source.name} failed: {e}")
+                    self._errors.append(f"{source.name}: {e}")
+                failing = True
+                self._stop.wait(POLL_SECONDS)
+                continue
+            failing = False
+            if not events:
+                self._stop.wait(POLL_SECONDS)
+                continue
+            for event in events:
+                self.put(event)
+
+    def put(self, event, timeout=None):
+        """Enqueues one event, blocking while the queue is full; False if it timed out."""
+        item = (event, time.time())
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            started = time.time()
+            try:
+                while True:
+                    try:
+                        self._queue.put(item, timeout=POLL_SECONDS)
+                        break
+                    except queue.Full:
+                        if self._stop.is_set() or (timeout is not None and time.time() - started >= timeout):
+                            return False
+            finally:
+                with self._lock:
+                    self._stats["blocked_seconds"] += time.time() - started
+        with self._lock:
+            self._stats["received"] += 1
+        return True
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=POLL_SECONDS)]
+        except queue.Empty:
+            return []
+        deadline = time.time() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _batch_loop(self):
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = self._next_batch()
+            if batch:
+                self.process(batch)
+
+    @perf.timed("ingest.batch")
+    def process(self, batch):
+        """Validates and applies one batch of ``(event, enqueued_at)`` pairs."""
+        grouped, stamps, event_times, rejected = {}, [], [], 0
+        for event, enqueued in batch:
+            try:
+                if isinstance(event, dict) and "_error" in event:
+                    raise IngestError(event["_error"])
+                domain, record = validate(event)
+            except IngestError as e:
+                rejected += 1
+                self._errors.append(str(e))
+                continue
+            grouped.setdefault(domain, []).append(record)
+            stamps.append(enqueued)
+            if isinstance(event.get("ts"), (int, float)):
+                event_times.append(float(event["ts"]))
+        failed = False
+        if grouped:
+            try:
+                self.sink(grouped)
+            except Exception as e:
+                failed = True
+                self._errors.append(f"sink failed: {e}")
+        now = time.time()
+        with self._lock:
+            s = self._stats
+            s["batches"] += 1
+            s["rejected"] += rejected
+            if failed:
+                s["failed_batches"] += 1
+            elif stamps:
+                lags = (now - np.asarray(stamps)) * 1000
+                s["accepted"] += len(stamps)
+                s["lag_ms"] = round(float(np.median(lags)), 1)
+                s["lag_ms_max"] = round(float(lags.max()), 1)
+                if event_times:
+                    s["event_lag_s"] = round(now - max(event_times), 3)
+                self._applied.append((now, len(stamps)))
+            while self._applied and self._applied[0][0] < now - THROUGHPUT_WINDOW:
+                self._applied.popleft()
+
+    def stats(self):
+        with self._lock:
+            now = time.time()
+            recent = sum(n for t, n in self._applied if t >= now - THROUGHPUT_WINDOW)
+            return dict(
+                self._stats,
+                queue_depth=self._queue.qsize(), queue_capacity=self._queue.maxsize,
+                throughput_eps=round(recent / THROUGHPUT_WINDOW, 2),
+                sources=[s.name for s in self.sources], errors=list(self._errors)[-5:],
+            )
+
+
+def sources_from_env():
+    """
+    Sources listed in OMNISIGHT_INGEST, comma separated: ``path.jsonl``,
+    ``domain:path.csv`` or ``queue``. CSV entries without a known domain
+    prefix are skipped with a warning.
+    """
+    spec = os.getenv("OMNISIGHT_INGEST", "")
+    sources = []
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        if item == "queue":
+            sources.append(QueueSource())
+        elif item.lower().endswith(".csv"):
+            domain, _, path = item.partition(":")
+            if not path or domain not in SCHEMAS:
+                print(f"⚠️ OMNISIGHT_INGEST: skipping {item!r}; CSV sources are domain:path.csv, domain one of {', '.join(SCHEMAS)}")
+                continue
+            sources.append(FileTailer(path, "csv", domain=domain))
+        else:
+            sources.append(FileTailer(item))
+    return sources
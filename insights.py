@@ -0,0 +1,162 @@
+import threading
+import time
+
+import anomaly
+import perf
+from columnar import ColumnarTable, as_table
+from prompt_builder import summarize_domain
+
+MAX_VERSIONS = 4  # newest dataset versions kept; older entries are dropped
+TOP_K = 3
+CRITICAL_SCORE = 2 * anomaly.THRESHOLD
+TREND_WATCH_PCT = -10.0  # a trend falling further than this puts a domain on watch
+
+
+def domains(current_data):
+    return [k for k, v in current_data.items() if isinstance(v, (ColumnarTable, list))]
+
+
+def fmt_number(x):
+    """Compact display form of a metric: thousands separators when large, three significant digits otherwise."""
+    if x is None:
+        return "—"
+    return f"{x:,.0f}" if abs(x) >= 1000 else f"{x:,.3g}"
+
+
+def domain_insight(name, current_data):
+    """Health metrics, a compact summary and plain-text highlights for one domain."""
+    table = as_table(current_data[name])
+    summary = summarize_domain(name, table, top_k=TOP_K, detail=1)
+    flagged = anomaly.for_domain(current_data, name)
+    measure = summary.get("measure") or {}
+    trend = summary.get("trend") or {}
+    # Scores are signed (low anomalies are negative); strength is the magnitude.
+    top = max(flagged, key=lambda a: abs(a["score"])) if flagged else None
+
+    if top is not None and abs(top["score"]) >= CRITICAL_SCORE:
+        health = "Critical"
+    elif flagged or (trend.get("change_pct") is not None and trend["change_pct"] <= TREND_WATCH_PCT):
+        health = "Watch"
+    else:
+        health = "Healthy"
+
+    highlights = [f"{len(table):,} rows"]
+    if measure:
+        highlights.append(
+            f"{measure['field']} ({measure['where']}): total {fmt_number(measure['total'])}, mean {fmt_number(measure['mean'])}"
+        )
+    if trend.get("change_pct") is not None:
+        highlights.append(f"Last {trend['window_days']} days {trend['change_pct']:+.1f}% vs the {trend['window_days']} before")
+    for field, groups in (summary.get("by") or {}).items():
+        if groups:
+            label, group = next(iter(groups.items()))
+            highlights.append(f"Largest {field}: {label} ({fmt_number(group['total'])} over {group['rows']} rows)")
+    if top is not None:
+        highlights.append(
+            f"{len(flagged)} anomal{'y' if len(flagged) == 1 else 'ies'} flagged; strongest "
+            f"{top['series']} / {top['entity']} (score {top['score']:.1f}, {top['direction']})"
+        )
+
+    return {
+        "domain": name,
+        "health": health,
+        "metrics": {
+            "rows": len(table),
+            "measure": measure.get("field"),
+            "total": measure.get("total"),
+            "mean": measure.get("mean"),
+            "trend_pct": trend.get("change_pct"),
+            "anomalies": len(flagged),
+            "max_score": top["score"] if top is not None else None,
+        },
+        "highlights": highlights,
+        "summary": summary,
+        "anomalies": flagged,
+        "computed_at": time.time(),
+    }
+
+
+class InsightCache:
+    """
+    Per-domain insights keyed by (dataset version, domain), computed ahead
+    of time on one worker thread. The live hub submits every snapshot it
+    publishes, so the deep dive reads a ready entry when the viewer
+    switches domains. A miss (a version the worker has not reached yet)
+    is computed inline and cached, unless it is older than every version
+    kept.
+
+    Only the latest submission waits: a worker that falls behind skips
+    the intermediate versions rather than queueing them.
+    """
+
+    def __init__(self, max_versions=MAX_VERSIONS):
+        self.max_versions = max_versions
+        self._entries = {}  # version -> {domain: insight}
+        self._pending = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stats = {"precomputed": 0, "inline": 0, "hits": 0, "skipped": 0}
+
+    def submit(self, version, current_data):
+        """Queues ``current_data`` for precompute (replacing any version still waiting)."""
+        with self._cond:
+            if self._pending is not None:
+                self._stats["skipped"] += 1
+            self._pending = (version, current_data)
+            self._cond.notify()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="omnisight-insights", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                version, current_data = self._pending
+                self._pending = None
+            try:
+                with perf.span("insights.precompute"):
+                    for name in domains(current_data):
+                        if self._lookup(version, name) is None:
+                            self._store(version, name, domain_insight(name, current_data), "precomputed")
+            except Exception as e:
+                print(f"⚠️ Insight precompute failed: {e}")
+
+    def _lookup(self, version, name):
+        with self._cond:
+            return self._entries.get(version, {}).get(name)
+
+    def _store(self, version, name, insight, how):
+        with self._cond:
+            entry = self._entries.get(version)
+            if entry is None:
+                # A session still on an old snapshot must not push out a newer version.
+                if len(self._entries) >= self.max_versions and version < min(self._entries):
+                    self._stats[how] += 1
+                    return
+                entry = self._entries[version] = {}
+                while len(self._entries) > self.max_versions:
+                    del self._entries[min(self._entries)]
+            entry[name] = insight
+            self._stats[how] += 1
+
+    def get(self, version, name, current_data):
+        """Insight for ``name`` at ``version``; computed now if the worker has not got there."""
+        insight = self._lookup(version, name)
+        if insight is not None:
+            with self._cond:
+                self._stats["hits"] += 1
+            return insight
+        insight = domain_insight(name, current_data)
+        self._store(version, name, insight, "inline")
+        return insight
+
+    def ready(self, version):
+        """Domains already computed for ``version``."""
+        with self._cond:
+            return sorted(self._entries.get(version, {}))
+
+    def stats(self):
+        with self._cond:
+            return dict(self._stats, versions=len(self._entries))
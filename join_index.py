@@ -0,0 +1,301 @@
+import numpy as np
+
+from columnar import ColumnarTable
+from kpi_engine import RELIABLE_HEALTH
+
+AT_RISK = "At Risk"
+GLOBAL_REGION = "Global"
+MEASURES = ("clients", "revenue", "unpaid", "lifetime_value", "expected_loss")
+
+
+def _cols(current_data, domain, *fields):
+    """The raw column arrays a stage reads; ``None`` for anything missing."""
+    table = current_data.get(domain)
+    if not isinstance(table, ColumnarTable):
+        return (None,) * len(fields)
+    return tuple(table.column(f) if f in table else None for f in fields)
+
+
+def _table(current_data, domain):
+    table = current_data.get(domain)
+    return table if isinstance(table, ColumnarTable) and len(table) else None
+
+
+def _region_codes(table, regions):
+    """``table.region`` mapped onto the index's region list (-1 = unknown or global)."""
+    if "region" not in table:
+        return np.full(len(table), -1, dtype=np.int64)
+    lookup = np.array([regions.get(label, -1) for label in table.categories.get("region", [])] + [-1], dtype=np.int64)
+    return lookup[table.column("region")]
+
+
+def _float_col(table, field):
+    return table.column(field).astype(np.float64) if field in table else np.zeros(len(table))
+
+
+# ---- stages -------------------------------------------------------------
+# Each stage is recomputed only when one of its inputs (column arrays or
+# other stages' results) is replaced. The live hub forks just the drifted
+# columns, so a tick rebuilds the finance sums and the small per-client cube
+# while the id maps, row mappings and partner rollups carry over.
+
+def _dims(data):
+    clients = _table(data, "clients")
+    names = []
+    for domain in ("clients", "partners", "finance", "competitive"):
+        table = _table(data, domain)
+        if table is not None and table.is_categorical("region"):
+            names += [r for r in table.categories["region"] if r != GLOBAL_REGION and r not in names]
+    regions = {name: i for i, name in enumerate(names)}
+
+    n = len(clients) if clients is not None else 0
+    ids = [str(v) for v in clients.column("client_id")] if n and "client_id" in clients else []
+    statuses = list(clients.categories.get("status", [])) if n else []
+    competitors = {}
+    competitive = _table(data, "competitive")
+    if competitive is not None:
+        for row in competitive.to_records():
+            region = row.get("region")
+            entry = {
+                "id": row.get("competitor_id"), "name": row.get("competitor_name", row.get("competitor_id")),
+                "threat": row.get("threat_level"),
+                "regions": list(names) if region in (GLOBAL_REGION, None) else [region],
+            }
+            competitors[entry["name"]] = entry
+            if entry["id"]:
+                competitors[entry["id"]] = entry
+    return {
+        "regions": names, "region_index": regions, "statuses": statuses,
+        "clients": {cid: row for row, cid in enumerate(ids)},
+        "client_region": _region_codes(clients, regions) if n else np.empty(0, dtype=np.int64),
+        "client_status": clients.column("status").astype(np.int64) if n and "status" in clients else np.full(n, -1),
+        "competitors": competitors,
+    }
+
+
+def _finance_keys(data, dims):
+    """Row-level join of finance onto clients and regions; independent of amounts."""
+    finance = _table(data, "finance")
+    if finance is None:
+        return None
+    income = finance.eq("type", "Income")
+    rows = np.full(len(finance), -1, dtype=np.int64)
+    if "client_id" in finance and finance.is_categorical("client_id"):
+        to_client = np.array([dims["clients"].get(label, -1) for label in finance.categories["client_id"]] + [-1])
+        rows = to_client[finance.column("client_id")]
+    fin_region = _region_codes(finance, dims["region_index"])
+    linked = np.flatnonzero(income & (rows >= 0))
+    late = np.flatnonzero(income & (rows >= 0) & finance.eq("status", "Unpaid"))
+    regional = np.flatnonzero(income & (fin_region >= 0))
+    return {
+        "linked": linked, "linked_rows": rows[linked],
+        "late": late, "late_rows": rows[late],
+        "regional": regional, "regional_codes": fin_region[regional],
+    }
+
+
+def _finance_sums(data, dims, keys):
+    n, n_r = len(dims["clients"]), len(dims["regions"])
+    if keys is None or "amount" not in data["finance"]:
+        return {"revenue": np.zeros(n), "unpaid": np.zeros(n), "region_revenue": np.zeros(n_r)}
+    amount = data["finance"].column("amount")
+    return {
+        "revenue": np.bincount(keys["linked_rows"], weights=amount[keys["linked"]], minlength=n),
+        "unpaid": np.bincount(keys["late_rows"], weights=amount[keys["late"]], minlength=n),
+        "region_revenue": np.bincount(keys["regional_codes"], weights=amount[keys["regional"]], minlength=n_r),
+    }
+
+
+def _cube(data, dims, sums):
+    """Per-client measures and their (region, status) totals; None means "all"."""
+    clients = _table(data, "clients")
+    n = len(dims["clients"])
+    churn = _float_col(clients, "churn_risk") if n else np.zeros(0)
+    ltv = _float_col(clients, "lifetime_value") if n else np.zeros(0)
+    per_client = {"revenue": sums["revenue"], "unpaid": sums["unpaid"], "churn": churn, "ltv": ltv}
+
+    names, statuses = dims["regions"], dims["statuses"]
+    n_r, n_s = len(names), len(statuses)
+    region, status = dims["client_region"], dims["client_status"]
+    cell = np.where((region >= 0) & (status >= 0), region * n_s + status, -1)
+    valid = cell >= 0
+    weights = {"clients": None, "revenue": sums["revenue"], "unpaid": sums["unpaid"],
+               "lifetime_value": ltv, "expected_loss": sums["revenue"] * churn}
+    grid = {
+        name: np.bincount(cell[valid], weights=None if w is None else w[valid], minlength=n_r * n_s).reshape(n_r, n_s)
+        for name, w in weights.items()
+    }
+    cube = {}
+    for r in [None] + list(range(n_r)):
+        for s in [None] + list(range(n_s)):
+            key = (None if r is None else names[r], None if s is None else statuses[s])
+            sel = (slice(None) if r is None else r, slice(None) if s is None else s)
+            cube[key] = {name: float(np.sum(g[sel])) for name, g in grid.items()}
+    return {"cube": cube, "per_client": per_client}
+
+
+def _partners(data, dims):
+    partners = _table(data, "partners")
+    n_r = len(dims["regions"])
+    if partners is None:
+        return {}
+    code = _region_codes(partners, dims["region_index"])
+    known = code >= 0
+
+    def per_region(weights=None):
+        return np.bincount(code[known], weights=None if weights is None else weights[known], minlength=n_r)
+
+    count = per_region()
+    reliable = per_region((_float_col(partners, "relationship_health") >= RELIABLE_HEALTH).astype(np.float64))
+    quality = per_region(_float_col(partners, "quality_score"))
+    volume = per_region(_float_col(partners, "monthly_volume"))
+    return {
+        name: {
+            "partners": int(count[r]), "reliable_partners": int(reliable[r]), "monthly_volume": float(volume[r]),
+            "avg_quality": round(float(quality[r] / count[r]), 4) if count[r] else None,
+        }
+        for r, name in enumerate(dims["regions"])
+    }
+
+
+def _rollups(dims, sums, cube, partners):
+    out = {}
+    for r, name in enumerate(dims["regions"]):
+        everyone = cube["cube"][(name, None)]
+        at_risk = cube["cube"].get((name, AT_RISK), {})
+        out[name] = {
+            "clients": int(everyone["clients"]),
+            "at_risk_clients": int(at_risk.get("clients", 0)),
+            "client_revenue": everyone["revenue"],
+            "revenue_at_risk": at_risk.get("revenue", 0.0),
+            "expected_loss": everyone["expected_loss"],
+            "transaction_revenue": float(sums["region_revenue"][r]),
+            "competitors": sorted({c["name"] for c in dims["competitors"].values() if name in c["regions"]}),
+            **partners.get(name, {"partners": 0, "reliable_partners": 0, "monthly_volume": 0.0, "avg_quality": None}),
+        }
+    return out
+
+
+class JoinIndex:
+    """
+    Precomputed joins across clients, finance, partners and competitors:
+    hash maps by client_id, competitor and region, per-region rollups and a
+    (region x status) cube of client revenue.
+
+    ``refresh(data)`` returns the index for ``data``, reusing every stage
+    whose inputs are the same arrays as last time (itself when nothing
+    changed). An index is never mutated after ``refresh``, so a published
+    LiveSnapshot can carry one and every lookup is a dict read.
+    """
+
+    def __init__(self, memo=None):
+        self._memo = dict(memo or {})
+        self._results = {}
+
+    def _stage(self, name, deps, build):
+        cached = self._memo.get(name)
+        if cached is not None and len(cached[0]) == len(deps) and all(a is b for a, b in zip(cached[0], deps)):
+            value = cached[1]
+        else:
+            value = build()
+            self._memo[name] = (deps, value)
+        self._results[name] = value
+        return value
+
+    def refresh(self, current_data):
+        index = JoinIndex(self._memo)
+        d = current_data
+        dims = index._stage(
+            "dims",
+            _cols(d, "clients", "client_id", "status", "region")
+            + _cols(d, "competitive", "competitor_id", "competitor_name", "region", "threat_level")
+            + _cols(d, "partners", "region") + _cols(d, "finance", "region"),
+            lambda: _dims(d),
+        )
+        keys = index._stage("finance_keys", (dims,) + _cols(d, "finance", "client_id", "type", "status", "region"),
+                            lambda: _finance_keys(d, dims))
+        sums = index._stage("finance_sums", (dims, keys) + _cols(d, "finance", "amount"),
+                            lambda: _finance_sums(d, dims, keys))
+        cube = index._stage("cube", (dims, sums) + _cols(d, "clients", "churn_risk", "lifetime_value"),
+                            lambda: _cube(d, dims, sums))
+        partners = index._stage(
+            "partners", (dims,) + _cols(d, "partners", "region", "relationship_health", "quality_score", "monthly_volume"),
+            lambda: _partners(d, dims),
+        )
+        index._stage("rollups", (dims, sums, cube, partners), lambda: _rollups(dims, sums, cube, partners))
+        if self._results and all(index._results[k] is self._results.get(k) for k in index._results):
+            return self
+        return index
+
+    @property
+    def regions(self):
+        return list(self._results["dims"]["regions"]) if self._results else []
+
+    # ---- lookups --------------------------------------------------------
+
+    def client(self, client_id):
+        """Joined view of one client: revenue, unpaid income and competitors in its region."""
+        dims = self._results["dims"]
+        row = dims["clients"].get(client_id)
+        if row is None:
+            return None
+        v = self._results["cube"]["per_client"]
+        r, s = dims["client_region"][row], dims["client_status"][row]
+        region = dims["regions"][r] if r >= 0 else None
+        return {
+            "client_id": client_id, "region": region, "status": dims["statuses"][s] if s >= 0 else None,
+            "revenue": float(v["revenue"][row]), "unpaid": float(v["unpaid"][row]),
+            "churn_risk": float(v["churn"][row]), "lifetime_value": float(v["ltv"][row]),
+            "competitors": self._results["rollups"].get(region, {}).get("competitors", []),
+        }
+
+    def region(self, name):
+        return self._results["rollups"].get(name)
+
+    def competitor(self, name_or_id):
+        return self._results["dims"]["competitors"].get(name_or_id)
+
+    def revenue_at_risk(self, region=None, status=AT_RISK, competitor=None):
+        """
+        Client revenue, unpaid income, lifetime value and expected churn loss
+        for clients with ``status`` (None = any) in ``region`` (None = all),
+        optionally only where ``competitor`` (name or id) operates.
+        """
+        regions = [region] if region is not None else None
+        if competitor is not None:
+            entry = self.competitor(competitor)
+            present = entry["regions"] if entry else []
+            regions = [r for r in present if regions is None or r in regions]
+        keys = [(None, status)] if regions is None else [(r, status) for r in regions]
+        cube = self._results["cube"]["cube"]
+        totals = dict.fromkeys(MEASURES, 0.0)
+        for key in keys:
+            for name, value in cube.get(key, {}).items():
+                totals[name] += value
+        totals["clients"] = int(totals["clients"])
+        return dict(totals, regions=self.regions if regions is None else regions, status=status, competitor=competitor)
+
+    def summary(self):
+        """Compact cross-domain rollup stored on the dataset for prompts."""
+        exposure = {}
+        for entry in self._results["dims"]["competitors"].values():
+            name = entry["name"]
+            if name in exposure:
+                continue
+            at_risk = self.revenue_at_risk(competitor=name)
+            exposure[name] = {
+                "threat": entry["threat"], "regions": entry["regions"],
+                "revenue_at_risk": round(at_risk["revenue"], 2), "at_risk_clients": at_risk["clients"],
+                "client_revenue": round(self.revenue_at_risk(status=None, competitor=name)["revenue"], 2),
+            }
+        return {
+            "regions": {
+                name: {k: round(v, 2) if isinstance(v, float) else v for k, v in rollup.items()}
+                for name, rollup in self._results["rollups"].items()
+            },
+            "competitor_exposure": exposure,
+        }
+
+
+def build_index(current_data):
+    return JoinIndex().refresh(current_data)
@@ -0,0 +1,189 @@
+import numpy as np
+
+import perf
+from columnar import as_table
+
+DOMAINS = ("finance", "operations", "partners", "clients", "compliance")
+
+RELIABLE_HEALTH = 0.75
+ACTIVE_LINE_STATUSES = ("Active", "Degraded")
+
+
+# Each metric is a sum over one field of one domain. ``contrib`` maps the raw
+# column values (codes for categoricals) to per-row contributions and
+# ``where`` optionally restricts the rows that count; both are evaluated only
+# for the rows that change. Averages pair a NaN-skipping sum with a count of
+# the rows that have a value, so rows ingested without the field don't count.
+METRICS = {
+    "income_total": {
+        "domain": "finance", "field": "amount",
+        "contrib": lambda table, values: values.astype(np.float64),
+        "where": lambda table: table.eq("type", "Income"),
+    },
+    "active_lines": {
+        "domain": "operations", "field": "status",
+        "contrib": lambda table, values: np.isin(values, [table.code("status", s) for s in ACTIVE_LINE_STATUSES]),
+    },
+    "reliable_partners": {
+        "domain": "partners", "field": "relationship_health",
+        "contrib": lambda table, values: values >= RELIABLE_HEALTH,
+    },
+    "active_clients": {
+        "domain": "clients", "field": "status",
+        "contrib": lambda table, values: values == table.code("status", "Active"),
+    },
+    "churn_sum": {
+        "domain": "clients", "field": "churn_risk",
+        "contrib": lambda table, values: np.nan_to_num(values.astype(np.float64)),
+    },
+    "churn_count": {
+        "domain": "clients", "field": "churn_risk",
+        "contrib": lambda table, values: ~np.isnan(values.astype(np.float64)),
+    },
+    "compliance_sum": {
+        "domain": "compliance", "field": "compliance_score",
+        "contrib": lambda table, values: np.nan_to_num(values.astype(np.float64)),
+    },
+    "compliance_count": {
+        "domain": "compliance", "field": "compliance_score",
+        "contrib": lambda table, values: ~np.isnan(values.astype(np.float64)),
+    },
+}
+
+
+def _mean(table, field, default):
+    values = table.column(field).astype(np.float64) if field in table else np.empty(0)
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if len(values) else default
+
+
+def calc_kpis(current_data):
+    """Full-scan reference for ``KpiAggregator.snapshot`` (the benchmarks compare the two)."""
+    finance = as_table(current_data.get("finance", []))
+    ops = as_table(current_data.get("operations", []))
+    partners = as_table(current_data.get("partners", []))
+    clients = as_table(current_data.get("clients", []))
+    compliance = as_table(current_data.get("compliance", []))
+
+    total_rev_7d = finance.column("amount")[finance.eq("type", "Income")].sum() if "amount" in finance else 0.0
+    active_lines = np.count_nonzero(ops.isin("status", ACTIVE_LINE_STATUSES)) if "status" in ops else 0
+    reliable_partners = np.count_nonzero(partners.column("relationship_health") >= RELIABLE_HEALTH) if "relationship_health" in partners else 0
+    active_clients = np.count_nonzero(clients.eq("status", "Active"))
+
+    avg_compliance = _mean(compliance, "compliance_score", 1.0)
+    avg_churn = _mean(clients, "churn_risk", 0.0)
+
+    risk_score = round(((1 - avg_compliance) * 60 + (avg_churn * 40)) * 100, 2)
+
+    return {
+        "total_rev_7d": float(total_rev_7d),
+        "active_lines": int(active_lines),
+        "reliable_partners": int(reliable_partners),
+        "partners_total": int(max(len(partners), 1)),
+        "active_clients": int(active_clients),
+        "risk_score": float(risk_score),
+    }
+
+
+class KpiAggregator:
+    """
+    Running sums and counts behind the dashboard KPIs.
+
+    ``rebuild`` scans the dataset once; afterwards callers report mutations
+    through ``update_column`` (old and new values of the touched rows) or
+    ``append_rows`` and the totals are adjusted in O(changed rows).
+    ``snapshot`` returns the same dict as ``calc_kpis`` in O(1).
+    """
+
+    def __init__(self, current_data=None):
+        self._sources = {}
+        self._tables = {}
+        self._masks = {}
+        self._sums = dict.fromkeys(METRICS, 0.0)
+        self._counts = dict.fromkeys(DOMAINS, 0)
+        if current_data is not None:
+            self.rebuild(current_data)
+
+    def rebuild(self, current_data):
+        for domain in DOMAINS:
+            self._rebuild_domain(domain, current_data.get(domain, []))
+        return self
+
+    def sync(self, current_data):
+        """Rescans only the domains whose table object was replaced."""
+        for domain in DOMAINS:
+            table = current_data.get(domain, [])
+            if self._sources.get(domain) is not table:
+                self._rebuild_domain(domain, table)
+        return self
+
+    def _rebuild_domain(self, domain, table):
+        self._sources[domain] = table
+        table = self._tables[domain] = as_table(table)
+        self._counts[domain] = len(table)
+        for name, spec in METRICS.items():
+            if spec["domain"] != domain:
+                continue
+            self._masks[name] = spec["where"](table) if "where" in spec else None
+            self._sums[name] = self._metric_sum(name, table, table.column(spec["field"]) if spec["field"] in table else None)
+
+    def _metric_sum(self, name, table, values, index=slice(None)):
+        if values is None or not len(values):
+            return 0.0
+        contrib = METRICS[name]["contrib"](table, values)
+        mask = self._masks.get(name)
+        if mask is not None:
+            contrib = contrib[mask[index]]
+        return float(np.sum(contrib))
+
+    def update_column(self, domain, field, index, old, new):
+        """Applies a change of ``field`` on rows ``index`` from ``old`` to ``new``."""
+        table = self._tables.get(domain)
+        if table is None:
+            return
+        for name, spec in METRICS.items():
+            if spec["domain"] == domain and spec["field"] == field:
+                self._sums[name] += (
+                    self._metric_sum(name, table, np.asarray(new), index)
+                    - self._metric_sum(name, table, np.asarray(old), index)
+                )
+
+    def replace_table(self, domain, table):
+        """
+        Points ``domain`` at a copy-on-write fork of its table without a
+        rescan; only valid when the fork's changes are reported through
+        ``update_column``.
+        """
+        self._sources[domain] = table
+        self._tables[domain] = as_table(table)
+
+    def append_rows(self, domain, table, rows):
+        """Registers ``rows`` appended to ``domain``; ``table`` is the grown table."""
+        rows = as_table(rows)
+        start = self._counts.get(domain, 0)
+        self._sources[domain] = table
+        self._tables[domain] = as_table(table)
+        self._counts[domain] = start + len(rows)
+        for name, spec in METRICS.items():
+            if spec["domain"] != domain:
+                continue
+            if "where" in spec:
+                self._masks[name] = np.concatenate([self._masks[name], spec["where"](rows)])
+            if spec["field"] in rows:
+                self._sums[name] += self._metric_sum(name, rows, rows.column(spec["field"]), slice(start, None))
+
+    @perf.timed("kpis.snapshot")
+    def snapshot(self):
+        compliance = self._sums["compliance_count"]
+        churn = self._sums["churn_count"]
+        avg_compliance = self._sums["compliance_sum"] / compliance if compliance else 1.0
+        avg_churn = self._sums["churn_sum"] / churn if churn else 0.0
+        risk_score = round(((1 - avg_compliance) * 60 + (avg_churn * 40)) * 100, 2)
+        return {
+            "total_rev_7d": float(self._sums["income_total"]),
+            "active_lines": int(round(self._sums["active_lines"])),
+            "reliable_partners": int(round(self._sums["reliable_partners"])),
+            "partners_total": int(max(self._counts["partners"], 1)),
+            "active_clients": int(round(self._sums["active_clients"])),
+            "risk_score": float(risk_score),
+        }
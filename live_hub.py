@@ -0,0 +1,271 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+import data_generator
+import perf
+from anomaly import AnomalyMonitor
+from columnar import ColumnarTable
+from drift import DriftStage
+from ingest import IngestPipeline, apply_records, sources_from_env
+from insights import InsightCache
+from join_index import JoinIndex
+from kpi_engine import KpiAggregator
+from storage import get_store
+from timeseries import DEFAULT_CAPACITY, TimeSeriesStore
+from versioning import VersionedDataset
+
+REFRESH_SECONDS = 5
+IDLE_SECONDS = 60.0
+SAVE_EVERY = 12  # ticks between dataset saves when a store is attached
+
+# History signal name -> KPI it records every tick.
+SERIES_SIGNALS = {
+    "revenue": "total_rev_7d",
+    "risk": "risk_score",
+    "active_lines": "active_lines",
+    "reliable_partners": "reliable_partners",
+    "active_clients": "active_clients",
+}
+
+
+class LiveSnapshot:
+    """
+    One published state of the live dataset. Snapshots are never mutated
+    after publication, so any number of sessions can read the same one.
+    ``data`` is a VersionedDataset at the snapshot's version.
+    """
+
+    def __init__(self, version, data, kpis, history, refreshed_at=None, joins=None):
+        self.version = version
+        self.data = data
+        self.kpis = kpis
+        self.joins = joins
+        self.history = history
+        self.history_end = history.count
+        self.refreshed_at = refreshed_at
+
+    def window(self, names=None, **kwargs):
+        """History as of this snapshot (see TimeSeriesStore.window)."""
+        return self.history.window(names, end=self.history_end, **kwargs)
+
+    @property
+    def refreshed_label(self):
+        return self.refreshed_at.strftime("%H:%M:%S") if self.refreshed_at else None
+
+
+class LiveDataHub:
+    """
+    Process-wide live dataset shared by every Streamlit session.
+
+    A single background thread drifts the data every ``refresh_seconds``
+    and publishes a new LiveSnapshot. Each tick forks only the columns the
+    drift rules touch (copy-on-write), so earlier snapshots stay valid
+    while unchanged columns are shared between them. The ticker pauses
+    when no session has checked in for ``idle_seconds``.
+
+    With a DatasetStore attached, startup opens the saved dataset (memory-
+    mapped) instead of generating one, history is replayed from the tick
+    log, every tick is logged and the data is saved every ``save_every``
+    ticks.
+
+    With an InsightCache attached, every published snapshot is handed to
+    it for per-domain precompute.
+    """
+
+    def __init__(self, data_factory=None, refresh_seconds=REFRESH_SECONDS, history_points=DEFAULT_CAPACITY,
+                 idle_seconds=IDLE_SECONDS, drift_stage=None, store=None, save_every=SAVE_EVERY, insights=None):
+        self.data_factory = data_factory or data_generator.generate_full_dataset
+        self.refresh_seconds = refresh_seconds
+        self.history_points = history_points
+        self.idle_seconds = idle_seconds
+        self._drift_stage = drift_stage
+        self.store = store
+        self.save_every = save_every
+        self.insights = insights
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self.ticks = 0
+        self.ingest_pipeline = None
+        self.next_tick_at = time.time() + refresh_seconds
+        if store is not None and store.exists():
+            with perf.span("storage.load"):
+                data, version = store.load()
+            last = store.log.last_version()
+            self._load(data, max(version, last or 0), replay=True)
+        else:
+            with perf.span("data.generate"):
+                data = self.data_factory()
+            self._load(data)
+            self._save(reset=True)
+
+    def _load(self, data, version=0, replay=False):
+        self._kpis = KpiAggregator(data)
+        self._drift = self._drift_stage or DriftStage()
+        self._history = TimeSeriesStore(self.history_points, signals=SERIES_SIGNALS)
+        if replay:
+            for _, t, values in self.store.log.replay(self.history_points):
+                self._history.append(t, values)
+        self._anomalies = AnomalyMonitor()
+        self._anomalies.observe(data)
+        data["anomalies"] = self._anomalies.summary()
+        self._joins = JoinIndex().refresh(data)
+        data["joins"] = self._joins.summary()
+        data = VersionedDataset(data, version)
+        self._snapshot = LiveSnapshot(version, data, self._kpis.snapshot(), self._history, joins=self._joins)
+        self._precompute(self._snapshot)
+
+    def snapshot(self):
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def _fork(self, data):
+        work = dict(data)
+        for rule in self._drift.rules:
+            table = work.get(rule.domain)
+            if isinstance(table, ColumnarTable) and rule.field in table:
+                work[rule.domain] = table.with_columns({rule.field: table.column(rule.field).copy()})
+                self._kpis.replace_table(rule.domain, work[rule.domain])
+        return work
+
+    def tick(self):
+        """Drifts a fork of the current data and publishes it as a new snapshot."""
+        with self._lock, perf.span("hub.tick"):
+            current = self._snapshot
+            with perf.span("hub.drift"):
+                data = self._drift.apply(self._fork(current.data), self._kpis)
+            with perf.span("hub.anomalies"):
+                self._anomalies.observe(data)
+                data["anomalies"] = self._anomalies.summary()
+            with perf.span("hub.joins"):
+                self._joins = self._joins.refresh(data)
+                data["joins"] = self._joins.summary()
+            kpis = self._kpis.snapshot()
+            now = datetime.now()
+            self._history.append(now.timestamp(), {name: kpis[kpi] for name, kpi in SERIES_SIGNALS.items()})
+            data = VersionedDataset(data, current.version + 1, parent=current.data)
+            self._snapshot = LiveSnapshot(current.version + 1, data, kpis, self._history, now, self._joins)
+            self.ticks += 1
+            snap = self._snapshot
+        self._precompute(snap)
+        if self.store is not None:
+            self._persist(snap)
+        return snap
+
+    def ingest(self, records_by_domain):
+        """
+        Merges validated records (see ingest.validate) into a fork of the
+        current data and publishes it; KPIs are adjusted incrementally.
+        """
+        with self._lock, perf.span("hub.ingest"):
+            current = self._snapshot
+            data, _ = apply_records(current.data, records_by_domain, self._kpis)
+            self._kpis.sync(data)
+            self._joins = self._joins.refresh(data)
+            data["joins"] = self._joins.summary()
+            data = VersionedDataset(data, current.version + 1, parent=current.data)
+            self._snapshot = LiveSnapshot(current.version + 1, data, self._kpis.snapshot(), self._history,
+                                          datetime.now(), self._joins)
+            snap = self._snapshot
+        self._precompute(snap)
+        return snap
+
+    def _precompute(self, snap):
+        if self.insights is not None:
+            self.insights.submit(snap.version, snap.data)
+
+    def reset(self, data=None):
+        with self._lock:
+            self._load(data if data is not None else self.data_factory(), self._snapshot.version + 1)
+            self.next_tick_at = time.time() + self.refresh_seconds
+        self._save(reset=True)
+        return self._snapshot
+
+    # ---- persistence --------------------------------------------------
+
+    def _persist(self, snap):
+        try:
+            with perf.span("storage.tick_log"):
+                self.store.log.append(snap.version, snap.refreshed_at.timestamp(),
+                                      {name: snap.kpis[kpi] for name, kpi in SERIES_SIGNALS.items()})
+            if self.save_every and snap.version % self.save_every == 0:
+                with perf.span("storage.save"):
+                    self.store.save(snap.data, snap.version)
+        except Exception as e:
+            # A full disk must not stop the ticker; the next save retries.
+            print(f"⚠️ Live data not persisted: {e}")
+
+    def _save(self, reset=False):
+        """Saves the current snapshot now (and logs a reset so history replay starts here)."""
+        if self.store is None:
+            return
+        snap = self._snapshot
+        self.store.save(snap.data, snap.version)
+        if reset:
+            self.store.log.mark_reset(snap.version)
+
+    # ---- subscribers / ticker -----------------------------------------
+
+    def subscribe(self, session_id):
+        """Registers (or refreshes) a viewing session and makes sure the ticker runs."""
+        with self._lock:
+            self._subscribers[session_id] = time.time()
+        self.start()
+        return self._snapshot
+
+    def unsubscribe(self, session_id):
+        with self._lock:
+            self._subscribers.pop(session_id, None)
+
+    def subscribers(self):
+        cutoff = time.time() - self.idle_seconds
+        with self._lock:
+            for sid in [s for s, seen in self._subscribers.items() if seen < cutoff]:
+                del self._subscribers[sid]
+            return len(self._subscribers)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self.next_tick_at = time.time() + self.refresh_seconds
+            self._thread = threading.Thread(target=self._run, name="omnisight-live-hub", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._save()
+
+    def _run(self):
+        while not self._stop.wait(max(0.0, self.next_tick_at - time.time())):
+            self.next_tick_at = time.time() + self.refresh_seconds
+            if self.subscribers():
+                self.tick()
+
+
+_hubs = {}
+_hubs_lock = threading.Lock()
+
+
+def get_hub(name="default", **kwargs):
+    """Process-wide hub per dataset name; ``kwargs`` only apply on first use."""
+    with _hubs_lock:
+        hub = _hubs.get(name)
+        if hub is None:
+            kwargs.setdefault("refresh_seconds", float(os.getenv("OMNISIGHT_REFRESH_SECONDS", REFRESH_SECONDS)))
+            kwargs.setdefault("history_points", int(os.getenv("OMNISIGHT_HISTORY_POINTS", DEFAULT_CAPACITY)))
+            kwargs.setdefault("store", get_store(name))
+            kwargs.setdefault("save_every", int(os.getenv("OMNISIGHT_SAVE_EVERY", SAVE_EVERY)))
+            kwargs.setdefault("insights", InsightCache())
+            hub = _hubs[name] = LiveDataHub(**kwargs)
+            sources = sources_from_env()
+            if sources:
+                hub.ingest_pipeline = IngestPipeline(hub.ingest, sources).start()
+        return hub
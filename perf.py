@@ -0,0 +1,229 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+SAMPLES = 2048  # most recent durations kept per span for percentiles
+EXPORT_SECONDS = 10.0
+PREFIX = "omnisight"
+
+
+class _Histogram:
+    """Count/total/max since start plus a ring of the latest SAMPLES durations."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self._ring = np.empty(SAMPLES)
+
+    def add(self, seconds, failed=False):
+        self._ring[self.count % SAMPLES] = seconds
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if failed:
+            self.errors += 1
+
+    def summary(self):
+        recent = self._ring[:min(self.count, SAMPLES)]
+        p50, p95, p99 = np.percentile(recent, (50, 95, 99)) if len(recent) else (0.0, 0.0, 0.0)
+        return {
+            "count": self.count, "errors": self.errors,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(p50 * 1000, 3), "p95_ms": round(p95 * 1000, 3), "p99_ms": round(p99 * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Recorder:
+    """
+    Spans, counters and per-span latency percentiles for one process.
+
+    While disabled ``span`` returns a shared no-op context manager and
+    ``count`` returns immediately, so instrumented hot paths pay one
+    attribute check.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._spans = {}
+        self._counters = {}
+        self.started = time.time()
+
+    def span(self, name):
+        if not self.enabled:
+            return _NOOP
+        return self._span(name)
+
+    @contextmanager
+    def _span(self, name):
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, failed)
+
+    def observe(self, name, seconds, failed=False):
+        with self._lock:
+            hist = self._spans.get(name)
+            if hist is None:
+                hist = self._spans[name] = _Histogram()
+            hist.add(seconds, failed)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "since": self.started,
+                "spans": {name: hist.summary() for name, hist in sorted(self._spans.items())},
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    # ---- export -------------------------------------------------------
+
+    def prometheus_text(self):
+        """Prometheus text exposition: a summary per span and a counter per counter."""
+        snap = self.snapshot()
+        lines = [
+            f"# HELP {PREFIX}_span_seconds Duration of instrumented stages.",
+            f"# TYPE {PREFIX}_span_seconds summary",
+        ]
+        for name, s in snap["spans"].items():
+            label = f'span="{_escape(name)}"'
+            for q, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+                lines.append(f'{PREFIX}_span_seconds{{{label},quantile="{q}"}} {s[key] / 1000:.9g}')
+            lines.append(f"{PREFIX}_span_seconds_sum{{{label}}} {s['total_ms'] / 1000:.9g}")
+            lines.append(f"{PREFIX}_span_seconds_count{{{label}}} {s['count']}")
+        lines += [f"# HELP {PREFIX}_events_total Instrumented event counters.", f"# TYPE {PREFIX}_events_total counter"]
+        for name, value in snap["counters"].items():
+            lines.append(f'{PREFIX}_events_total{{name="{_escape(name)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def export_file(self, path):
+        """Writes the snapshot as JSON (or Prometheus text for a ``.prom`` path), atomically."""
+        path = Path(path)
+        text = self.prometheus_text() if path.suffix == ".prom" else json.dumps(self.snapshot(), indent=1)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _serve(recorder, port):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = recorder.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, name="omnisight-perf-http", daemon=True).start()
+    return server
+
+
+def _export_loop(recorder, path, every):
+    while True:
+        time.sleep(every)
+        try:
+            recorder.export_file(path)
+        except OSError:
+            pass
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    """
+    Process-wide Recorder. OMNISIGHT_PERF=1 enables it; OMNISIGHT_PERF_FILE
+    exports every EXPORT_SECONDS and OMNISIGHT_PERF_PORT serves Prometheus
+    text on localhost.
+    """
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                recorder = Recorder(enabled=os.getenv("OMNISIGHT_PERF", "").lower() in ("1", "true", "yes", "on"))
+                if recorder.enabled and os.getenv("OMNISIGHT_PERF_FILE"):
+                    threading.Thread(
+                        target=_export_loop, args=(recorder, os.getenv("OMNISIGHT_PERF_FILE"), EXPORT_SECONDS),
+                        name="omnisight-perf-export", daemon=True,
+                    ).start()
+                if recorder.enabled and os.getenv("OMNISIGHT_PERF_PORT"):
+                    try:
+                        _serve(recorder, int(os.getenv("OMNISIGHT_PERF_PORT")))
+                    except OSError as e:
+                        print(f"⚠️ Perf endpoint not started: {e}")
+                _recorder = recorder
+    return _recorder
+
+
+def span(name):
+    return get_recorder().span(name)
+
+
+def count(name, n=1):
+    get_recorder().count(name, n)
+
+
+def timed(name=None):
+    """Decorator; checks whether recording is enabled on every call, not at import."""
+    def wrap(fn):
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            with get_recorder().span(label):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
@@ -0,0 +1,277 @@
+import json
+
+import numpy as np
+
+import perf
+from columnar import ColumnarTable, as_table, json_default
+from versioning import VersionMemo
+
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 2500
+DEFAULT_TOP_K = 5
+
+# How each domain is condensed. ``value`` is the headline measure, ``where``
+# restricts it to a subset of rows, ``group_by`` fields get per-label rollups,
+# ``trend`` compares the latest ``days`` against the window before it, and
+# ``rank`` picks the outlier rows (``zscore`` = furthest from the mean).
+DOMAIN_SPECS = {
+    "finance": {
+        "value": "amount", "where": ("type", "Income"), "group_by": ("region", "status", "client_id"),
+        "trend": ("sum", 7), "rank": "zscore",
+    },
+    "operations": {"value": "success_rate", "trend": ("mean", 3), "rank": "asc"},
+    "partners": {"value": "quality_score", "group_by": ("region",), "rank": "asc"},
+    "clients": {"value": "churn_risk", "group_by": ("region", "status"), "rank": "desc"},
+    "competitive": {"value": "pricing_change", "rank": "asc"},
+    "compliance": {"value": "compliance_score", "rank": "asc"},
+}
+
+
+def estimate_tokens(obj):
+    text = obj if isinstance(obj, str) else json.dumps(obj, ensure_ascii=False, default=json_default)
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _num(x):
+    x = float(x)
+    if not np.isfinite(x):
+        return None
+    return round(x, 4) if abs(x) < 1000 else round(x, 2)
+
+
+def _numeric_fields(table):
+    return [
+        name for name in table.field_names
+        if not table.is_categorical(name) and name not in table.formats
+        and table.column(name).dtype.kind in "fiu"
+    ]
+
+
+def _rollup(table, field, values, mask, top_k):
+    codes = table.column(field)
+    labels = table.categories[field]
+    valid = mask & (codes >= 0)
+    sums = np.bincount(codes[valid], weights=values[valid], minlength=len(labels))
+    counts = np.bincount(codes[valid], minlength=len(labels))
+    order = np.argsort(-sums)[:top_k]
+    return {labels[i]: {"total": _num(sums[i]), "rows": int(counts[i])} for i in order if counts[i]}
+
+
+def _trend(table, spec, values, mask):
+    how, days = spec["trend"]
+    if "date" not in table or not len(table):
+        return None
+    dates = table.column("date")
+    latest = dates[mask].max() if mask.any() else None
+    if latest is None:
+        return None
+    recent = mask & (dates > latest - np.timedelta64(days, "D"))
+    prior = mask & (dates <= latest - np.timedelta64(days, "D")) & (dates > latest - np.timedelta64(2 * days, "D"))
+    agg = np.sum if how == "sum" else np.mean
+    now = agg(values[recent]) if recent.any() else 0.0
+    before = agg(values[prior]) if prior.any() else None
+    out = {"window_days": days, how: _num(now)}
+    if before:
+        out["previous"] = _num(before)
+        out["change_pct"] = _num((now - before) / abs(before) * 100)
+    return out
+
+
+def _outliers(table, values, mask, rank, top_k):
+    idx = np.flatnonzero(mask)
+    if not top_k or not len(idx):
+        return []
+    vals = values[idx]
+    if rank == "zscore":
+        std = vals.std()
+        score = -np.abs(vals - vals.mean()) / (std if std else 1.0)
+    elif rank == "desc":
+        score = -vals
+    else:
+        score = vals
+    k = min(top_k, len(idx))
+    pick = np.argpartition(score, k - 1)[:k]
+    pick = pick[np.argsort(score[pick])]
+    return table.take(idx[pick]).to_records()
+
+
+def summarize_domain(name, data, top_k=DEFAULT_TOP_K, detail=2):
+    """
+    Fixed-size summary of one domain: row count, numeric stats, category
+    counts, rollups, trend and the ``top_k`` most notable rows. ``detail``
+    (0-2) drops the per-field stats first when squeezing into a budget.
+    """
+    if isinstance(data, dict) and isinstance(data.get("items"), list):
+        # Pre-ranked findings (e.g. anomalies): keep the strongest ``top_k``.
+        return dict(data, items=data["items"][:top_k])
+    if not isinstance(data, (ColumnarTable, list)):
+        return data
+    table = as_table(data)
+    spec = DOMAIN_SPECS.get(name, {})
+    summary = {"rows": len(table)}
+    if not len(table):
+        return summary
+
+    if detail >= 2:
+        stats = {}
+        for field in _numeric_fields(table):
+            col = table.column(field).astype(np.float64)
+            finite = col[np.isfinite(col)]
+            if len(finite):
+                stats[field] = {"mean": _num(finite.mean()), "min": _num(finite.min()), "max": _num(finite.max())}
+        summary["stats"] = stats
+    if detail >= 1:
+        counts = {}
+        for field, labels in table.categories.items():
+            if field in spec.get("group_by", ()) and len(labels) > top_k:
+                continue
+            tally = np.bincount(table.column(field)[table.column(field) >= 0], minlength=len(labels))
+            counts[field] = {labels[i]: int(tally[i]) for i in np.argsort(-tally)[:max(top_k, 8)] if tally[i]}
+        summary["counts"] = counts
+
+    value = spec.get("value")
+    if value in table:
+        values = table.column(value).astype(np.float64)
+        mask = table.eq(*spec["where"]) if spec.get("where") else np.ones(len(table), dtype=bool)
+        mask &= np.isfinite(values)
+        summary["measure"] = {
+            "field": value,
+            "where": "=".join(spec["where"]) if spec.get("where") else "all",
+            "total": _num(values[mask].sum()),
+            "mean": _num(values[mask].mean()) if mask.any() else None,
+        }
+        rollups = {
+            field: _rollup(table, field, values, mask, top_k)
+            for field in spec.get("group_by", ()) if table.is_categorical(field)
+        }
+        if rollups:
+            summary["by"] = rollups
+        if spec.get("trend"):
+            trend = _trend(table, spec, values, mask)
+            if trend:
+                summary["trend"] = trend
+        summary["outliers"] = _outliers(table, values, mask, spec.get("rank", "zscore"), top_k)
+    else:
+        summary["sample"] = table[:top_k]
+    return summary
+
+
+_compact_memo = VersionMemo()
+
+
+def compact_state(state, token_budget=DEFAULT_TOKEN_BUDGET, top_k=DEFAULT_TOP_K, extras=None):
+    """
+    Turns the full dataset into per-domain aggregates whose size does not
+    depend on row counts, shrinking ``top_k`` and then detail until the
+    JSON fits ``token_budget`` (estimated at CHARS_PER_TOKEN chars/token).
+    Versioned datasets are compacted once per version; the result is shared.
+    """
+    extras_key = json.dumps(extras, sort_keys=True, default=json_default) if extras else None
+    return _compact_memo.get(
+        state, lambda: _compact_state(state, token_budget, top_k, extras), token_budget, top_k, extras_key,
+    )
+
+
+@perf.timed("prompt.compact")
+def _compact_state(state, token_budget, top_k, extras):
+    extras = extras or {}
+    detail = 2
+    while True:
+        compact = {
+            name: summarize_domain(name, data, top_k=top_k, detail=detail)
+            for name, data in state.items()
+        }
+        compact.update(extras)
+        if estimate_tokens(compact) <= token_budget:
+            return compact
+        if top_k > 1:
+            top_k //= 2
+        elif detail > 0:
+            detail -= 1
+        elif top_k:
+            top_k = 0
+        else:
+            return compact
+
+
+def prompt_json(state, token_budget=DEFAULT_TOKEN_BUDGET, **kwargs):
+    return json.dumps(compact_state(state, token_budget, **kwargs), ensure_ascii=False, default=json_default)
+
+
+DELTA_TOLERANCE = 0.05
+DELETED = "$del"  # delta key listing the keys that disappeared; a None value is just a value
+
+
+def _moved(old, new, tolerance):
+    numbers = (int, float)
+    if isinstance(old, numbers) and isinstance(new, numbers) and not isinstance(old, bool) and not isinstance(new, bool):
+        return abs(new - old) > tolerance * max(abs(old), abs(new))
+    if isinstance(old, dict) and isinstance(new, dict):
+        return bool(state_delta(old, new, tolerance))
+    if isinstance(old, list) and isinstance(new, list):
+        return len(old) != len(new) or any(_moved(a, b, tolerance) for a, b in zip(old, new))
+    return old != new
+
+
+def _record_ids(records):
+    """Identity (first field) of each record, or None unless all are dicts with distinct ids."""
+    if not records or not all(isinstance(r, dict) and r for r in records):
+        return None
+    ids = [next(iter(r.values())) for r in records]
+    if not all(isinstance(i, str) for i in ids) or len(set(ids)) != len(ids):
+        return None
+    return ids
+
+
+def _list_delta(old, new, tolerance):
+    ids = _record_ids(new)
+    if ids is None or ids != _record_ids(old):
+        return new
+    # Same rows in the same order: only their moved fields, keyed by id.
+    return {i: state_delta(a, b, tolerance) for i, a, b in zip(ids, old, new) if _moved(a, b, tolerance)}
+
+
+def state_delta(previous, current, tolerance=DELTA_TOLERANCE):
+    """
+    What changed between two compact states: nested keys whose value moved
+    by more than ``tolerance`` (relative), and the keys that disappeared
+    listed under ``DELETED``. A list of records that kept its rows becomes
+    ``{id: changed fields}``; any other changed list is sent whole.
+    Empty when nothing material moved.
+    """
+    delta = {}
+    for key, new in current.items():
+        old = previous.get(key)
+        if key not in previous:
+            delta[key] = new
+        elif isinstance(new, dict) and isinstance(old, dict):
+            sub = state_delta(old, new, tolerance)
+            if sub:
+                delta[key] = sub
+        elif _moved(old, new, tolerance):
+            if isinstance(new, list) and isinstance(old, list):
+                delta[key] = _list_delta(old, new, tolerance)
+            else:
+                delta[key] = _num(new) if isinstance(new, float) else new
+    removed = [key for key in previous if key not in current]
+    if removed:
+        delta[DELETED] = removed
+    return delta
+
+
+def apply_delta(state, delta):
+    """Inverse of ``state_delta``: ``state`` as updated by ``delta``."""
+    merged = dict(state)
+    for key in delta.get(DELETED, ()):
+        merged.pop(key, None)
+    for key, value in delta.items():
+        old = merged.get(key)
+        if key == DELETED:
+            continue
+        if isinstance(value, dict) and isinstance(old, dict):
+            merged[key] = apply_delta(old, value)
+        elif isinstance(value, dict) and isinstance(old, list) and _record_ids(old):
+            merged[key] = [apply_delta(r, value.get(i, {})) for i, r in zip(_record_ids(old), old)]
+        else:
+            merged[key] = value
+    return merged
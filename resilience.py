@@ -0,0 +1,216 @@
+import random
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Transient failures worth retrying (matched by class name so the google
+# client libraries stay an optional import here).
+RETRYABLE_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded",
+    "InternalServerError", "GatewayTimeout", "Aborted",
+}
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class RateLimitedError(RuntimeError):
+    pass
+
+
+def is_retryable(exc):
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    return type(exc).__name__ in RETRYABLE_ERRORS
+
+
+def backoff_delays(retries, base=0.5, factor=2.0, max_delay=8.0, rng=random):
+    """Full-jitter exponential backoff: attempt ``n`` sleeps U(0, min(max, base * factor**n))."""
+    for attempt in range(retries):
+        yield rng.uniform(0.0, min(max_delay, base * factor ** attempt))
+
+
+class TokenBucket:
+    """Allows ``rate`` calls per second on average with bursts up to ``capacity``."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    def acquire(self, max_wait=0.0):
+        """Takes a token, waiting up to ``max_wait`` seconds; raises RateLimitedError otherwise."""
+        deadline = self._clock() + max_wait
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate if self.rate else float("inf")
+            if self._clock() + wait > deadline:
+                raise RateLimitedError("local rate limit reached")
+            self._sleep(wait)
+
+    @property
+    def tokens(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failures, rejects calls for
+    ``reset_timeout`` seconds, then lets a single trial call through
+    (half-open) and closes again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self):
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def cancel_trial(self):
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = self._clock()
+
+    def retry_in(self):
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+
+class ResilientCaller:
+    """
+    Runs a call through a rate limiter, retries transient errors with
+    jittered backoff, and trips a circuit breaker on repeated failure.
+    """
+
+    def __init__(self, bucket=None, breaker=None, retries=3, max_wait=5.0,
+                 backoff_base=0.5, backoff_max=8.0, sleep=time.sleep):
+        self.bucket = bucket
+        self.breaker = breaker or CircuitBreaker()
+        self.retries = retries
+        self.max_wait = max_wait
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "successes": 0, "failures": 0, "retries": 0, "rejected": 0, "rate_limited": 0}
+        self.last_error = None
+
+    def _count(self, name, error=None):
+        with self._lock:
+            self._stats[name] += 1
+            if error is not None:
+                self.last_error = f"{type(error).__name__}: {error}"
+
+    def call(self, fn, *args, **kwargs):
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError(f"circuit open, retrying in {self.breaker.retry_in():.0f}s")
+        delays = backoff_delays(self.retries, self.backoff_base, max_delay=self.backoff_max)
+        delay = None
+        while True:
+            try:
+                if delay:
+                    self._sleep(delay)
+                if self.bucket is not None:
+                    self.bucket.acquire(self.max_wait)
+                result = fn(*args, **kwargs)
+            except RateLimitedError as e:
+                # Our own limiter said no: not the model's fault, so the breaker is untouched.
+                self.breaker.cancel_trial()
+                self._count("rate_limited", e)
+                raise
+            except Exception as e:
+                delay = next(delays, None) if is_retryable(e) else None
+                if delay is None:
+                    self.breaker.record_failure()
+                    self._count("failures", e)
+                    raise
+                self._count("retries", e)
+                continue
+            except BaseException:
+                # Interrupted mid-call or mid-backoff: free the half-open trial for the next caller.
+                self.breaker.cancel_trial()
+                raise
+            self.breaker.record_success()
+            self._count("successes")
+            return result
+
+    def record_failure(self, error):
+        """For failures noticed after ``call`` returned (e.g. mid-stream)."""
+        self.breaker.record_failure()
+        self._count("failures", error)
+
+    def status(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["last_error"] = self.last_error
+        stats["breaker"] = self.breaker.state
+        stats["retry_in"] = round(self.breaker.retry_in(), 1)
+        if self.bucket is not None:
+            stats["tokens"] = round(self.bucket.tokens, 2)
+        return stats
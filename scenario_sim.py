@@ -0,0 +1,298 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import numpy as np
+
+import perf
+from columnar import as_table
+
+DEFAULT_PATHS = 100_000
+HORIZON_DAYS = 90
+CHUNK_PATHS = 12_500
+IN_PROCESS_PATHS = 20_000  # below this the pool costs more than it saves
+EXACT_CLIENTS = 256  # above this, churn per path uses the normal approximation
+HIST_BINS = 40
+LTV_QUARTERS = 12
+
+# Uncertain links between domains, drawn once per path. ``dist`` is
+# (kind, a, b): normal (mean, sd, clipped at 0), beta (alpha, beta) or
+# lognormal (log mean, log sd).
+ELASTICITIES = {
+    # churn probability points per unit competitor price cut, exposed clients
+    "churn_per_price_cut": ("normal", 0.8, 0.25),
+    # share of a competitor's cut we match on retained exposed revenue
+    "price_match": ("beta", 2.0, 5.0),
+    # exposure of clients outside the competitor's region
+    "spillover": ("beta", 2.0, 8.0),
+    # fraction of lost supplier capacity replaced within the quarter
+    "substitution": ("beta", 3.0, 3.0),
+    # revenue lost per unit of output lost
+    "revenue_per_output": ("normal", 0.7, 0.15),
+    # churn probability points per unit of output lost (service failures)
+    "churn_per_outage": ("normal", 0.25, 0.08),
+    # success-rate points lost per unit of output lost
+    "quality_per_outage": ("normal", 0.1, 0.03),
+    # first-quarter revenue of a new market, relative to the matching region
+    "expansion_uplift": ("lognormal", np.log(0.25), 0.35),
+    # chance-weighted adoption of the new market
+    "expansion_adoption": ("beta", 6.0, 3.0),
+    # launch cost relative to quarterly revenue
+    "expansion_cost": ("normal", 0.06, 0.015),
+}
+
+# Each scenario is a list of shocks; every shock kind is handled in
+# ``_simulate_chunk``.
+SCENARIOS = {
+    "Competitor drops price by 15%": [{"kind": "competitor_price", "change": -0.15, "competitor": "top_share"}],
+    "Main Supplier goes bankrupt": [{"kind": "partner_loss", "partner": "largest_supplier"}],
+    "Expansion into EU Market": [{"kind": "expansion", "region": "EMEA"}],
+}
+
+METRIC_LABELS = {
+    "revenue_change": "Revenue change ($, quarter)",
+    "revenue_change_pct": "Revenue change (%)",
+    "churned_clients": "Extra churned clients",
+    "output_change_pct": "Operations output change (%)",
+    "success_rate_change": "Success rate change (pts)",
+    "net_impact": "Net impact after costs ($)",
+}
+
+
+def _draw(rng, spec, n):
+    kind, a, b = spec
+    if kind == "beta":
+        return rng.beta(a, b, n)
+    if kind == "lognormal":
+        return rng.lognormal(a, b, n)
+    return np.maximum(rng.normal(a, b, n), 0.0)
+
+
+def _days_covered(finance):
+    if "date" not in finance or not len(finance):
+        return HORIZON_DAYS
+    dates = finance.column("date").astype("datetime64[D]")
+    return max(int((dates.max() - dates.min()).astype(np.int64)) + 1, 1)
+
+
+def baseline(current_data):
+    """Per-client, per-partner and per-competitor arrays the simulation runs on."""
+    finance = as_table(current_data.get("finance", []))
+    clients = as_table(current_data.get("clients", []))
+    partners = as_table(current_data.get("partners", []))
+    competitive = as_table(current_data.get("competitive", []))
+    operations = as_table(current_data.get("operations", []))
+
+    scale = HORIZON_DAYS / _days_covered(finance)
+    n = len(clients)
+    client_rev = np.zeros(n)
+    income = finance.eq("type", "Income") if "type" in finance else np.zeros(len(finance), dtype=bool)
+    if n and "client_id" in finance and finance.is_categorical("client_id"):
+        by_code = np.bincount(
+            finance.column("client_id")[income].astype(np.int64),
+            weights=finance.column("amount")[income], minlength=len(finance.categories["client_id"]),
+        )
+        lookup = {label: i for i, label in enumerate(finance.categories["client_id"])}
+        ids = clients.labels("client_id") if clients.is_categorical("client_id") else clients.column("client_id")
+        idx = np.array([lookup.get(c, -1) for c in ids])
+        client_rev = np.where(idx >= 0, by_code[np.maximum(idx, 0)], 0.0) * scale
+    if "lifetime_value" in clients:
+        ltv = clients.column("lifetime_value").astype(np.float64) / LTV_QUARTERS
+        client_rev = np.where(client_rev > 0, client_rev, ltv)
+    income_total = float(finance.column("amount")[income].sum() * scale) if "amount" in finance else 0.0
+
+    def labels(table, field, default):
+        if field not in table:
+            return np.array([default] * len(table), dtype=object)
+        return np.asarray(table.labels(field) if table.is_categorical(field) else table.column(field), dtype=object)
+
+    return {
+        "revenue": max(income_total, float(client_rev.sum())),
+        "client_rev": client_rev,
+        "client_churn": clients.column("churn_risk").astype(np.float64) if "churn_risk" in clients else np.zeros(n),
+        "client_region": labels(clients, "region", "Global"),
+        "partner_volume": partners.column("monthly_volume").astype(np.float64) if "monthly_volume" in partners else np.zeros(len(partners)),
+        "partner_type": labels(partners, "partner_type", "Supplier"),
+        "partner_region": labels(partners, "region", "Global"),
+        "partner_name": labels(partners, "partner_name", ""),
+        "comp_share": competitive.column("market_share").astype(np.float64) if "market_share" in competitive else np.zeros(0),
+        "comp_region": labels(competitive, "region", "Global"),
+        "comp_name": labels(competitive, "competitor_name", ""),
+        "utilization": float(np.nanmean(operations.column("capacity_utilization"))) if "capacity_utilization" in operations and len(operations) else 0.85,
+    }
+
+
+def _churn_delta(rng, rev, p0, terms, n_paths):
+    """
+    Extra churned clients and lost revenue per path. The churn shift is a
+    low-rank sum ``dp = sum_k a_k (per path) x v_k (per client)``, so large
+    client counts never materialise a paths x clients matrix: their
+    Bernoulli sums use a normal approximation built from the terms.
+    """
+    if not terms:
+        return np.zeros(n_paths), np.zeros(n_paths)
+    A = np.array([a for a, _ in terms])
+    V = np.array([v for _, v in terms])
+    if len(rev) <= EXACT_CLIENTS:
+        p1 = np.clip(p0 + A.T @ V, 0.0, 1.0)
+        u = rng.random(p1.shape)  # common random numbers: baseline churn cancels out
+        lost = (u < p1) & ~(u < p0)
+        return lost.sum(axis=1).astype(np.float64), lost.astype(np.float64) @ rev
+    V = np.minimum(V, 1.0 - p0)
+    mean_n = A.T @ V.sum(axis=1)
+    mean_r = A.T @ (V @ rev)
+    var_n = mean_n - np.einsum("kn,kl,ln->n", A, V @ V.T, A)
+    var_r = A.T @ (V @ (rev * rev)) - np.einsum("kn,kl,ln->n", A, (V * rev * rev) @ V.T, A)
+    z = rng.standard_normal((2, n_paths))
+    churned = mean_n + z[0] * np.sqrt(np.maximum(var_n, 0))
+    lost = mean_r + z[1] * np.sqrt(np.maximum(var_r, 0))
+    return np.maximum(churned, 0), np.maximum(lost, 0)
+
+
+def _simulate_chunk(base, shocks, n_paths, seed):
+    """One block of paths; runs in worker processes, so only plain arrays go in and out."""
+    rng = np.random.default_rng(seed)
+    draw = {name: _draw(rng, spec, n_paths) for name, spec in ELASTICITIES.items()}
+    rev = base["client_rev"]
+    p0 = np.clip(base["client_churn"], 0.0, 1.0)
+    terms = []  # (per-path coefficient, per-client vector) pieces of the churn shift
+    revenue_change = np.zeros(n_paths)
+    output_loss = np.zeros(n_paths)
+    costs = np.zeros(n_paths)
+    success_change = np.zeros(n_paths)
+
+    for shock in shocks:
+        kind = shock["kind"]
+        if kind == "competitor_price" and len(base["comp_share"]):
+            i = int(np.argmax(base["comp_share"])) if shock.get("competitor", "top_share") == "top_share" \
+                else list(base["comp_name"]).index(shock["competitor"])
+            region = base["comp_region"][i]
+            cut = abs(shock["change"])
+            exposed = np.ones(len(rev)) if region == "Global" else (base["client_region"] == region).astype(np.float64)
+            # exposure = exposed + spillover * (1 - exposed)
+            churn = draw["churn_per_price_cut"] * cut
+            terms += [(churn, exposed), (churn * draw["spillover"], 1 - exposed)]
+            retained = (1 - p0) * rev
+            exposed_rev = exposed @ retained + draw["spillover"] * ((1 - exposed) @ retained)
+            revenue_change -= draw["price_match"] * cut * exposed_rev
+        elif kind == "partner_loss" and len(base["partner_volume"]):
+            suppliers = base["partner_type"] == "Supplier"
+            volume = np.where(suppliers, base["partner_volume"], 0.0)
+            if shock.get("partner", "largest_supplier") == "largest_supplier":
+                i = int(np.argmax(volume))
+            else:
+                i = list(base["partner_name"]).index(shock["partner"])
+            capacity_loss = volume[i] / volume.sum() if volume.sum() else 0.0
+            loss = capacity_loss * (1 - draw["substitution"])
+            output_loss += loss
+            revenue_change -= draw["revenue_per_output"] * loss * base["revenue"]
+            terms.append((draw["churn_per_outage"] * loss, np.ones(len(rev))))
+            success_change -= draw["quality_per_outage"] * loss
+        elif kind == "expansion":
+            region = shock.get("region", "EMEA")
+            region_rev = rev[base["client_region"] == region].sum() or base["revenue"] / 4
+            uplift = draw["expansion_uplift"] * draw["expansion_adoption"] * region_rev
+            # Growth beyond spare capacity cannot be delivered this quarter.
+            spare = max(1.0 - base["utilization"], 0.0) * base["revenue"]
+            revenue_change += np.minimum(uplift, spare + 0.5 * np.maximum(uplift - spare, 0))
+            costs += draw["expansion_cost"] * base["revenue"]
+            output_loss -= np.minimum(uplift, spare) / base["revenue"] if base["revenue"] else 0.0
+
+    churned, churn_rev = _churn_delta(rng, rev, p0, terms, n_paths)
+    revenue_change -= churn_rev
+    revenue = base["revenue"] or 1.0
+    return {
+        "revenue_change": revenue_change.astype(np.float32),
+        "revenue_change_pct": (revenue_change / revenue * 100).astype(np.float32),
+        "churned_clients": churned.astype(np.float32),
+        "output_change_pct": (-output_loss * 100).astype(np.float32),
+        "success_rate_change": (success_change * 100).astype(np.float32),
+        "net_impact": (revenue_change - costs).astype(np.float32),
+    }
+
+
+def _distribution(samples):
+    q = np.percentile(samples, [5, 25, 50, 75, 95])
+    counts, edges = np.histogram(samples, bins=HIST_BINS)
+    return {
+        "mean": float(samples.mean()), "std": float(samples.std()),
+        "p5": float(q[0]), "p25": float(q[1]), "p50": float(q[2]), "p75": float(q[3]), "p95": float(q[4]),
+        "prob_negative": float((samples < 0).mean()),
+        "hist": {"counts": counts.tolist(), "edges": edges.tolist()},
+    }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _workers():
+    return int(os.getenv("OMNISIGHT_SIM_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the app process runs threads (live hub, AI loop) that
+            # must not be forked mid-lock.
+            _pool = ProcessPoolExecutor(_workers(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+@perf.timed("scenario.run")
+def run_scenario(scenario, current_data, n_paths=DEFAULT_PATHS, seed=None):
+    """
+    Monte Carlo impact of ``scenario`` (a SCENARIOS name or a list of
+    shocks) over one quarter. Paths are split into chunks that run across
+    a process pool; returns a distribution per metric.
+    """
+    shocks = SCENARIOS[scenario] if isinstance(scenario, str) else list(scenario)
+    base = baseline(current_data)
+    started = time.perf_counter()
+    seeds = np.random.SeedSequence(seed).spawn(max(1, -(-n_paths // CHUNK_PATHS)))
+    sizes = [min(CHUNK_PATHS, n_paths - i * CHUNK_PATHS) for i in range(len(seeds))]
+
+    parts = None
+    executor = "in-process"
+    if n_paths > IN_PROCESS_PATHS and _workers() > 1:
+        try:
+            pool = _get_pool()
+            parts = list(pool.map(_simulate_chunk, [base] * len(sizes), [shocks] * len(sizes), sizes, seeds))
+            executor = f"{_workers()} processes"
+        except Exception:
+            shutdown_pool()
+            parts = None
+    if parts is None:
+        parts = [_simulate_chunk(base, shocks, size, s) for size, s in zip(sizes, seeds)]
+
+    metrics = {name: _distribution(np.concatenate([p[name] for p in parts])) for name in parts[0]}
+    return {
+        "scenario": scenario if isinstance(scenario, str) else "custom",
+        "paths": n_paths,
+        "horizon_days": HORIZON_DAYS,
+        "baseline_revenue": base["revenue"],
+        "metrics": metrics,
+        "executor": executor,
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def format_result(result):
+    """One-line headline for chat-style surfaces (the view renders the full distributions)."""
+    rev = result["metrics"]["revenue_change_pct"]
+    net = result["metrics"]["net_impact"]
+    return (
+        f"Revenue {rev['p50']:+.1f}% (90% range {rev['p5']:+.1f}% to {rev['p95']:+.1f}%), "
+        f"P(net loss) {net['prob_negative']:.0%} over {result['paths']:,} paths"
+    )
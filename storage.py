@@ -0,0 +1,207 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from columnar import ColumnarTable
+
+META_FILE = "meta.json"
+TICK_LOG = "ticks.sqlite"
+FORMAT_VERSION = 1
+
+
+def _atomic_write(path, write):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as fh:
+        write(fh)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+class TickLog:
+    """
+    Append-only SQLite log of live ticks (version, time, history values).
+    A reset is logged too, and ``replay`` only returns ticks after the
+    latest one.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS ticks (version INTEGER NOT NULL, t REAL NOT NULL, values_json TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS resets (version INTEGER NOT NULL, t REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ticks_version ON ticks (version)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def append(self, version, t, values):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO ticks (version, t, values_json) VALUES (?, ?, ?)",
+                (int(version), float(t), json.dumps({k: float(v) for k, v in values.items()})),
+            )
+
+    def mark_reset(self, version, t=None):
+        with self._connect() as conn:
+            conn.execute("INSERT INTO resets (version, t) VALUES (?, ?)", (int(version), time.time() if t is None else t))
+
+    def replay(self, limit=None):
+        """``(version, t, values)`` since the last reset, oldest first; at most the newest ``limit``."""
+        with self._connect() as conn:
+            since = conn.execute("SELECT COALESCE(MAX(version), -1) FROM resets").fetchone()[0]
+            rows = conn.execute(
+                "SELECT version, t, values_json FROM ticks WHERE version > ? ORDER BY version DESC LIMIT ?",
+                (since, -1 if limit is None else int(limit)),
+            ).fetchall()
+        return [(v, t, json.loads(values)) for v, t, values in reversed(rows)]
+
+    def last_version(self):
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(version) FROM ticks").fetchone()
+        return row[0]
+
+
+class DatasetStore:
+    """
+    Saves and opens datasets as one ``.npy`` file per column under
+    ``root/<name>/``, plus a ``meta.json`` (fields, dtypes, categories,
+    formats) and the TickLog.
+
+    ``load`` memory-maps every numeric column copy-on-write
+    (``mmap_mode="c"``). Opening a large dataset therefore reads no data
+    until it is touched, and in-place edits never reach the files. String
+    columns are stored as fixed-width unicode and decoded on load.
+
+    ``save`` rewrites only the columns whose array changed since the last
+    save or load. New files get a fresh generation suffix and meta.json is
+    replaced last. An interrupted save leaves the previous dataset intact.
+    """
+
+    def __init__(self, root, name="default"):
+        self.dir = Path(root) / name
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._written = {}
+        self._log = None
+
+    @property
+    def log(self):
+        if self._log is None:
+            self._log = TickLog(self.dir / TICK_LOG)
+        return self._log
+
+    def exists(self):
+        return (self.dir / META_FILE).exists()
+
+    def meta(self):
+        with open(self.dir / META_FILE, encoding="utf-8") as fh:
+            return json.load(fh)
+
+    # ---- save -----------------------------------------------------------
+
+    def _write_column(self, domain, field, arr, generation):
+        folder = self.dir / domain
+        folder.mkdir(exist_ok=True)
+        entry = {"file": f"{domain}/{field}.{generation}.npy", "dtype": arr.dtype.str}
+        if arr.dtype == object:
+            missing = np.array([v is None for v in arr], dtype=bool)
+            data = np.array(["" if v is None else str(v) for v in arr], dtype=str)
+            entry["dtype"] = "object"
+            if missing.any():
+                entry["missing"] = f"{domain}/{field}.{generation}.missing.npy"
+                _atomic_write(self.dir / entry["missing"], lambda fh: np.save(fh, missing))
+        else:
+            data = arr
+        _atomic_write(self.dir / entry["file"], lambda fh: np.save(fh, np.ascontiguousarray(data)))
+        return entry
+
+    def save(self, current_data, version=0):
+        """Persists every ColumnarTable domain of ``current_data``; returns the number of columns written."""
+        with self._lock:
+            previous = self.meta() if self.exists() else {"generation": 0, "domains": {}}
+            generation = previous.get("generation", 0) + 1
+            domains = {}
+            written = 0
+            for domain, table in current_data.items():
+                if not isinstance(table, ColumnarTable):
+                    continue
+                old = previous["domains"].get(domain, {}).get("columns", {})
+                columns = {}
+                for field in table.field_names:
+                    arr = table.column(field)
+                    if field in old and self._written.get((domain, field)) is arr:
+                        columns[field] = old[field]
+                        continue
+                    columns[field] = self._write_column(domain, field, arr, generation)
+                    self._written[(domain, field)] = arr
+                    written += 1
+                domains[domain] = {
+                    "rows": len(table), "columns": columns,
+                    "categories": table.categories, "formats": table.formats,
+                }
+            meta = {
+                "format": FORMAT_VERSION, "generation": generation, "version": int(version),
+                "saved_at": time.time(), "generated_at": current_data.get("generated_at"), "domains": domains,
+            }
+            _atomic_write(self.dir / META_FILE, lambda fh: fh.write(json.dumps(meta, indent=1).encode("utf-8")))
+            self._prune(meta)
+            return written
+
+    def _prune(self, meta):
+        keep = {
+            entry[key] for d in meta["domains"].values() for entry in d["columns"].values()
+            for key in ("file", "missing") if key in entry
+        }
+        for path in self.dir.glob("*/*.npy"):
+            if path.relative_to(self.dir).as_posix() not in keep:
+                # Mapped files stay readable after unlink on POSIX.
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    # ---- load -----------------------------------------------------------
+
+    def _read_column(self, entry):
+        path = self.dir / entry["file"]
+        if entry["dtype"] != "object":
+            return np.load(path, mmap_mode="c")
+        arr = np.load(path).astype(object)
+        if "missing" in entry:
+            arr[np.load(self.dir / entry["missing"])] = None
+        return arr
+
+    def load(self):
+        """``(data, version)`` for the saved dataset; numeric columns are memory-mapped."""
+        with self._lock:
+            meta = self.meta()
+            data = {}
+            for domain, spec in meta["domains"].items():
+                columns = {field: self._read_column(entry) for field, entry in spec["columns"].items()}
+                for field, arr in columns.items():
+                    self._written[(domain, field)] = arr
+                data[domain] = ColumnarTable(columns, spec["categories"], spec["formats"])
+            if meta.get("generated_at"):
+                data["generated_at"] = meta["generated_at"]
+            return data, meta.get("version", 0)
+
+
+def get_store(name="default"):
+    """DatasetStore under OMNISIGHT_DATA_DIR, or None when persistence is off."""
+    root = os.getenv("OMNISIGHT_DATA_DIR")
+    return DatasetStore(root, name) if root else None
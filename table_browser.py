@@ -0,0 +1,202 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from columnar import MISSING_CODE, ColumnarTable, as_table
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_ENTRIES = 16  # cached sort orders and filtered row sets, each
+SUBSET_SORT = 0.25  # below this fraction of the table, sort the matches instead of the whole column
+
+
+class TableBrowser:
+    """
+    Server-side paging over ColumnarTables: category filters, a date
+    range, a sort and a column projection, returning only one page of
+    dict rows.
+
+    Sort orders are cached per column array (the live hub forks only the
+    columns it changes, so an unchanged ``date`` keeps its argsort across
+    ticks), and the matching row set per table and query. Turning pages
+    is then a slice; only the visible rows are ever decoded.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._orders = OrderedDict()
+        self._matches = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"sorts": 0, "scans": 0, "hits": 0}
+
+    def _cached(self, cache, key, owner, build, stat):
+        # ``owner`` is kept with the entry so its id cannot be reused while cached.
+        with self._lock:
+            entry = cache.get(key)
+            if entry is not None and entry[0] is owner:
+                cache.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1]
+        value = build()
+        with self._lock:
+            cache[key] = (owner, value)
+            self._stats[stat] += 1
+            while len(cache) > self.max_entries:
+                cache.popitem(last=False)
+        return value
+
+    @staticmethod
+    def _sort_keys(table, field, arr):
+        """Sortable keys for ``arr`` (a slice of ``field``) and the argsort kind that suits them."""
+        if table.is_categorical(field):
+            labels = table.categories[field]
+            rank = np.empty(len(labels) + 1, dtype=np.int32)
+            rank[np.argsort(np.array(labels, dtype=object))] = np.arange(len(labels))
+            rank[-1] = len(labels)  # MISSING_CODE indexes the last slot
+            return rank[arr], "stable"
+        if arr.dtype == object:
+            return np.array(["" if v is None else str(v) for v in arr], dtype=str), "stable"
+        # Radix sort for integers and dates; quicksort is faster for floats.
+        return arr, "stable" if arr.dtype.kind in "biuM" else "quicksort"
+
+    @staticmethod
+    def _missing(table, field, arr):
+        """Boolean mask of the missing values in ``arr``, or None when it cannot hold any."""
+        if table.is_categorical(field):
+            return arr == MISSING_CODE
+        if arr.dtype == object:
+            return np.array([v is None or v != v for v in arr], dtype=bool)
+        if arr.dtype.kind == "f":
+            return np.isnan(arr)
+        if arr.dtype.kind == "M":
+            return np.isnat(arr)
+        return None
+
+    @classmethod
+    def _argsort(cls, table, field, arr):
+        """``(order, n_missing)``: positions of ``arr`` ascending, its ``n_missing`` missing values last."""
+        keys, kind = cls._sort_keys(table, field, arr)
+        order = np.argsort(keys, kind=kind)
+        missing = cls._missing(table, field, arr)
+        if missing is None or not missing.any():
+            return order, 0
+        last = missing[order]
+        return np.concatenate([order[~last], order[last]]), int(last.sum())
+
+    @staticmethod
+    def _descending(order, n_missing):
+        """Reverses an ``_argsort`` order, keeping its missing values last."""
+        present = len(order) - n_missing
+        return np.concatenate([order[:present][::-1], order[present:]])
+
+    def _order(self, table, field):
+        """``(order, n_missing)`` of ``field`` ascending (categories by label), missing values last."""
+        arr = table.column(field)
+        return self._cached(self._orders, id(arr), arr, lambda: self._argsort(table, field, arr), "sorts")
+
+    def _has_order(self, table, field):
+        arr = table.column(field)
+        with self._lock:
+            entry = self._orders.get(id(arr))
+        return entry is not None and entry[0] is arr
+
+    def _mask(self, table, filters, date_range):
+        mask = np.ones(len(table), dtype=bool)
+        for field, labels in filters:
+            if field in table:
+                mask &= table.isin(field, labels)
+        if date_range is not None:
+            field, start, end = date_range
+            dates = table.column(field)
+            if start is not None:
+                mask &= dates >= np.datetime64(start, "D")
+            if end is not None:
+                mask &= dates <= np.datetime64(end, "D")
+        return mask
+
+    def rows(self, table, filters=None, date_range=None, sort=None, descending=False):
+        """Indices of the matching rows in display order."""
+        filters = tuple(sorted((f, tuple(v)) for f, v in (filters or {}).items() if v))
+        key = (id(table), filters, date_range, sort, descending)
+
+        def build():
+            mask = self._mask(table, filters, date_range) if filters or date_range else None
+            if sort is None:
+                return np.flatnonzero(mask) if mask is not None else np.arange(len(table))
+            if mask is not None and not self._has_order(table, sort):
+                idx = np.flatnonzero(mask)
+                if len(idx) < SUBSET_SORT * len(table):
+                    order, n_missing = self._argsort(table, sort, table.column(sort)[idx])
+                    return idx[self._descending(order, n_missing) if descending else order]
+            order, n_missing = self._order(table, sort)
+            if descending:
+                order = self._descending(order, n_missing)
+            return order[mask[order]] if mask is not None else order
+        return self._cached(self._matches, key, table, build, "scans")
+
+    @staticmethod
+    def _trivial(query):
+        return not any(query.get("filters", {}).values()) and not query.get("date_range") and not query.get("sort")
+
+    def count(self, table, **query):
+        """Number of rows matching ``query`` (see ``page``)."""
+        return len(table) if self._trivial(query) else len(self.rows(table, **query))
+
+    def page(self, table, page=0, page_size=PAGE_SIZE, columns=None, **query):
+        """
+        One page of dict rows plus ``total`` matches and ``pages``. ``query``
+        takes ``filters`` ({field: labels}), ``date_range`` ((field, start,
+        end), either bound may be None), ``sort`` and ``descending``.
+        """
+        table = as_table(table)
+        total = self.count(table, **query)
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        pages = max(1, -(-total // page_size))
+        page = max(0, min(int(page), pages - 1))
+        window = slice(page * page_size, (page + 1) * page_size)
+        # The unfiltered, unsorted view pages by position: no index array at all.
+        visible = np.arange(*window.indices(len(table))) if self._trivial(query) else self.rows(table, **query)[window]
+        fields = [f for f in (columns or table.field_names) if f in table]
+        visible_table = ColumnarTable(
+            {f: table.column(f)[visible] for f in fields},
+            {f: c for f, c in table.categories.items() if f in fields},
+            {f: c for f, c in table.formats.items() if f in fields},
+        )
+        return {
+            "rows": visible_table.to_records(),
+            "columns": fields,
+            "total": total,
+            "page": page,
+            "pages": pages,
+            "page_size": page_size,
+            "first": page * page_size,
+        }
+
+    def date_bounds(self, table, field):
+        """``(min, max)`` of a date column as ``datetime.date``, or None when it is empty."""
+        arr = table.column(field)
+
+        def build():
+            valid = arr[~np.isnat(arr)]
+            if not len(valid):
+                return None
+            return valid.min().astype(object), valid.max().astype(object)
+        return self._cached(self._orders, ("bounds", id(arr)), arr, build, "scans")
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, orders=len(self._orders), matches=len(self._matches))
+
+
+_browser = None
+_browser_lock = threading.Lock()
+
+
+def get_browser():
+    global _browser
+    if _browser is None:
+        with _browser_lock:
+            if _browser is None:
+                _browser = TableBrowser()
+    return _browser
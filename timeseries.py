@@ -0,0 +1,150 @@
+import threading
+
+import numpy as np
+
+DEFAULT_CAPACITY = 4 * 3600  # samples: 20 hours at the live hub's 5-second tick
+
+
+class TimeSeriesStore:
+    """
+    Fixed-capacity ring buffer for any number of float signals sharing one
+    timestamp axis (epoch seconds).
+
+    Every sample is written twice, at ``i`` and ``i + capacity`` of a
+    2 x capacity array, so the latest ``n`` samples are always one
+    contiguous slice: appends are O(1) and windows are read-only views,
+    never copies. A view of ``n`` samples stays valid for the next
+    ``capacity - n`` appends.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, signals=(), dtype=np.float64):
+        self.capacity = int(capacity)
+        self.dtype = dtype
+        self._t = np.zeros(2 * self.capacity, dtype=np.float64)
+        self._signals = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        for name in signals:
+            self.add_signal(name)
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    @property
+    def count(self):
+        """Samples appended since creation (not capped at capacity)."""
+        return self._count
+
+    @property
+    def signals(self):
+        return list(self._signals)
+
+    def add_signal(self, name):
+        """Adds a signal; its samples before now read as NaN."""
+        with self._lock:
+            if name not in self._signals:
+                self._signals[name] = np.full(2 * self.capacity, np.nan, dtype=self.dtype)
+
+    def append(self, t, values):
+        """Appends one sample; ``values`` maps signal name to value, missing signals get NaN."""
+        for name in values:
+            if name not in self._signals:
+                self.add_signal(name)
+        with self._lock:
+            i = self._count % self.capacity
+            j = i + self.capacity
+            self._t[i] = self._t[j] = t
+            for name, buf in self._signals.items():
+                buf[i] = buf[j] = values.get(name, np.nan)
+            self._count += 1
+
+    def clear(self):
+        with self._lock:
+            self._count = 0
+            for buf in self._signals.values():
+                buf.fill(np.nan)
+
+    def _span(self, last, end):
+        end = self._count if end is None else min(end, self._count)
+        available = min(end, self.capacity - (self._count - end))
+        n = max(0, available if last is None else min(last, available))
+        stop = (end - 1) % self.capacity + self.capacity + 1 if end else 0
+        return stop - n, stop
+
+    @staticmethod
+    def _view(buf, start, stop):
+        view = buf[start:stop]
+        view.flags.writeable = False
+        return view
+
+    def window(self, names=None, last=None, seconds=None, end=None):
+        """
+        Zero-copy views of the latest samples as ``{"t": ..., name: ...}``.
+        ``last`` caps the number of samples, ``seconds`` the time span, and
+        ``end`` reads the window as of an earlier ``count``.
+        """
+        with self._lock:
+            start, stop = self._span(last, end)
+            t = self._view(self._t, start, stop)
+            if seconds is not None and len(t):
+                start += int(np.searchsorted(t, t[-1] - seconds, side="left"))
+                t = self._view(self._t, start, stop)
+            names = self.signals if names is None else names
+            out = {"t": t}
+            for name in names:
+                buf = self._signals.get(name)
+                out[name] = self._view(buf, start, stop) if buf is not None else np.full(len(t), np.nan)
+        return out
+
+    def latest(self, name, n=1):
+        return self.window([name], last=n)[name]
+
+    def downsample(self, name, n_points, method="lttb", **window_kwargs):
+        """``(t, values)`` for ``name`` reduced to about ``n_points`` for display."""
+        w = self.window([name], **window_kwargs)
+        reducer = lttb if method == "lttb" else minmax
+        return reducer(w["t"], w[name], n_points)
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling: keeps the first and last
+    points and, per bucket, the point forming the largest triangle with the
+    previously kept point and the next bucket's mean.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+    x64 = np.asarray(x, dtype=np.float64)
+    y64 = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        nlo, nhi = hi, edges[b + 2] if b + 2 < len(edges) else n
+        cx = x64[nlo:nhi].mean()
+        cy = np.nanmean(y64[nlo:nhi]) if np.isfinite(y64[nlo:nhi]).any() else 0.0
+        area = np.abs((x64[a] - cx) * (y64[lo:hi] - y64[a]) - (x64[a] - x64[lo:hi]) * (cy - y64[a]))
+        a = lo + int(np.nanargmax(area)) if np.isfinite(area).any() else lo
+        keep[b + 1] = a
+    return x[keep], y[keep]
+
+
+def minmax(x, y, n_out):
+    """Keeps the min and max of each of ``n_out // 2`` equal-count buckets, in time order."""
+    n = len(x)
+    if n <= n_out:
+        return x, y
+    buckets = max(1, n_out // 2)
+    y64 = np.asarray(y, dtype=np.float64)
+    filled = np.where(np.isfinite(y64), y64, np.nanmean(y64) if np.isfinite(y64).any() else 0.0)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    bucket = np.repeat(np.arange(buckets), np.diff(edges))
+    # Sorted by (bucket, value), bucket k spans edges[k]:edges[k + 1] with its
+    # min first and max last.
+    order = np.lexsort((filled, bucket))
+    keep = np.unique(np.concatenate([order[edges[:-1]], order[edges[1:] - 1]]))
+    return x[keep], y[keep]
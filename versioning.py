@@ -0,0 +1,144 @@
+import hashlib
+import json
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+
+from columnar import ColumnarTable, json_default
+
+# Table -> fingerprint of the domain version it was published in. Tables are
+# never modified after publication (the live hub forks what it changes), so
+# a table keeps its fingerprint for as long as it is alive.
+_table_fingerprints = weakref.WeakKeyDictionary()
+
+
+def _structure(value):
+    if isinstance(value, ColumnarTable):
+        return [len(value), [(f, value.column(f).dtype.str) for f in value.field_names]]
+    return type(value).__name__
+
+
+class VersionedDataset(dict):
+    """
+    A dataset dict that knows when it changed.
+
+    ``version`` increases with every published change and
+    ``domain_versions`` holds the version at which each key last changed.
+    Against a ``parent`` dataset a key counts as changed when its value is
+    a different object, which is exactly what copy-on-write forks produce.
+    Item assignment and deletion mark the key dirty too; ``mark_dirty`` is
+    for code that edits a table in place.
+
+    ``fingerprint`` hashes versions and shapes, not data, so it is O(domains).
+    It is unique per lineage (a random id carried from parent to child) and
+    therefore only comparable within one process.
+    """
+
+    def __init__(self, data=(), version=0, parent=None):
+        super().__init__(data)
+        self.version = version
+        self.lineage = getattr(parent, "lineage", None) or uuid.uuid4().hex[:12]
+        previous = getattr(parent, "domain_versions", {})
+        self.domain_versions = {
+            key: previous[key] if key in previous and dict.get(parent, key) is value else version
+            for key, value in self.items()
+        }
+        self._fingerprints = {}
+        self._fingerprint = None
+        self._register(self)
+
+    def __reduce__(self):
+        # Unpickled copies start a new lineage rather than replaying item assignment.
+        return self.__class__, (dict(self), self.version)
+
+    def _register(self, keys):
+        for key in keys:
+            value = dict.get(self, key)
+            if isinstance(value, ColumnarTable):
+                _table_fingerprints[value] = self.domain_fingerprint(key)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.mark_dirty(key)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.domain_versions.pop(key, None)
+        self.mark_dirty()
+
+    def mark_dirty(self, *keys):
+        """Bumps the version, and the domain version of every key given."""
+        self.version += 1
+        for key in keys:
+            self.domain_versions[key] = self.version
+        self._fingerprints.clear()
+        self._fingerprint = None
+        self._register(keys)
+
+    def changed_since(self, version):
+        """Keys whose value changed after ``version``."""
+        return [key for key, v in self.domain_versions.items() if v > version]
+
+    def domain_fingerprint(self, key):
+        fp = self._fingerprints.get(key)
+        if fp is None:
+            text = json.dumps([self.lineage, key, self.domain_versions.get(key), _structure(dict.get(self, key))],
+                              default=json_default)
+            fp = self._fingerprints[key] = hashlib.sha256(text.encode()).hexdigest()[:32]
+        return fp
+
+    def fingerprint(self):
+        if self._fingerprint is None:
+            h = hashlib.sha256()
+            for key in sorted(self, key=str):
+                h.update(self.domain_fingerprint(key).encode())
+            self._fingerprint = h.hexdigest()[:32]
+        return self._fingerprint
+
+
+def fingerprint_of(obj):
+    """Structural fingerprint of a VersionedDataset or one of its published tables; None for anything else."""
+    if isinstance(obj, VersionedDataset):
+        return obj.fingerprint()
+    if isinstance(obj, ColumnarTable):
+        return _table_fingerprints.get(obj)
+    return None
+
+
+class VersionMemo:
+    """
+    Small LRU of results keyed by an input's fingerprint plus any extra
+    arguments. Inputs without a fingerprint (plain dicts and lists) are
+    computed every time. Cached results are shared: treat them as read-only.
+    """
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "uncached": 0}
+
+    def get(self, obj, build, *extra):
+        fp = fingerprint_of(obj)
+        if fp is None:
+            with self._lock:
+                self._stats["uncached"] += 1
+            return build()
+        key = (fp, *extra)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._entries[key]
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            self._stats["misses"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, cached=len(self._entries))
@@ -1,15 +1,19 @@
 from pathlib import Path
 from datetime import datetime
-from time import time
-import random
-
+from time import perf_counter, sleep, time
 import streamlit as st
 import streamlit.components.v1 as components
 
-import data_generator
+import perf
+from ai_async import get_engine
+from charts import FIGURE_CACHE, LINE_LAYOUT, chart_mode, line_trace, live_line
+from live_hub import get_hub
+from timeseries import lttb
 
-REFRESH_SECONDS = 5
-MAX_POINTS = 60
+AI_POLL_SECONDS = 0.25
+CHART_POINTS = 300
+HISTORY_WINDOWS = {"Last 5 min": 300, "Last hour": 3600, "Last 4 hours": 4 * 3600}
+PERF_ROWS = 8
 
 
 def _logo_path():
@@ -81,73 +85,90 @@ def _inject_chart_css():
 def _init_live_state():
     if "live_on" not in st.session_state:
         st.session_state.live_on = True
-    if "series" not in st.session_state:
-        st.session_state.series = {"t": [], "revenue": [], "risk": []}
     if "ai_analysis" not in st.session_state:
         st.session_state.ai_analysis = ""
-    if "last_refresh" not in st.session_state:
-        st.session_state.last_refresh = None
-    if "last_tick_ts" not in st.session_state:
-        st.session_state.last_tick_ts = time()  # start now (prevents weird countdown)
-    if "next_update_in" not in st.session_state:
-        st.session_state.next_update_in = REFRESH_SECONDS
-
-
-def _calc_kpis(current_data):
-    finance = current_data.get("finance", [])
-    ops = current_data.get("operations", [])
-    partners = current_data.get("partners", [])
-    clients = current_data.get("clients", [])
-    compliance = current_data.get("compliance", [])
-
-    total_rev_7d = sum(t.get("amount", 0) for t in finance if t.get("type") == "Income")
-    active_lines = sum(1 for o in ops if o.get("status") in ("Active", "Degraded"))
-    reliable_partners = sum(1 for p in partners if p.get("relationship_health", 0) >= 0.75)
-    active_clients = sum(1 for c in clients if c.get("status") == "Active")
-
-    avg_compliance = (sum(x.get("compliance_score", 0) for x in compliance) / len(compliance)) if compliance else 1.0
-    avg_churn = (sum(c.get("churn_risk", 0) for c in clients) / len(clients)) if clients else 0.0
-
-    risk_score = round(((1 - avg_compliance) * 60 + (avg_churn * 40)) * 100, 2)
-
-    return {
-        "total_rev_7d": float(total_rev_7d),
-        "active_lines": int(active_lines),
-        "reliable_partners": int(reliable_partners),
-        "partners_total": int(max(len(partners), 1)),
-        "active_clients": int(active_clients),
-        "risk_score": float(risk_score),
-    }
-
-
-def _apply_drift(current_data):
-    finance = current_data.get("finance", [])
-    clients = current_data.get("clients", [])
-    compliance = current_data.get("compliance", [])
-
-    rev_mult = 1.0 + random.uniform(-0.015, 0.015)
-    for t in finance[:30]:
-        if isinstance(t, dict) and t.get("type") == "Income":
-            amt = t.get("amount", 0)
-            if isinstance(amt, (int, float)):
-                t["amount"] = max(0.0, amt * rev_mult)
-
-    churn_shift = random.uniform(-0.01, 0.02)
-    for c in clients[:100]:
-        if isinstance(c, dict):
-            r = c.get("churn_risk", 0.0)
-            if isinstance(r, (int, float)):
-                c["churn_risk"] = min(max(r + churn_shift, 0.0), 1.0)
-
-    comp_shift = random.uniform(-0.01, 0.01)
-    for x in compliance[:80]:
-        if isinstance(x, dict):
-            cs = x.get("compliance_score", 1.0)
-            if isinstance(cs, (int, float)):
-                x["compliance_score"] = min(max(cs + comp_shift, 0.0), 1.0)
-
-    current_data["generated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    return current_data
+    if "live_snapshot" not in st.session_state:
+        st.session_state.live_snapshot = get_hub().snapshot()
+
+
+def _follow_hub():
+    """Moves this session to the hub's latest snapshot while Live Mode is on."""
+    hub = get_hub()
+    if "viewer_id" in st.session_state:
+        hub.subscribe(st.session_state.viewer_id)
+    snap = st.session_state.live_snapshot
+    if st.session_state.live_on and hub.version != snap.version:
+        snap = st.session_state.live_snapshot = hub.snapshot()
+        st.session_state.current_data = snap.data
+    return snap
+
+
+def _chart_series(snap, name, seconds):
+    """Label/value lists for one history signal, LTTB-downsampled to CHART_POINTS."""
+    w = snap.window([name], seconds=seconds)
+    t, values = lttb(w["t"], w[name], CHART_POINTS)
+    labels = [datetime.fromtimestamp(ts).strftime("%H:%M:%S") for ts in t]
+    return labels, values.tolist()
+
+
+def _start_ai_job(slot, result_key, job):
+    previous = st.session_state.get(slot)
+    if previous is not None and previous is not job:
+        get_engine().release(previous, st.session_state.get("viewer_id"))
+    st.session_state[slot] = job
+    st.session_state[result_key] = ""
+
+
+def _ai_job_frame(slot, result_key, template):
+    """Renders the current state of an AI job; returns True while it is still running."""
+    job = st.session_state.get(slot)
+    if job is None:
+        return False
+    text = job.text
+    if job.done:
+        if job.error and not text:
+            text = f"⚠️ AI request {job.error}."
+        st.session_state[result_key] = text
+        st.session_state[slot] = None
+        st.markdown(template.format(text), unsafe_allow_html=True)
+        return False
+    pending = text or "<span class='small-muted'>Synthesizing intelligence...</span>"
+    st.markdown(template.format(pending + " ▌"), unsafe_allow_html=True)
+    return True
+
+
+def _render_ai_job(slot, result_key, template, idle_html=None):
+    """
+    Shows a background AI job's streamed text. With fragments the job is
+    polled by a fragment that reruns every AI_POLL_SECONDS while it is
+    running, so the rest of the page never waits on the model; without
+    them the script polls in place.
+    """
+    polling = st.session_state.get(slot) is not None
+
+    def body():
+        if st.session_state.get(slot) is not None:
+            if not _ai_job_frame(slot, result_key, template) and polling:
+                st.rerun()
+        elif st.session_state.get(result_key):
+            st.markdown(template.format(st.session_state[result_key]), unsafe_allow_html=True)
+        elif idle_html:
+            st.markdown(idle_html, unsafe_allow_html=True)
+
+    fragment = getattr(st, "fragment", None)
+    if fragment:
+        fragment(body, run_every=AI_POLL_SECONDS if polling else None)()
+        return
+
+    placeholder = st.empty()
+    while True:
+        with placeholder.container():
+            running = _ai_job_frame(slot, result_key, template)
+        if not running:
+            break
+        sleep(AI_POLL_SECONDS)
+    if not st.session_state.get(result_key) and idle_html:
+        placeholder.markdown(idle_html, unsafe_allow_html=True)
 
 
 def _try_plotly():
@@ -158,7 +179,7 @@ def _try_plotly():
         return None
 
 
-def _render_chart_card(title, subtitle, fig_or_df, use_plotly: bool, note: str | None = None):
+def _render_chart_card(title, subtitle, render, note: str | None = None):
     st.markdown(
         """
 <div class="os-chart-card">
@@ -174,15 +195,7 @@ def _render_chart_card(title, subtitle, fig_or_df, use_plotly: bool, note: str |
         unsafe_allow_html=True,
     )
 
-    if use_plotly:
-        fig_html = fig_or_df.to_html(
-            full_html=False,
-            include_plotlyjs="cdn",
-            config={"displayModeBar": False, "responsive": True},
-        )
-        components.html(fig_html, height=270, scrolling=False)
-    else:
-        st.line_chart(fig_or_df, use_container_width=True)
+    render()
 
     if note:
         st.markdown(f"<div class='os-chart-note'>{note}</div>", unsafe_allow_html=True)
@@ -191,51 +204,36 @@ def _render_chart_card(title, subtitle, fig_or_df, use_plotly: bool, note: str |
 
 
 def _build_plotly_line(go, x, y, name):
-    fig = go.Figure()
-    fig.add_trace(
-        go.Scatter(
-            x=x,
-            y=y,
-            mode="lines",
-            line=dict(width=3, color="#9290FE"),
-            name=name,
-            hovertemplate="%{y:.3s}<extra></extra>",
-        )
-    )
+    trace = line_trace(x, y, name)
+    del trace["type"]
+    return go.Figure(go.Scatter(**trace), layout=LINE_LAYOUT)
 
-    fig.update_layout(
-        margin=dict(l=10, r=10, t=10, b=10),
-        paper_bgcolor="rgba(0,0,0,0)",
-        plot_bgcolor="rgba(0,0,0,0)",
-        font=dict(color="rgba(229,231,235,0.88)"),
-        showlegend=False,
-        height=250,
-    )
 
-    fig.update_xaxes(
-        showgrid=True,
-        gridcolor="rgba(255,255,255,0.10)",
-        zeroline=False,
-        showticklabels=False,
-        ticks="",
-        fixedrange=True,
-    )
+def show(current_data, ai_engine):
+    with perf.span("dashboard.render"):
+        _show(current_data, ai_engine)
 
-    fig.update_yaxes(
-        showgrid=True,
-        gridcolor="rgba(255,255,255,0.10)",
-        zeroline=False,
-        showticklabels=True,
-        tickfont=dict(size=11),
-        tickformat="~s",
-        nticks=4,
-        fixedrange=True,
-    )
 
-    return fig
+def _render_perf_card():
+    snap = perf.get_recorder().snapshot()
+    spans = sorted(snap["spans"].items(), key=lambda kv: -kv[1]["total_ms"])[:PERF_ROWS]
+    rows = "".join(
+        f"<div class='small-muted'>{name}: <b>{s['p50_ms']:.1f} / {s['p95_ms']:.1f} / {s['p99_ms']:.1f} ms</b> ×{s['count']}</div>"
+        for name, s in spans
+    ) or "<div class='small-muted'>No spans recorded yet.</div>"
+    st.markdown(
+        f"""
+<div class="os-card" style="margin-top:12px;">
+  <div style="font-weight:850; font-size:0.95rem;">Performance</div>
+  <div style="margin-top:10px" class="small-muted">p50 / p95 / p99, busiest stages first</div>
+  {rows}
+</div>
+""",
+        unsafe_allow_html=True,
+    )
 
 
-def show(current_data, ai_engine):
+def _show(current_data, ai_engine):
     _inject_chart_css()
     _init_live_state()
 
@@ -253,25 +251,24 @@ def show(current_data, ai_engine):
     ctrl1, ctrl2 = st.columns([3, 1])
     with ctrl1:
         st.session_state.live_on = st.toggle("Live Mode", value=st.session_state.live_on)
-        last = st.session_state.last_refresh
+        hub = get_hub()
+        last = st.session_state.live_snapshot.refreshed_label
+        refresh_seconds = f"{hub.refresh_seconds:g}"
 
         if st.session_state.live_on:
-            now_ts = time()
-            elapsed = now_ts - st.session_state.last_tick_ts
-            remaining = max(0, int(REFRESH_SECONDS - elapsed))
-            st.session_state.next_update_in = remaining
+            remaining = max(0, int(hub.next_tick_at - time()))
 
             if last:
                 st.markdown(
                     f"<div class='small-muted' style='margin-top:-6px;'>"
-                    f"Live • Updates every <b>{REFRESH_SECONDS}s</b> • Next update in: <b>{remaining}s</b> • "
+                    f"Live • Updates every <b>{refresh_seconds}s</b> • Next update in: <b>{remaining}s</b> • "
                     f"Last refreshed: <b>{last}</b></div>",
                     unsafe_allow_html=True,
                 )
             else:
                 st.markdown(
                     f"<div class='small-muted' style='margin-top:-6px;'>"
-                    f"Live • Updates every <b>{REFRESH_SECONDS}s</b> • Next update in: <b>{remaining}s</b></div>",
+                    f"Live • Updates every <b>{refresh_seconds}s</b> • Next update in: <b>{remaining}s</b></div>",
                     unsafe_allow_html=True,
                 )
         else:
@@ -282,12 +279,13 @@ def show(current_data, ai_engine):
 
     with ctrl2:
         if st.button("Reset Dataset", use_container_width=True):
-            st.session_state.current_data = data_generator.generate_full_dataset()
-            st.session_state.series = {"t": [], "revenue": [], "risk": []}
+            # Resets the shared dataset, so every live viewer starts over.
+            snap = st.session_state.live_snapshot = get_hub().reset()
+            st.session_state.current_data = snap.data
             st.session_state.ai_analysis = ""
-            st.session_state.last_refresh = None
-            st.session_state.last_tick_ts = time()
-            st.session_state.next_update_in = REFRESH_SECONDS
+            if st.session_state.get("ai_job") is not None:
+                get_engine().release(st.session_state.ai_job, st.session_state.get("viewer_id"))
+                st.session_state.ai_job = None
             st.rerun()
 
     st.markdown("<div style='height:10px'></div>", unsafe_allow_html=True)
@@ -312,7 +310,7 @@ def show(current_data, ai_engine):
                     unsafe_allow_html=True,
                 )
 
-        s = st.session_state.series
+        s = st.session_state.live_snapshot.window(["revenue", "risk"], last=2)
         rev_delta = "stable"
         risk_delta = "stable"
 
@@ -334,64 +332,72 @@ def show(current_data, ai_engine):
         )
 
     def _render_charts():
-        t = st.session_state.series["t"]
-        rev = st.session_state.series["revenue"]
-        risk = st.session_state.series["risk"]
+        snap = st.session_state.live_snapshot
+        seconds = HISTORY_WINDOWS[st.session_state.get("history_window", "Last 5 min")]
+        points = len(snap.window(["revenue"], seconds=seconds)["t"])
+        cadence = f"{get_hub().refresh_seconds:g}s cadence"
 
         go = _try_plotly()
-        use_plotly = go is not None
+        use_plotly = go is not None and points >= 2
+        mode = chart_mode()
+
+        def chart(name, label):
+            def render():
+                if not use_plotly:
+                    import pandas as pd
+                    t, values = _chart_series(snap, name, seconds)
+                    frame = pd.DataFrame({label: values}, index=t) if t else pd.DataFrame({label: []})
+                    st.line_chart(frame, use_container_width=True)
+                    return
+                started = perf_counter()
+                if mode == "native":
+                    # The browser keeps the figure; only points new since its last update are sent.
+                    w = snap.window([name], seconds=seconds)
+                    series = f"{getattr(snap.data, 'lineage', id(snap.history))}:{seconds}"
+                    sent = live_line(f"chart_{name}", series, w["t"], w[name], label, seconds, CHART_POINTS)
+                else:
+                    # Downsampled and built once per hub tick for every session.
+                    def build():
+                        x, y = _chart_series(snap, name, seconds)
+                        return _build_plotly_line(go, x, y, label)
+                    _, payload = FIGURE_CACHE.get((name, snap.version, seconds, mode), build, mode)
+                    components.html(payload, height=270, scrolling=False)
+                    sent = len(payload)
+                FIGURE_CACHE.record_render(sent, perf_counter() - started)
+            return render
 
         cL, cR = st.columns(2)
         with cL:
-            if use_plotly and len(t) >= 2:
-                fig = _build_plotly_line(go, t, rev, "Revenue")
-                _render_chart_card("Signal timeline", "Revenue (5s cadence)", fig, True)
-            else:
-                import pandas as pd
-                df = pd.DataFrame({"Revenue": rev}, index=t) if t else pd.DataFrame({"Revenue": []})
-                _render_chart_card("Signal timeline", "Revenue (5s cadence)", df, False)
+            _render_chart_card("Signal timeline", f"Revenue ({cadence})", chart("revenue", "Revenue"))
 
         with cR:
             note = "Risk score blends churn + compliance — spikes signal rising exposure."
-            if use_plotly and len(t) >= 2:
-                fig = _build_plotly_line(go, t, risk, "Risk")
-                _render_chart_card("Signal timeline", "Risk score (5s cadence)", fig, True, note=note)
-            else:
-                import pandas as pd
-                df = pd.DataFrame({"Risk": risk}, index=t) if t else pd.DataFrame({"Risk": []})
-                _render_chart_card("Signal timeline", "Risk score (5s cadence)", df, False, note=note)
+            _render_chart_card("Signal timeline", f"Risk score ({cadence})", chart("risk", "Risk"), note=note)
+
+    h1, h2 = st.columns([3, 1])
+    with h2:
+        st.selectbox("History", list(HISTORY_WINDOWS), key="history_window", label_visibility="collapsed")
 
     if fragment:
         @st.fragment(run_every="1s")
         def live_panel():
-            if st.session_state.live_on:
-                now_ts = time()
-                if (now_ts - st.session_state.last_tick_ts) >= REFRESH_SECONDS:
-                    st.session_state.last_tick_ts = now_ts
-
-                    st.session_state.current_data = _apply_drift(st.session_state.current_data)
-                    kpis = _calc_kpis(st.session_state.current_data)
-
-                    now_label = datetime.now().strftime("%H:%M:%S")
-                    st.session_state.last_refresh = now_label
-
-                    st.session_state.series["t"].append(now_label)
-                    st.session_state.series["revenue"].append(kpis["total_rev_7d"])
-                    st.session_state.series["risk"].append(kpis["risk_score"])
-
-                    for key in ("t", "revenue", "risk"):
-                        if len(st.session_state.series[key]) > MAX_POINTS:
-                            st.session_state.series[key] = st.session_state.series[key][-MAX_POINTS:]
-
-            kpis_now = _calc_kpis(st.session_state.current_data)
-            _render_kpi_row(kpis_now)
-            st.markdown("<div style='height:16px'></div>", unsafe_allow_html=True)
-            _render_charts()
+            with perf.span("dashboard.live_panel"):
+                _render_kpi_row(_follow_hub().kpis)
+
+        # Charts only change when the hub ticks, so they refresh at the tick
+        # cadence rather than with the KPIs (each rerun sends the new points,
+        # or the whole figure in the iframe modes).
+        @st.fragment(run_every=get_hub().refresh_seconds if st.session_state.live_on else None)
+        def chart_panel():
+            with perf.span("dashboard.chart_panel"):
+                _follow_hub()
+                _render_charts()
 
         live_panel()
+        st.markdown("<div style='height:16px'></div>", unsafe_allow_html=True)
+        chart_panel()
     else:
-        kpis_now = _calc_kpis(st.session_state.current_data)
-        _render_kpi_row(kpis_now)
+        _render_kpi_row(_follow_hub().kpis)
         st.markdown("<div style='height:16px'></div>", unsafe_allow_html=True)
         _render_charts()
 
@@ -399,36 +405,69 @@ def show(current_data, ai_engine):
 
     a1, a2, a3 = st.columns([1, 2, 1])
     with a2:
-        if st.button("Analyze Cross-Domain Risks", use_container_width=True):
-            with st.spinner("Synthesizing intelligence..."):
-                st.session_state.ai_analysis = ai_engine.analyze_state(st.session_state.current_data)
+        analyze_clicked = st.button("Analyze Cross-Domain Risks", use_container_width=True)
 
     st.markdown("<div style='height:12px'></div>", unsafe_allow_html=True)
 
     left, right = st.columns([3, 1])
 
     with left:
-        if st.session_state.ai_analysis:
-            st.markdown(f"<div class='os-brief'>{st.session_state.ai_analysis}</div>", unsafe_allow_html=True)
-        else:
-            st.markdown(
-                "<div class='os-brief'><span class='small-muted'>System ready.</span> Click <b>Analyze</b> to surface hidden cross-domain causes and impacts.</div>",
-                unsafe_allow_html=True,
-            )
+        if analyze_clicked:
+            _start_ai_job("ai_job", "ai_analysis", get_engine().submit_analyze(
+                st.session_state.current_data, waiter=st.session_state.get("viewer_id"),
+            ))
+        _render_ai_job(
+            "ai_job", "ai_analysis", "<div class='os-brief'>{}</div>",
+            idle_html="<div class='os-brief'><span class='small-muted'>System ready.</span> Click <b>Analyze</b> to surface hidden cross-domain causes and impacts.</div>",
+        )
 
         st.markdown("<div style='height:14px'></div>", unsafe_allow_html=True)
         st.markdown("<div class='small-muted'>Ask the Data</div>", unsafe_allow_html=True)
 
         q = st.text_input("", placeholder="e.g. What triggered churn risk in APAC?", label_visibility="collapsed")
+        if q and q != st.session_state.get("qa_question"):
+            st.session_state.qa_question = q
+            if "qa_session" not in st.session_state:
+                st.session_state.qa_session = ai_engine.AskSession()
+            _start_ai_job("qa_job", "qa_answer", get_engine().submit_session_question(
+                st.session_state.qa_session, q, st.session_state.current_data, waiter=st.session_state.get("viewer_id"),
+            ))
         if q:
-            with st.spinner("Reasoning..."):
-                ans = ai_engine.ask_ai_question(q, st.session_state.current_data)
-            st.markdown(f"<div class='os-card'><b>Insight:</b> {ans}</div>", unsafe_allow_html=True)
+            _render_ai_job("qa_job", "qa_answer", "<div class='os-card'><b>Insight:</b> {}</div>")
+            session = st.session_state.get("qa_session")
+            stats = session.stats() if session is not None else {}
+            if stats.get("delta_turns"):
+                cached = (
+                    f", ~{stats['followup_cached_tokens']} of them from the context cache"
+                    if stats["followup_cached_tokens"] else " including the replayed chat"
+                )
+                st.caption(
+                    f"Follow-ups bill ~{stats['followup_prompt_tokens']} prompt tokens{cached} "
+                    f"(first question ~{stats['first_prompt_tokens']})"
+                )
 
     with right:
         generated_at = st.session_state.current_data.get("generated_at", "—")
         model_name = getattr(ai_engine, "DEFAULT_MODEL", None)
         model_text = model_name if model_name else "Demo Mode"
+        cache = getattr(ai_engine, "RESPONSE_CACHE", None)
+        cache_stats = cache.stats() if cache is not None else {"hits": 0, "misses": 0}
+        in_flight = get_engine().stats()["in_flight"]
+        ai_status = ai_engine.service_status()
+        chart_stats = FIGURE_CACHE.stats()
+        pipeline = get_hub().ingest_pipeline
+        ingest_html = ""
+        if pipeline is not None:
+            ing = pipeline.stats()
+            ingest_html = (
+                f'<div class="small-muted">Ingest: <b>{ing["throughput_eps"]:g} ev/s · lag {ing["lag_ms"] or 0:.0f} ms'
+                f' · queue {ing["queue_depth"]}/{ing["queue_capacity"]} · {ing["rejected"]} rejected</b></div>'
+            )
+        ai_text = {"live": "LIVE", "mock": "DEMO", "degraded": "DEGRADED"}[ai_status["mode"]]
+        if ai_status["mode"] == "degraded":
+            ai_text += f" · breaker {ai_status['breaker']}"
+            if ai_status.get("retry_in"):
+                ai_text += f", retry in {ai_status['retry_in']:.0f}s"
 
         st.markdown(
             f"""
@@ -438,9 +477,39 @@ def show(current_data, ai_engine):
   <div class="small-muted">Updated: <b>{generated_at}</b></div>
   <div style="height:10px"></div>
   <div class="small-muted">Model: <b>{model_text}</b></div>
+  <div class="small-muted">AI cache: <b>{cache_stats["hits"]} hits / {cache_stats["misses"]} misses</b></div>
+  <div class="small-muted">AI calls in flight: <b>{in_flight}</b></div>
+  <div class="small-muted">AI service: <b>{ai_text}</b></div>
   <div style="height:10px"></div>
   <div class="small-muted">Live: <b>{"ON" if st.session_state.live_on else "OFF"}</b></div>
+  <div class="small-muted">Viewers: <b>{get_hub().subscribers()}</b></div>
+  <div class="small-muted">Charts: <b>{chart_stats["builds"]} built / {chart_stats["reuses"]} reused · {chart_stats["avg_payload_kb"]} KB</b></div>
+  {ingest_html}
 </div>
 """,
             unsafe_allow_html=True,
         )
+
+        joins = st.session_state.live_snapshot.joins
+        if joins is not None:
+            at_risk = joins.revenue_at_risk()
+            lines = "".join(
+                f"<div class='small-muted'>{name} ({entry['threat'] or '—'}): <b>${entry['revenue_at_risk']:,.0f}</b>"
+                f" · {', '.join(entry['regions'])}</div>"
+                for name, entry in joins.summary()["competitor_exposure"].items()
+            )
+            st.markdown(
+                f"""
+<div class="os-card" style="margin-top:12px;">
+  <div style="font-weight:850; font-size:0.95rem;">Exposure</div>
+  <div style="margin-top:10px" class="small-muted">Revenue at risk: <b>${at_risk["revenue"]:,.0f}</b> ({at_risk["clients"]} clients)</div>
+  <div class="small-muted">Expected churn loss: <b>${at_risk["expected_loss"]:,.0f}</b></div>
+  <div style="height:10px"></div>
+  {lines}
+</div>
+""",
+                unsafe_allow_html=True,
+            )
+
+        if perf.get_recorder().enabled:
+            _render_perf_card()
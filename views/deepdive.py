@@ -1,22 +1,114 @@
 import streamlit as st
 
+import insights
+from columnar import as_table
+from live_hub import get_hub
+from table_browser import PAGE_SIZE, get_browser
+
+PAGE_SIZES = (25, PAGE_SIZE, 100, 250)
+MAX_FILTER_OPTIONS = 50  # categoricals with more labels (client ids) get no filter; every label is sent to the browser
+
+HEALTH_COLORS = {"Healthy": "rgba(34,211,238,0.95)", "Watch": "rgba(255,181,114,0.95)", "Critical": "rgba(248,113,113,0.95)"}
+
+
+def _insight(current_data, domain):
+    """Precomputed insight for the live snapshot this session is on; computed inline for any other data."""
+    snap = st.session_state.get("live_snapshot")
+    cache = get_hub().insights
+    if cache is None or snap is None or snap.data is not current_data:
+        return insights.domain_insight(domain, current_data)
+    return cache.get(snap.version, domain, current_data)
+
+
+def _render_health(insight):
+    color = HEALTH_COLORS.get(insight["health"], "inherit")
+    st.markdown(
+        f"<div class='os-card'><b>Health:</b> <span style='color:{color};font-weight:700'>{insight['health']}</span>"
+        + "".join(f"<div class='small-muted'>• {line}</div>" for line in insight["highlights"])
+        + "</div>",
+        unsafe_allow_html=True,
+    )
+    m = insight["metrics"]
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Rows", f"{m['rows']:,}")
+    c2.metric(f"Mean {m['measure']}" if m["measure"] else "Mean", insights.fmt_number(m["mean"]),
+              f"{m['trend_pct']:+.1f}%" if m["trend_pct"] is not None else None)
+    c3.metric("Anomalies", m["anomalies"])
+
+
+def _render_anomalies(items):
+    st.markdown("### Detected Anomalies")
+    if not items:
+        st.markdown("<div class='small-muted'>No anomalies flagged on the latest tick.</div>", unsafe_allow_html=True)
+        return
+    rows = [
+        {"series": a["series"], "entity": a["entity"], "value": a["value"],
+         "score": a["score"], "method": a["method"], "direction": a["direction"]}
+        for a in items
+    ]
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
+
+def _render_browser(domain, table):
+    """Filter/sort/page controls over the raw table; only the visible page is sent to the browser."""
+    browser = get_browser()
+    key = f"raw_{domain}"
+    columns = st.multiselect("Columns", table.field_names, default=table.field_names, key=f"{key}_columns")
+
+    filters = {}
+    filter_fields = [f for f, labels in table.categories.items() if f in table and len(labels) <= MAX_FILTER_OPTIONS]
+    for col, field in zip(st.columns(max(len(filter_fields), 1)), filter_fields):
+        with col:
+            filters[field] = st.multiselect(field.title(), list(table.categories[field]), key=f"{key}_{field}")
+
+    date_range = None
+    if "date" in table and (bounds := browser.date_bounds(table, "date")):
+        picked = st.date_input("Date range", value=bounds, min_value=bounds[0], max_value=bounds[1], key=f"{key}_dates")
+        if isinstance(picked, (tuple, list)) and len(picked) == 2 and tuple(picked) != bounds:
+            date_range = ("date", picked[0], picked[1])
+
+    s1, s2, s3 = st.columns([2, 1, 1])
+    with s1:
+        sort = st.selectbox("Sort by", ["—"] + table.field_names, key=f"{key}_sort")
+    with s2:
+        descending = st.checkbox("Descending", key=f"{key}_desc")
+    with s3:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(PAGE_SIZE), key=f"{key}_size")
+
+    query = {"filters": filters, "date_range": date_range, "sort": None if sort == "—" else sort, "descending": descending}
+    pages = max(1, -(-browser.count(table, **query) // page_size))
+    page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, key=f"{key}_page") - 1
+    result = browser.page(table, page, page_size, columns, **query)
+    st.dataframe(result["rows"], use_container_width=True, hide_index=True, column_order=result["columns"])
+    shown = len(result["rows"])
+    st.caption(
+        f"Rows {result['first'] + 1 if shown else 0:,}–{result['first'] + shown:,} of {result['total']:,} matching"
+        f" ({len(table):,} total)"
+    )
+
+
 def show(current_data, ai_engine):
     """Displays the Domain Deep Dive view."""
     st.markdown("## 📊 Domain Specific Intelligence")
     st.markdown("Inspect raw data streams and perform isolated domain analysis.")
     st.markdown("<div class='os-card' style='margin-bottom:14px;'><b>Page</b> <span class='small-muted'>• your existing content below</span></div>", unsafe_allow_html=True)
 
-    domain = st.selectbox("Select Domain Layer", list(current_data.keys()))
-    
+    domain = st.selectbox("Select Domain Layer", insights.domains(current_data))
+    insight = _insight(current_data, domain)
+    flagged = insight["anomalies"]
+
     col_l, col_r = st.columns([1, 1])
 
     with col_l:
         st.markdown(f"### Raw Data Stream: {domain.title()}")
-        st.json(current_data[domain][:3]) 
+        _render_browser(domain, as_table(current_data[domain]))
+        _render_anomalies(flagged)
 
     with col_r:
+        st.markdown(f"### Domain Health: {domain.title()}")
+        _render_health(insight)
         st.markdown(f"### AI Layer Analysis: {domain.title()}")
         if st.button(f"Analyze {domain} Only", use_container_width=True):
              with st.spinner(f"Analyzing {domain}..."):
-                 analysis = ai_engine.analyze_specific_domain(domain, current_data[domain])
-                 st.markdown(f'<div class="analysis-container">{analysis}</div>', unsafe_allow_html=True)
\ No newline at end of file
+                 analysis = ai_engine.analyze_specific_domain(domain, current_data[domain], flagged)
+                 st.markdown(f'<div class="analysis-container">{analysis}</div>', unsafe_allow_html=True)
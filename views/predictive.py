@@ -1,5 +1,43 @@
 import streamlit as st
 
+import forecasting
+
+
+def _forecast_chart(result):
+    """Revenue history plus forecast and its 95% band."""
+    rev = result.get("revenue")
+    if not rev or not len(rev["labels"]):
+        return
+    hist_x = rev["history_days"].astype(str).tolist()
+    fut_x = rev["days"].astype(str).tolist()
+    try:
+        import plotly.graph_objects as go
+    except Exception:
+        import pandas as pd
+        df = pd.DataFrame(
+            {"History": list(rev["history"][0]) + [None] * len(fut_x),
+             "Forecast": [None] * len(hist_x) + list(rev["mean"][0])},
+            index=hist_x + fut_x,
+        )
+        st.line_chart(df, use_container_width=True)
+        return
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=fut_x + fut_x[::-1], y=list(rev["upper"][0]) + list(rev["lower"][0])[::-1],
+                             fill="toself", fillcolor="rgba(146,144,254,0.18)", line=dict(width=0),
+                             hoverinfo="skip", name="95% interval"))
+    fig.add_trace(go.Scatter(x=hist_x, y=rev["history"][0], mode="lines", line=dict(width=3, color="#22D3EE"), name="Revenue"))
+    fig.add_trace(go.Scatter(x=fut_x, y=rev["mean"][0], mode="lines", line=dict(width=3, color="#9290FE", dash="dot"), name="Forecast"))
+    fig.update_layout(
+        margin=dict(l=10, r=10, t=10, b=10), height=280, showlegend=False,
+        paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="rgba(229,231,235,0.88)"),
+    )
+    fig.update_yaxes(gridcolor="rgba(255,255,255,0.10)", tickformat="~s")
+    fig.update_xaxes(showgrid=False)
+    st.plotly_chart(fig, use_container_width=True, theme=None, config={"displayModeBar": False})
+
+
 def show(current_data, ai_engine):
     """Displays the Predictive Analytics view."""
     st.markdown("## 🔮 Future State Prediction")
@@ -9,15 +47,19 @@ def show(current_data, ai_engine):
     col1, col2 = st.columns([1, 3])
     with col1:
         st.markdown("### Configuration")
-        timeframe = st.selectbox("Time Horizon", ["7 Days", "30 Days", "Quarterly"])
-        
+        timeframe = st.selectbox("Time Horizon", list(forecasting.HORIZONS))
+
         if st.button("▶ Run Forecast", use_container_width=True):
             with st.spinner("Calculating probabilities..."):
                 st.session_state.prediction = ai_engine.predict_future_state(current_data, timeframe)
-    
+                st.session_state.prediction_timeframe = timeframe
+
     with col2:
         st.markdown("### Forecast Results")
         if st.session_state.prediction:
-            st.markdown(f'<div class="analysis-container">{st.session_state.prediction}</div>', unsafe_allow_html=True)
+            horizon = forecasting.horizon_days(st.session_state.get("prediction_timeframe", timeframe))
+            # Served from the fit cached by predict_future_state.
+            _forecast_chart(forecasting.get_forecast_engine().forecast(current_data, horizon))
+            st.markdown(st.session_state.prediction)
         else:
-            st.markdown("<div class='metric-card' style='text-align: center; color: #a0aec0;'>Select timeframe and run forecast.</div>", unsafe_allow_html=True)
\ No newline at end of file
+            st.markdown("<div class='metric-card' style='text-align: center; color: #a0aec0;'>Select timeframe and run forecast.</div>", unsafe_allow_html=True)
@@ -1,5 +1,68 @@
 import streamlit as st
 
+import scenario_sim
+
+HEADLINE_METRICS = ("revenue_change_pct", "churned_clients", "output_change_pct", "net_impact")
+
+
+def _fmt(metric, value):
+    if metric in ("revenue_change", "net_impact"):
+        return f"${value:+,.0f}"
+    if metric == "churned_clients":
+        return f"{value:.1f}"
+    return f"{value:+.1f}"
+
+
+def _histogram(result, metric):
+    dist = result["metrics"][metric]
+    edges = dist["hist"]["edges"]
+    centers = [(a + b) / 2 for a, b in zip(edges[:-1], edges[1:])]
+    try:
+        import plotly.graph_objects as go
+    except Exception:
+        import pandas as pd
+        st.bar_chart(pd.DataFrame({"paths": dist["hist"]["counts"]}, index=[round(c, 2) for c in centers]))
+        return
+    fig = go.Figure(go.Bar(x=centers, y=dist["hist"]["counts"], marker_color="#9290FE"))
+    for q, dash in (("p5", "dot"), ("p50", "solid"), ("p95", "dot")):
+        fig.add_vline(x=dist[q], line=dict(color="rgba(34,211,238,0.9)", dash=dash, width=2))
+    fig.update_layout(
+        margin=dict(l=10, r=10, t=10, b=10), height=260, bargap=0.05, showlegend=False,
+        paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="rgba(229,231,235,0.88)"),
+    )
+    fig.update_yaxes(gridcolor="rgba(255,255,255,0.10)", title="paths")
+    st.plotly_chart(fig, use_container_width=True, theme=None, config={"displayModeBar": False})
+
+
+def _render_result(result):
+    st.markdown(
+        f"<div class='small-muted'>{result['scenario']} • {result['paths']:,} paths over "
+        f"{result['horizon_days']} days • {result['executor']} • {result['elapsed']:.2f}s</div>",
+        unsafe_allow_html=True,
+    )
+    cols = st.columns(len(HEADLINE_METRICS))
+    for col, metric in zip(cols, HEADLINE_METRICS):
+        dist = result["metrics"][metric]
+        col.metric(
+            scenario_sim.METRIC_LABELS[metric], _fmt(metric, dist["p50"]),
+            f"90%: {_fmt(metric, dist['p5'])} … {_fmt(metric, dist['p95'])}", delta_color="off",
+        )
+
+    metric = st.selectbox(
+        "Distribution", list(scenario_sim.METRIC_LABELS),
+        format_func=scenario_sim.METRIC_LABELS.get, key="scenario_metric",
+    )
+    _histogram(result, metric)
+
+    rows = [
+        {"metric": scenario_sim.METRIC_LABELS[name], "mean": round(d["mean"], 2), "p5": round(d["p5"], 2),
+         "p50": round(d["p50"], 2), "p95": round(d["p95"], 2), "P(<0)": f"{d['prob_negative']:.0%}"}
+        for name, d in result["metrics"].items()
+    ]
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
+
 def show(current_data, ai_engine):
     """Displays the Scenario Modeling view."""
     st.markdown("## 🎭 Wargaming & Simulations")
@@ -7,23 +70,23 @@ def show(current_data, ai_engine):
     st.markdown("<div class='os-card' style='margin-bottom:14px;'><b>Page</b> <span class='small-muted'>• your existing content below</span></div>", unsafe_allow_html=True)
 
     c1, c2, c3 = st.columns(3)
-    
+
     if c1.button("📉 Competitor Price Drop", use_container_width=True):
         with st.spinner("Simulating..."):
             st.session_state.scenario_result = ai_engine.simulate_scenario("Competitor drops price by 15%", current_data)
-            
+
     if c2.button("🔥 Supply Chain Fail", use_container_width=True):
         with st.spinner("Simulating..."):
             st.session_state.scenario_result = ai_engine.simulate_scenario("Main Supplier goes bankrupt", current_data)
-            
+
     if c3.button("🚀 Market Expansion", use_container_width=True):
         with st.spinner("Simulating..."):
             st.session_state.scenario_result = ai_engine.simulate_scenario("Expansion into EU Market", current_data)
-            
+
     st.markdown("---")
     st.markdown("### Simulation Results")
 
     if st.session_state.scenario_result:
-        st.markdown(f'<div class="analysis-container">{st.session_state.scenario_result}</div>', unsafe_allow_html=True)
+        _render_result(st.session_state.scenario_result)
     else:
-         st.markdown("<div class='metric-card' style='text-align: center; color: #a0aec0;'>Awaiting scenario selection...</div>", unsafe_allow_html=True)
\ No newline at end of file
+         st.markdown("<div class='metric-card' style='text-align: center; color: #a0aec0;'>Awaiting scenario selection...</div>", unsafe_allow_html=True)